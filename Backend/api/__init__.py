@@ -3,3 +3,12 @@ API Package
 Smart Home Camera API
 """
 
+import os
+import sys
+
+# Make Backend/ importable once for every api module (device_connectivity,
+# object_detection, face_identification live next to this package)
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
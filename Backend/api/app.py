@@ -3,6 +3,15 @@ Flask API Server for Smart Home Camera System
 Provides REST API endpoints for camera management and video streaming
 """
 
+if __name__ == '__main__':
+    # Patch blocking stdlib calls before anything else is imported so every
+    # streaming client is served by a greenlet instead of an OS thread
+    try:
+        from gevent import monkey
+        monkey.patch_all()
+    except ImportError:
+        pass
+
 from flask import Flask, jsonify, request, Response
 from flask_cors import CORS
 import sys
@@ -10,91 +19,106 @@ import os
 import signal
 from pathlib import Path
 
-# Add parent directory to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent))
+# Add parent directory to path when run as a script (python3 app.py);
+# once importable, the api package keeps it on sys.path for its modules
+_ROOT = str(Path(__file__).parent.parent)
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
 
 from device_connectivity.camera import CameraDiscovery
 from api.services.camera_manager import CameraManager
-from api.routes import camera_routes, stream_routes
+from api.routes import camera_routes, stream_routes, faces
 from api.routes.faces import faces_bp
+from api.json_provider import OrjsonProvider
 
-# Initialize Flask app
-app = Flask(__name__)
-
-# Enable CORS for frontend access
-CORS(app, resources={
-    r"/api/*": {"origins": ["http://localhost:3000", "http://localhost:3001"]},
-    r"/stream/*": {"origins": ["http://localhost:3000", "http://localhost:3001"]}
-})
-
-# Initialize camera manager
-camera_manager = CameraManager()
-
-# Initialize blueprints with camera manager
-camera_routes.init_blueprint(camera_manager)
-stream_routes.init_blueprint(camera_manager)
-
-# Import and initialize faces blueprint with camera manager
-from api.routes import faces
-faces.set_camera_manager(camera_manager)
-
-# Register blueprints
-app.register_blueprint(camera_routes.bp)
-app.register_blueprint(stream_routes.bp)
-app.register_blueprint(faces_bp)
-
-@app.route('/')
-def index():
-    """API root endpoint"""
-    return jsonify({
-        'name': 'Smart Home Camera API',
-        'version': '1.0.0',
-        'status': 'running',
-        'endpoints': {
-            'cameras': '/api/cameras',
-            'open_camera': '/api/cameras/:id/open',
-            'close_camera': '/api/cameras/:id/close',
-            'stream': '/stream/:id',
-            'faces': '/api/faces',
-            'enroll_face': '/api/faces/enroll',
-            'face_stats': '/api/faces/stats'
-        }
+def create_app():
+    """
+    Build the Flask app and its camera manager.
+    
+    Nothing is created at import time: the face encoder pool's forkserver and
+    spawn workers re-import this script as __mp_main__, and must not open
+    cameras or load models again. gunicorn uses the same factory
+    ('app:create_app()').
+    """
+    # Initialize Flask app
+    app = Flask(__name__)
+
+    # Serialize JSON responses with orjson (falls back to stdlib json)
+    app.json = OrjsonProvider(app)
+
+    # Enable CORS for frontend access
+    CORS(app, resources={
+        r"/api/*": {"origins": ["http://localhost:3000", "http://localhost:3001"]},
+        r"/stream/*": {"origins": ["http://localhost:3000", "http://localhost:3001"]}
     })
 
-@app.route('/health')
-def health():
-    """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
-        'active_cameras': len(camera_manager.active_cameras)
-    })
+    # Initialize camera manager
+    camera_manager = CameraManager()
+
+    # Initialize blueprints with camera manager
+    camera_routes.init_blueprint(camera_manager)
+    stream_routes.init_blueprint(camera_manager)
+    faces.set_camera_manager(camera_manager)
+
+    # Register blueprints
+    app.register_blueprint(camera_routes.bp)
+    app.register_blueprint(stream_routes.bp)
+    app.register_blueprint(faces_bp)
+
+    @app.route('/')
+    def index():
+        """API root endpoint"""
+        return jsonify({
+            'name': 'Smart Home Camera API',
+            'version': '1.0.0',
+            'status': 'running',
+            'endpoints': {
+                'cameras': '/api/cameras',
+                'open_camera': '/api/cameras/:id/open',
+                'close_camera': '/api/cameras/:id/close',
+                'stream': '/stream/:id',
+                'faces': '/api/faces',
+                'enroll_face': '/api/faces/enroll',
+                'face_stats': '/api/faces/stats'
+            }
+        })
 
-@app.route('/api/shutdown', methods=['POST'])
-def shutdown():
-    """Shutdown the server"""
-    try:
-        # Close all active cameras
-        for camera_id in list(camera_manager.active_cameras.keys()):
-            camera_manager.close_camera(camera_id)
-
-        # Send response before shutting down
-        response = jsonify({
-            'status': 'shutting down',
-            'message': 'Server is shutting down...'
+    @app.route('/health')
+    def health():
+        """Health check endpoint"""
+        return jsonify({
+            'status': 'healthy',
+            'active_cameras': len(camera_manager.active_cameras)
         })
 
-        # Schedule shutdown after response is sent
-        def shutdown_server():
-            import time
-            time.sleep(1)  # Give time for response to be sent
-            os.kill(os.getpid(), signal.SIGINT)
+    @app.route('/api/shutdown', methods=['POST'])
+    def shutdown():
+        """Shutdown the server"""
+        try:
+            # Close all active cameras
+            for camera_id in list(camera_manager.active_cameras.keys()):
+                camera_manager.close_camera(camera_id)
+
+            # Send response before shutting down
+            response = jsonify({
+                'status': 'shutting down',
+                'message': 'Server is shutting down...'
+            })
+
+            # Schedule shutdown after response is sent
+            def shutdown_server():
+                import time
+                time.sleep(1)  # Give time for response to be sent
+                os.kill(os.getpid(), signal.SIGINT)
 
-        import threading
-        threading.Thread(target=shutdown_server).start()
+            import threading
+            threading.Thread(target=shutdown_server).start()
 
-        return response
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+            return response
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    return app
 
 if __name__ == '__main__':
     print("=" * 70)
@@ -107,5 +131,16 @@ if __name__ == '__main__':
     print("=" * 70)
     print()
     
-    app.run(host='0.0.0.0', port=5000, debug=True, threaded=True)
+    app = create_app()
+    
+    try:
+        from gevent.pywsgi import WSGIServer
+    except ImportError:
+        # gevent not installed, fall back to the threaded dev server
+        # Debugger and reloader are opt-in via FLASK_DEBUG=1
+        debug = os.environ.get('FLASK_DEBUG') == '1'
+        app.run(host='0.0.0.0', port=5000, debug=debug, threaded=True, use_reloader=debug)
+    else:
+        print("⚡ Serving with gevent")
+        WSGIServer(('0.0.0.0', 5000), app).serve_forever()
 
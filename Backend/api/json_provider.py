@@ -0,0 +1,54 @@
+"""
+JSON Provider
+orjson-backed replacement for Flask's default JSON provider
+"""
+
+import decimal
+from datetime import date, datetime
+from pathlib import PurePath
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def _default(obj):
+    """Serialize types that orjson does not handle natively"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, PurePath):
+        return str(obj)
+    return DefaultJSONProvider.default(obj)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider that serializes responses with orjson.
+
+    Falls back to the stdlib-based DefaultJSONProvider when orjson
+    is not installed, so jsonify() keeps working either way.
+    """
+
+    def dumps(self, obj, **kwargs):
+        """Serialize obj to a JSON string"""
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+
+        return orjson.dumps(obj, option=option, default=_default).decode()
+
+    def loads(self, s, **kwargs):
+        """Deserialize a JSON string or bytes"""
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
@@ -105,10 +105,9 @@ def get_active_cameras():
     Get list of currently active cameras
     """
     try:
-        all_cameras = camera_manager.get_all_cameras()
         active_cameras = [
-            cam for cam in all_cameras 
-            if camera_manager.is_camera_active(cam['id'])
+            camera_manager.get_camera_by_id(camera_id)
+            for camera_id in list(camera_manager.active_cameras)
         ]
         return jsonify({
             'success': True,
@@ -3,19 +3,23 @@ Face recognition API routes.
 Handles face enrollment, identification, and management.
 """
 
-from flask import Blueprint, request, jsonify, send_file
-from werkzeug.utils import secure_filename
+from flask import Blueprint, Response, request, jsonify, send_file
+import functools
 import os
+import queue
+import threading
+import time
+import uuid
 import cv2
 import numpy as np
 from pathlib import Path
-from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import Future
 
 # Import face identification modules
-import sys
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-
 from face_identification import FaceEncoder, FaceIdentifier, FaceDatabase
+from api.services.camera_manager import run_blocking
+from api.services import face_worker
 
 # Create blueprint
 faces_bp = Blueprint('faces', __name__)
@@ -24,27 +28,29 @@ faces_bp = Blueprint('faces', __name__)
 UPLOAD_FOLDER = Path(__file__).parent.parent.parent / 'face_recognition' / 'data' / 'photos'
 UPLOAD_FOLDER.mkdir(parents=True, exist_ok=True)
 
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp'}
+ALLOWED_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'gif', 'bmp'})
 
-# Global instances (will be initialized by camera_manager)
-face_encoder = None
-face_identifier = None
-face_database = None
-camera_manager_instance = None
+# nginx internal location mapped to UPLOAD_FOLDER (e.g. /protected_photos/).
+# When set, photos are served with X-Accel-Redirect instead of through Python.
+PHOTO_ACCEL_REDIRECT_PREFIX = os.environ.get('PHOTO_ACCEL_REDIRECT_PREFIX', '')
 
+# Browser cache lifetime for enrolled photos (seconds)
+PHOTO_CACHE_MAX_AGE = 86400
 
-def init_face_recognition():
-    """Initialize face recognition components"""
-    global face_encoder, face_identifier, face_database
+# Camera captures at least this wide are downscaled before face detection
+CAPTURE_DOWNSCALE_MIN_WIDTH = 1280
+CAPTURE_DETECTION_SCALE = 0.25
 
-    if face_database is None:
-        face_database = FaceDatabase()
+# Global instance (will be set by app)
+camera_manager_instance = None
 
-    if face_encoder is None:
-        face_encoder = FaceEncoder(model='hog')  # Use 'cnn' for better accuracy with GPU
 
-    if face_identifier is None:
-        face_identifier = FaceIdentifier(face_database, tolerance=0.6)
+@functools.cache
+def _components():
+    """Create face recognition components once and reuse them for every request"""
+    face_database = FaceDatabase()
+    face_encoder = FaceEncoder(model='hog')  # Use 'cnn' for better accuracy with GPU
+    face_identifier = FaceIdentifier(face_database, tolerance=0.6)
 
     return face_encoder, face_identifier, face_database
 
@@ -60,6 +66,157 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+# Faces are encoded in the face_worker process pool; one background worker
+# then stores the results serially
+ENROLL_WAIT_TIMEOUT = 30.0  # Seconds a synchronous request waits before answering 202
+MAX_FINISHED_JOBS = 100
+
+_job_queue = queue.Queue()
+_jobs = OrderedDict()  # {job_id: job dict}
+_jobs_lock = threading.Lock()
+_worker_thread = None
+
+
+def _enrollment_worker():
+    """Process queued enrollment jobs one at a time"""
+    while True:
+        job = _job_queue.get()
+        job['status'] = 'running'
+
+        try:
+            # Wait for encoder futures here: the job body runs on a native
+            # thread (run_blocking), where gevent's patched futures are unsafe
+            args = tuple(arg.result() if isinstance(arg, Future) else arg for arg in job['args'])
+            result, status_code = run_blocking(job['func'], *args)
+        except Exception as e:
+            result, status_code = {'error': f'Enrollment failed: {str(e)}'}, 500
+
+        job['result'] = result
+        job['status_code'] = status_code
+        job['status'] = 'completed' if status_code < 400 else 'failed'
+        job['done'].set()
+
+
+def _submit_job(func, *args):
+    """Queue an enrollment job, starting the worker on first use"""
+    global _worker_thread
+
+    job = {
+        'id': uuid.uuid4().hex,
+        'status': 'queued',
+        'func': func,
+        'args': args,
+        'result': None,
+        'status_code': None,
+        'done': threading.Event()
+    }
+
+    with _jobs_lock:
+        if _worker_thread is None:
+            _worker_thread = threading.Thread(target=_enrollment_worker, daemon=True)
+            _worker_thread.start()
+
+        # Forget the oldest finished jobs
+        while len(_jobs) >= MAX_FINISHED_JOBS:
+            oldest_id = next((job_id for job_id, j in _jobs.items() if j['done'].is_set()), None)
+            if oldest_id is None:
+                break
+            del _jobs[oldest_id]
+
+        _jobs[job['id']] = job
+
+    _job_queue.put(job)
+    return job
+
+
+def _job_response(job):
+    """
+    Wait for a job unless the client asked for async processing.
+    Returns the job result, or 202 with the job id if it is still pending.
+    """
+    wants_async = request.args.get('async', '').lower() in ('1', 'true', 'yes')
+
+    if not wants_async and job['done'].wait(ENROLL_WAIT_TIMEOUT):
+        return jsonify(job['result']), job['status_code']
+
+    return jsonify({
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': f"/api/faces/jobs/{job['id']}"
+    }), 202
+
+
+def _save_enrollment(person_id, name, notes, encoding, filepath):
+    """Store an encoding for a new or existing person and add it to the identifier"""
+    encoder, identifier, database = _components()
+
+    # Enroll person in database
+    if person_id:
+        # Add encoding to existing person
+        database.add_encoding_to_person(person_id, encoding, str(filepath))
+    else:
+        # Create new person
+        person_id = database.enroll_person(name, encoding, str(filepath), notes)
+
+    # Get total encodings for this person
+    encodings = database.get_person_encodings(person_id)
+    total_encodings = len(encodings)
+
+    # Add the new encoding to the identifier's gallery
+    identifier.append_encoding(person_id, name, encoding)
+
+    return person_id, total_encodings
+
+
+def _enroll_from_upload(encoded, data, original_filename, person_id, name, notes):
+    """Worker job: store the uploaded image once the encoder process returned (encoding, error)"""
+    encoding, error = encoded
+    if encoding is None:
+        return {'error': error}, 400
+
+    # Save uploaded file only once enrollment has succeeded; the name is
+    # generated by us, only the already-validated extension comes from the client
+    extension = original_filename.rsplit('.', 1)[1].lower()
+    filename = f"{time.time_ns()}_{person_id or 'new'}.{extension}"
+    filepath = UPLOAD_FOLDER / filename
+    filepath.write_bytes(data)
+
+    person_id, total_encodings = _save_enrollment(person_id, name, notes, encoding, filepath)
+
+    return {
+        'success': True,
+        'person_id': person_id,
+        'name': name,
+        'message': f'Successfully enrolled {name}',
+        'photo_path': str(filepath),
+        'total_encodings': total_encodings
+    }, 201
+
+
+def _enroll_from_frame(encoded, frame, person_id, name, notes):
+    """Worker job: store the captured frame once the encoder process returned (encoding, error)"""
+    encoding, error = encoded
+    if encoding is None:
+        return {'error': error}, 400
+
+    # Save captured frame
+    filename = f"capture_{time.time_ns()}_{person_id or 'new'}.jpg"
+    filepath = UPLOAD_FOLDER / filename
+    cv2.imwrite(str(filepath), frame)
+
+    person_id, total_encodings = _save_enrollment(person_id, name, notes, encoding, filepath)
+
+    return {
+        'success': True,
+        'person_id': person_id,
+        'name': name,
+        'message': f'Successfully enrolled {name} from camera capture',
+        'photo_path': str(filepath),
+        'total_encodings': total_encodings
+    }, 201
+
+
 @faces_bp.route('/api/faces/enroll', methods=['POST'])
 def enroll_face():
     """
@@ -70,6 +227,7 @@ def enroll_face():
         - name: Person's name (for new person)
         - person_id: Existing person ID (for adding photo to existing person)
         - notes: Optional notes
+        - ?async=1: Return 202 with a job id instead of waiting
 
     Response:
         - person_id: ID of enrolled person
@@ -78,7 +236,7 @@ def enroll_face():
     """
     try:
         # Initialize components
-        encoder, identifier, database = init_face_recognition()
+        encoder, identifier, database = _components()
 
         # Check if file is present
         if 'file' not in request.files:
@@ -110,49 +268,12 @@ def enroll_face():
                 return jsonify({'error': 'Person name is required'}), 400
             person_id = None
 
-        # Save uploaded file
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{timestamp}_{filename}"
-        filepath = UPLOAD_FOLDER / filename
-        file.save(str(filepath))
-
-        # Validate image quality
-        is_valid, message = encoder.validate_image_quality(str(filepath))
-        if not is_valid:
-            os.remove(filepath)
-            return jsonify({'error': message}), 400
-
-        # Generate face encoding
-        encoding, face_location = encoder.encode_face_from_file(str(filepath))
-
-        if encoding is None:
-            os.remove(filepath)
-            return jsonify({'error': 'Could not detect face in image'}), 400
-
-        # Enroll person in database
-        if person_id:
-            # Add encoding to existing person
-            database.add_encoding_to_person(person_id, encoding, str(filepath))
-        else:
-            # Create new person
-            person_id = database.enroll_person(name, encoding, str(filepath), notes)
-
-        # Get total encodings for this person
-        encodings = database.get_person_encodings(person_id)
-        total_encodings = len(encodings)
-
-        # Reload known faces in identifier
-        identifier.reload_known_faces()
+        # Decode and encode in the process pool; the worker stores the result
+        data = file.read()
+        encode_future = face_worker.get_executor().submit(face_worker.encode_upload, data)
+        job = _submit_job(_enroll_from_upload, encode_future, data, file.filename, person_id, name, notes)
 
-        return jsonify({
-            'success': True,
-            'person_id': person_id,
-            'name': name,
-            'message': f'Successfully enrolled {name}',
-            'photo_path': str(filepath),
-            'total_encodings': total_encodings
-        }), 201
+        return _job_response(job)
 
     except Exception as e:
         return jsonify({'error': f'Enrollment failed: {str(e)}'}), 500
@@ -168,6 +289,7 @@ def enroll_face_from_capture():
         - name: Person's name (for new person)
         - person_id: Existing person ID (for adding photo to existing person)
         - notes: Optional notes
+        - ?async=1: Return 202 with a job id instead of waiting
 
     Response:
         - person_id: ID of enrolled person
@@ -176,7 +298,7 @@ def enroll_face_from_capture():
     """
     try:
         # Initialize components
-        encoder, identifier, database = init_face_recognition()
+        encoder, identifier, database = _components()
 
         data = request.get_json()
 
@@ -212,44 +334,38 @@ def enroll_face_from_capture():
         if frame is None:
             return jsonify({'error': 'Could not capture frame from camera'}), 400
 
-        # Generate face encoding from frame
-        encoding, face_location = encoder.encode_face_from_frame(frame)
+        # Encode in the process pool, detecting on a downscaled copy of large frames
+        detection_scale = CAPTURE_DETECTION_SCALE if frame.shape[1] >= CAPTURE_DOWNSCALE_MIN_WIDTH else 1.0
+        encode_future = face_worker.get_executor().submit(face_worker.encode_frame, frame, detection_scale)
+        job = _submit_job(_enroll_from_frame, encode_future, frame, person_id, name, notes)
 
-        if encoding is None:
-            return jsonify({'error': 'Could not detect face in camera frame'}), 400
+        return _job_response(job)
 
-        # Save captured frame
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"capture_{timestamp}_{name.replace(' ', '_')}.jpg"
-        filepath = UPLOAD_FOLDER / filename
-        cv2.imwrite(str(filepath), frame)
+    except Exception as e:
+        return jsonify({'error': f'Enrollment failed: {str(e)}'}), 500
 
-        # Enroll person in database
-        if person_id:
-            # Add encoding to existing person
-            database.add_encoding_to_person(person_id, encoding, str(filepath))
-        else:
-            # Create new person
-            person_id = database.enroll_person(name, encoding, str(filepath), notes)
 
-        # Get total encodings for this person
-        encodings = database.get_person_encodings(person_id)
-        total_encodings = len(encodings)
+@faces_bp.route('/api/faces/jobs/<job_id>', methods=['GET'])
+def get_enrollment_job(job_id):
+    """
+    Get the status of a queued enrollment job.
 
-        # Reload known faces in identifier
-        identifier.reload_known_faces()
+    Response:
+        - status: queued, running, completed or failed
+        - result: Enrollment response once the job has finished
+    """
+    with _jobs_lock:
+        job = _jobs.get(job_id)
 
-        return jsonify({
-            'success': True,
-            'person_id': person_id,
-            'name': name,
-            'message': f'Successfully enrolled {name} from camera capture',
-            'photo_path': str(filepath),
-            'total_encodings': total_encodings
-        }), 201
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
 
-    except Exception as e:
-        return jsonify({'error': f'Enrollment failed: {str(e)}'}), 500
+    return jsonify({
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status'],
+        'result': job['result']
+    }), 200
 
 
 @faces_bp.route('/api/faces', methods=['GET'])
@@ -257,21 +373,27 @@ def get_all_faces():
     """
     Get all enrolled persons.
     
+    Request:
+        - ?limit=N: Return at most N persons (default: all)
+        - ?offset=N: Skip the first N persons (default: 0)
+    
     Response:
         - persons: List of enrolled persons
     """
     try:
-        encoder, identifier, database = init_face_recognition()
+        encoder, identifier, database = _components()
+        
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', 0, type=int)
+        if (limit is not None and limit < 0) or offset < 0:
+            return jsonify({'error': 'limit and offset must be non-negative integers'}), 400
         
-        persons = database.get_all_persons()
+        persons = database.get_all_persons(limit=limit, offset=offset)
         
-        # Add photo URLs
+        # Add photo URLs (photo paths come from the same query)
         for person in persons:
-            photo_path = database.get_photo_path(person['id'])
-            if photo_path:
-                person['photo_url'] = f"/api/faces/{person['id']}/photo"
-            else:
-                person['photo_url'] = None
+            photo_path = person.pop('photo_path')
+            person['photo_url'] = f"/api/faces/{person['id']}/photo" if photo_path else None
         
         return jsonify({
             'success': True,
@@ -292,7 +414,7 @@ def get_face(person_id):
         - person: Person details
     """
     try:
-        encoder, identifier, database = init_face_recognition()
+        encoder, identifier, database = _components()
         
         person = database.get_person(person_id)
         
@@ -332,7 +454,7 @@ def update_face(person_id):
         - message: Success message
     """
     try:
-        encoder, identifier, database = init_face_recognition()
+        encoder, identifier, database = _components()
         
         data = request.get_json()
         
@@ -347,9 +469,9 @@ def update_face(person_id):
         if not success:
             return jsonify({'error': 'Person not found or no changes made'}), 404
         
-        # Reload known faces if name changed
+        # Update the identifier's gallery if name changed
         if name:
-            identifier.reload_known_faces()
+            identifier.rename_person(person_id, name)
         
         return jsonify({
             'success': True,
@@ -369,7 +491,7 @@ def delete_face(person_id):
         - message: Success message
     """
     try:
-        encoder, identifier, database = init_face_recognition()
+        encoder, identifier, database = _components()
         
         # Get photo path before deletion
         photo_path = database.get_photo_path(person_id)
@@ -387,8 +509,8 @@ def delete_face(person_id):
             except Exception as e:
                 print(f"⚠️  Could not delete photo file: {e}")
         
-        # Reload known faces
-        identifier.reload_known_faces()
+        # Drop the person's encodings from the identifier's gallery
+        identifier.remove_person(person_id)
         
         return jsonify({
             'success': True,
@@ -408,14 +530,39 @@ def get_person_photo(person_id):
         - Image file
     """
     try:
-        encoder, identifier, database = init_face_recognition()
+        encoder, identifier, database = _components()
 
         photo_path = database.get_photo_path(person_id)
 
         if not photo_path or not os.path.exists(photo_path):
             return jsonify({'error': 'Photo not found'}), 404
 
-        return send_file(photo_path, mimetype='image/jpeg')
+        # Behind nginx, let it send the file straight from disk
+        if PHOTO_ACCEL_REDIRECT_PREFIX:
+            try:
+                relative_path = Path(photo_path).resolve().relative_to(UPLOAD_FOLDER.resolve())
+            except ValueError:
+                relative_path = None
+
+            if relative_path is not None:
+                response = Response(mimetype='image/jpeg')
+                response.headers['X-Accel-Redirect'] = f"{PHOTO_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{relative_path.as_posix()}"
+                response.cache_control.public = True
+                response.cache_control.max_age = PHOTO_CACHE_MAX_AGE
+                return response
+
+        # Conditional response: repeat loads get 304 Not Modified via ETag/Last-Modified
+        stat = os.stat(photo_path)
+        response = send_file(
+            photo_path,
+            mimetype='image/jpeg',
+            conditional=True,
+            etag=f"{stat.st_size}-{int(stat.st_mtime)}",
+            last_modified=stat.st_mtime,
+            max_age=PHOTO_CACHE_MAX_AGE
+        )
+        response.cache_control.public = True
+        return response
 
     except Exception as e:
         return jsonify({'error': f'Failed to retrieve photo: {str(e)}'}), 500
@@ -433,7 +580,7 @@ def reload_face_recognition():
         - total_faces: Number of faces loaded
     """
     try:
-        encoder, identifier, database = init_face_recognition()
+        encoder, identifier, database = _components()
 
         # Reload known faces in identifier
         identifier.reload_known_faces()
@@ -460,7 +607,7 @@ def get_face_stats():
         - statistics: Face recognition stats
     """
     try:
-        encoder, identifier, database = init_face_recognition()
+        encoder, identifier, database = _components()
         
         stats = identifier.get_statistics()
         
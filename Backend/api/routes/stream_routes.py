@@ -4,8 +4,10 @@ Endpoints for camera video streaming
 """
 
 from flask import Blueprint, Response, jsonify
-import cv2
-import time
+import threading
+
+# Multipart part header; Content-Length lets clients read the JPEG without scanning for the boundary
+_PART_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n'
 
 # Create blueprint
 bp = Blueprint('stream', __name__, url_prefix='/stream')
@@ -13,6 +15,12 @@ bp = Blueprint('stream', __name__, url_prefix='/stream')
 # Camera manager will be injected
 camera_manager = None
 
+# Shared per-camera frame broadcast state, guarded by _cv
+_cv = threading.Condition()
+_latest = {}        # {camera_id: (jpeg_bytes, version)}
+_subscribers = {}   # {camera_id: viewer count}
+_broadcasters = {}  # {camera_id: threading.Thread}
+
 
 def init_blueprint(manager):
     """Initialize blueprint with camera manager"""
@@ -20,37 +28,90 @@ def init_blueprint(manager):
     camera_manager = manager
 
 
-def generate_frames(camera_id):
+def _broadcast_frames(camera_id):
     """
-    Generator function to yield video frames
-    Used for MJPEG streaming
+    Background loop that grabs and encodes frames for one camera
+    Each frame is encoded once and shared by every subscribed viewer
     """
+    version = 0
     while True:
-        # Check if camera is still active
-        if not camera_manager.is_camera_active(camera_id):
-            break
-        
-        # Get frame from camera
-        frame = camera_manager.get_camera_frame(camera_id)
-        
-        if frame is None:
-            time.sleep(0.1)
+        with _cv:
+            # Stop when the last viewer leaves or the camera is closed
+            if _subscribers.get(camera_id, 0) == 0 or not camera_manager.is_camera_active(camera_id):
+                _broadcasters.pop(camera_id, None)
+                _latest.pop(camera_id, None)
+                _cv.notify_all()
+                return
+
+        # Wait for the inference thread to publish a new annotated frame
+        if not camera_manager.wait_for_frame(camera_id, timeout=1.0):
             continue
-        
-        # Encode frame as JPEG
-        ret, buffer = cv2.imencode('.jpg', frame)
-        if not ret:
+
+        # Get the JPEG-encoded frame from camera
+        frame_bytes = camera_manager.get_camera_frame_jpeg(camera_id)
+        if frame_bytes is None:
             continue
-        
-        # Convert to bytes
-        frame_bytes = buffer.tobytes()
-        
-        # Yield frame in multipart format
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-        
-        # Small delay to control frame rate
-        time.sleep(0.033)  # ~30 FPS
+
+        # Publish encoded frame to all viewers
+        version += 1
+        with _cv:
+            _latest[camera_id] = (frame_bytes, version)
+            _cv.notify_all()
+
+
+def _subscribe(camera_id):
+    """Register a viewer, starting the camera's broadcaster if needed"""
+    with _cv:
+        _subscribers[camera_id] = _subscribers.get(camera_id, 0) + 1
+        if camera_id not in _broadcasters:
+            thread = threading.Thread(target=_broadcast_frames, args=(camera_id,), daemon=True)
+            _broadcasters[camera_id] = thread
+            thread.start()
+
+
+def _unsubscribe(camera_id):
+    """Unregister a viewer; the broadcaster stops after the last one"""
+    with _cv:
+        remaining = _subscribers.get(camera_id, 0) - 1
+        if remaining > 0:
+            _subscribers[camera_id] = remaining
+        else:
+            _subscribers.pop(camera_id, None)
+
+
+def generate_frames(camera_id):
+    """
+    Generator function to yield video frames
+    Used for MJPEG streaming
+    """
+    _subscribe(camera_id)
+    last_version = 0
+
+    try:
+        while True:
+            # Check if camera is still active
+            if not camera_manager.is_camera_active(camera_id):
+                break
+
+            # Wait for the broadcaster to publish a new frame
+            with _cv:
+                _cv.wait_for(
+                    lambda: _latest.get(camera_id, (None, last_version))[1] != last_version,
+                    timeout=1.0
+                )
+                frame_bytes, version = _latest.get(camera_id, (None, last_version))
+
+            if frame_bytes is None or version == last_version:
+                continue
+            last_version = version
+
+            # Yield frame in multipart format; the pieces are written
+            # separately to avoid copying the JPEG into a new buffer
+            yield _PART_HEADER % len(frame_bytes)
+            yield frame_bytes
+            yield b'\r\n'
+    finally:
+        _unsubscribe(camera_id)
 
 
 @bp.route('/<int:camera_id>')
@@ -75,10 +136,12 @@ def stream_camera(camera_id):
         }), 400
     
     # Return MJPEG stream
-    return Response(
+    response = Response(
         generate_frames(camera_id),
         mimetype='multipart/x-mixed-replace; boundary=frame'
     )
+    response.cache_control.no_store = True
+    return response
 
 
 @bp.route('/<int:camera_id>/snapshot')
@@ -102,26 +165,25 @@ def get_snapshot(camera_id):
             'error': f'Camera {camera_id} is not open'
         }), 400
     
-    # Get single frame
-    frame = camera_manager.get_camera_frame(camera_id)
-    
-    if frame is None:
-        return jsonify({
-            'success': False,
-            'error': 'Failed to capture frame'
-        }), 500
-    
-    # Encode as JPEG
-    ret, buffer = cv2.imencode('.jpg', frame)
-    if not ret:
-        return jsonify({
-            'success': False,
-            'error': 'Failed to encode frame'
-        }), 500
+    # Reuse the frame already encoded for live viewers, if any
+    with _cv:
+        frame_bytes, _ = _latest.get(camera_id, (None, 0))
+
+    if frame_bytes is None:
+        # Get single JPEG-encoded frame
+        frame_bytes = camera_manager.get_camera_frame_jpeg(camera_id)
+
+        if frame_bytes is None:
+            return jsonify({
+                'success': False,
+                'error': 'Failed to capture frame'
+            }), 500
     
-    # Return image
-    return Response(
-        buffer.tobytes(),
+    # Return image; snapshots are live, so never cache them
+    response = Response(
+        frame_bytes,
         mimetype='image/jpeg'
     )
+    response.cache_control.no_store = True
+    return response
 
@@ -3,31 +3,136 @@ Camera Manager Service
 Manages camera instances, connections, and streaming
 """
 
-import sys
+import functools
+from collections import OrderedDict
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any, Union
+import sys
 import threading
-import yaml
-import cv2
-
-# Add parent directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-
-from device_connectivity.camera import CameraDiscovery
-from device_connectivity.camera.webcam import WebcamCamera
-from device_connectivity.camera.tapo.rtsp_camera import TapoRTSPCamera
-from object_detection.src.detector import ObjectDetector
-from object_detection.src.visualizer import Visualizer
-from face_identification import FaceEncoder, FaceIdentifier, FaceDatabase
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+import queue
+import numpy as np
+
+# OpenCV, the camera drivers, YOLO and face_recognition/dlib are imported where
+# they are first used, so importing this module (e.g. for run_blocking) stays cheap
+from api.services.jpeg_encoder import JPEG_QUALITY, encode_jpeg
+from device_connectivity.yaml_cache import load_yaml
+
+# Largest number of frames sent through YOLO in one forward pass
+MAX_DETECTION_BATCH = 16
+
+# Webcams kept open between capture_raw_frame calls on inactive cameras
+WARM_CAMERA_POOL_SIZE = 2
+
+# Seconds an unused warm webcam stays open before its device is released
+WARM_CAMERA_IDLE_TTL = 30.0
+
+# Live frames are downscaled to about this width before face detection
+# (1080p -> 0.25x); smaller frames keep enough pixels for the HOG detector
+FACE_DETECTION_WIDTH = 480
+
+# Side of the grayscale thumbnail compared to spot an unchanged scene, the mean
+# absolute difference (gray levels) below which it counts as unchanged, i.e.
+# above sensor noise, and the oldest face results reused for an unchanged scene
+SCENE_THUMBNAIL_SIZE = 16
+SCENE_CHANGE_THRESHOLD = 3.0
+MAX_FACE_RESULT_AGE = 1.0
+
+# Face box colors (BGR)
+KNOWN_FACE_COLOR = (0, 255, 0)
+UNKNOWN_FACE_COLOR = (0, 0, 255)
+
+# Box columns (top, right, bottom, left) forming each corner's (x, y)
+_BOX_CORNER_COLUMNS = np.array([[3, 0], [1, 0], [1, 2], [3, 2]])
+
+@functools.cache
+def _get_cv2():
+    """Import OpenCV on first use"""
+    import cv2
+    return cv2
+
+
+@functools.lru_cache(maxsize=256)
+def _text_size(label: str):
+    """Cached size of a face label (font, scale and thickness are fixed)"""
+    cv2 = _get_cv2()
+    label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+    return label_size
+
+
+try:
+    import gevent
+    from gevent import monkey as gevent_monkey
+except ImportError:
+    gevent = None
+
+
+def run_blocking(func, *args):
+    """
+    Run a blocking call (camera I/O, inference) without stalling the server.
+    Under gevent monkey-patching the call is moved to gevent's native thread
+    pool so other greenlets keep running; otherwise it is called directly.
+    
+    func then runs on an OS thread, where gevent's patched Event, Queue and
+    Future objects are not safe: it must not wait on or signal them. Do such
+    handoffs in the caller and pass only the blocking work in here.
+    """
+    if gevent is not None and gevent_monkey.is_module_patched('threading'):
+        return gevent.get_hub().threadpool.spawn(func, *args).get()
+    return func(*args)
+
+
+@dataclass
+class CameraInfo:
+    """
+    Description of a discovered camera.
+    Slotted so the camera list stays compact and attribute reads skip dict lookups;
+    both orjson and Flask's fallback provider serialize it like the old dict.
+    """
+    __slots__ = ('id', 'type', 'name', 'index', 'resolution', 'fps', 'available',
+                 'url', 'rtsp_url', 'username', 'password')
+
+    id: int
+    type: str
+    name: str
+    index: Optional[int]
+    resolution: Optional[str]
+    fps: Union[int, str, None]
+    available: bool
+    url: Optional[str]
+    rtsp_url: Optional[str]
+    username: Optional[str]
+    password: Optional[str]
 
 
 class CameraManager:
     """Manages all camera instances and their states"""
 
     def __init__(self):
+        # Encoder pool workers (forkserver/spawn) re-import the launching script
+        # as __mp_main__; a manager built there would open the cameras twice
+        if getattr(sys.modules.get('__main__'), '__name__', None) == '__mp_main__':
+            raise RuntimeError('CameraManager created while a worker process re-imported __main__')
+
         self.available_cameras = []
+        self._cameras_by_id = {}  # {camera_id: camera_info}
         self.active_cameras = {}  # {camera_id: camera_instance}
-        self.camera_locks = {}    # {camera_id: threading.Lock}
+        self.frame_events = {}    # {camera_id: threading.Event} set when a new frame is captured
+        self.annotated_events = {}  # {camera_id: threading.Event} set when a new annotated frame is ready
+        self._latest_raw = {}     # {camera_id: latest captured frame}
+        self._latest_annotated = {}  # {camera_id: latest frame with detections drawn}
+        self._latest_jpeg = {}    # {camera_id: (annotated frame, quality, jpeg bytes)}
+        self._capture_threads = {}  # {camera_id: threading.Thread}
+        self._inference_threads = {}  # {camera_id: threading.Thread}
+        self._stop_events = {}    # {camera_id: threading.Event}
+        self._warm_cameras = OrderedDict()  # {camera_id: (WebcamCamera, last used)} LRU of idle, already-open webcams
+        self._warm_lock = threading.Lock()
+        self._warm_timer = None   # Releases warm webcams once idle for WARM_CAMERA_IDLE_TTL
+        self._det_pool = ThreadPoolExecutor(max_workers=2)  # Object detection + face recognition
+        self._detect_requests = queue.Queue()  # (frame, Future) pairs batched across cameras
+        self._batch_thread = None
         self.detector = None
         self.visualizer = None
         self.object_detection_enabled = False
@@ -35,6 +140,10 @@ class CameraManager:
         self.face_identifier = None
         self.face_database = None
         self.face_recognition_enabled = False
+        self._face_skip = 4              # Run face recognition on every Nth annotated frame
+        self._face_frame_counter = {}    # {camera_id: frames annotated since open}
+        self._last_face_results = {}     # {camera_id: (locations, identifications)}
+        self._face_thumbnails = {}       # {camera_id: (gray thumbnail, monotonic time of that recognition run)}
         self._discover_cameras()
         self._initialize_object_detection()
         self._initialize_face_recognition()
@@ -50,8 +159,7 @@ class CameraManager:
         # Load main config
         if config_path.exists():
             try:
-                with open(config_path, 'r') as f:
-                    config = yaml.safe_load(f)
+                config = load_yaml(config_path)
             except Exception as e:
                 print(f"⚠️  Warning: Could not load config: {e}")
                 return {}
@@ -62,13 +170,12 @@ class CameraManager:
         if not config.get('rtsp', {}).get('url'):
             if credentials_path.exists():
                 try:
-                    with open(credentials_path, 'r') as f:
-                        credentials = yaml.safe_load(f)
-                        if credentials and 'rtsp' in credentials:
-                            if 'rtsp' not in config:
-                                config['rtsp'] = {}
-                            config['rtsp']['url'] = credentials['rtsp']['url']
-                            print("   ✅ Loaded RTSP credentials from credentials.yaml")
+                    credentials = load_yaml(credentials_path)
+                    if credentials and 'rtsp' in credentials:
+                        if 'rtsp' not in config:
+                            config['rtsp'] = {}
+                        config['rtsp']['url'] = credentials['rtsp']['url']
+                        print("   ✅ Loaded RTSP credentials from credentials.yaml")
                 except Exception as e:
                     print(f"⚠️  Warning: Could not load credentials: {e}")
 
@@ -76,6 +183,8 @@ class CameraManager:
 
     def _discover_cameras(self):
         """Discover all available cameras"""
+        from device_connectivity.camera import CameraDiscovery
+
         print("🔍 Discovering cameras...")
 
         # Discover webcams
@@ -90,25 +199,38 @@ class CameraManager:
         # Combine all cameras and assign IDs
         all_cameras = webcams + rtsp_cameras
 
-        # Assign sequential IDs
+        # Assign sequential IDs, storing connection details for RTSP cameras
+        rtsp_config = config.get('rtsp', {})
+        cameras = []
         for idx, cam in enumerate(all_cameras, start=1):
-            cam['id'] = idx
-            # Store additional info for RTSP cameras
-            if cam['type'] == 'rtsp':
-                rtsp_config = config.get('rtsp', {})
-                cam['rtsp_url'] = rtsp_config.get('url', '')
-                cam['username'] = rtsp_config.get('username')
-                cam['password'] = rtsp_config.get('password')
-
-        self.available_cameras = all_cameras
+            is_rtsp = cam['type'] == 'rtsp'
+            cameras.append(CameraInfo(
+                id=idx,
+                type=cam['type'],
+                name=cam['name'],
+                index=cam.get('index'),
+                resolution=cam.get('resolution'),
+                fps=cam.get('fps'),
+                available=cam.get('available', True),
+                url=cam.get('url'),
+                rtsp_url=rtsp_config.get('url', '') if is_rtsp else None,
+                username=rtsp_config.get('username') if is_rtsp else None,
+                password=rtsp_config.get('password') if is_rtsp else None
+            ))
+
+        self.available_cameras = cameras
+        self._cameras_by_id = {cam.id: cam for cam in cameras}
 
         print(f"✅ Found {len(self.available_cameras)} camera(s)")
         for cam in self.available_cameras:
-            print(f"   - {cam['name']} ({cam['type']})")
+            print(f"   - {cam.name} ({cam.type})")
 
     def _initialize_object_detection(self):
         """Initialize YOLO object detection"""
         try:
+            from object_detection.src.detector import ObjectDetector
+            from object_detection.src.visualizer import Visualizer
+
             print("\n🤖 Initializing object detection...")
 
             # Load config
@@ -130,7 +252,12 @@ class CameraManager:
                 # Initialize visualizer
                 display_config = config.get('display', {})
                 self.visualizer = Visualizer(display_config)
+                self.visualizer.precompute(len(self.detector.class_names))
                 self.object_detection_enabled = True
+
+                # Single detection thread batches frames across cameras
+                self._batch_thread = threading.Thread(target=self._batch_detection_loop, daemon=True)
+                self._batch_thread.start()
                 print("   ✅ Object detection initialized successfully")
             else:
                 print("   ⚠️  Failed to load YOLO model, object detection disabled")
@@ -145,6 +272,8 @@ class CameraManager:
     def _initialize_face_recognition(self):
         """Initialize face recognition system"""
         try:
+            from face_identification import FaceEncoder, FaceIdentifier, FaceDatabase
+
             print("\n👤 Initializing face recognition...")
 
             # Initialize database
@@ -166,16 +295,13 @@ class CameraManager:
             self.face_database = None
             self.face_recognition_enabled = False
 
-    def get_all_cameras(self) -> list:
+    def get_all_cameras(self) -> List[CameraInfo]:
         """Get list of all available cameras"""
         return self.available_cameras
     
-    def get_camera_by_id(self, camera_id: int) -> Optional[Dict[str, Any]]:
+    def get_camera_by_id(self, camera_id: int) -> Optional[CameraInfo]:
         """Get camera info by ID"""
-        for camera in self.available_cameras:
-            if camera['id'] == camera_id:
-                return camera
-        return None
+        return self._cameras_by_id.get(camera_id)
     
     def open_camera(self, camera_id: int) -> Dict[str, Any]:
         """Open a camera and start streaming"""
@@ -196,29 +322,55 @@ class CameraManager:
             }
         
         try:
-            # Create camera instance based on type
-            if camera_info['type'] == 'webcam':
-                camera = WebcamCamera(camera_info['index'])
-            elif camera_info['type'] == 'rtsp':
-                camera = TapoRTSPCamera(camera_info['rtsp_url'])
-            else:
-                return {
-                    'success': False,
-                    'error': f'Unknown camera type: {camera_info["type"]}'
-                }
+            # Reuse a webcam left open by capture_raw_frame, it already holds the device
+            with self._warm_lock:
+                camera, _ = self._warm_cameras.pop(camera_id, (None, None))
+
+            if camera is None:
+                # Create camera instance based on type, importing only that backend
+                if camera_info.type == 'webcam':
+                    from device_connectivity.camera.webcam import WebcamCamera
+                    camera = WebcamCamera(camera_info.index)
+                elif camera_info.type == 'rtsp':
+                    from device_connectivity.camera.tapo.rtsp_camera import TapoRTSPCamera
+                    camera = TapoRTSPCamera(camera_info.rtsp_url)
+                else:
+                    return {
+                        'success': False,
+                        'error': f'Unknown camera type: {camera_info.type}'
+                    }
+                
+                # Initialize camera
+                if not camera.initialize():
+                    return {
+                        'success': False,
+                        'error': 'Failed to initialize camera'
+                    }
             
-            # Initialize camera
-            if not camera.initialize():
-                return {
-                    'success': False,
-                    'error': 'Failed to initialize camera'
-                }
-            
-            # Store camera instance and lock
+            # Store camera instance and frame signals
             self.active_cameras[camera_id] = camera
-            self.camera_locks[camera_id] = threading.Lock()
+            self.frame_events[camera_id] = threading.Event()
+            self.annotated_events[camera_id] = threading.Event()
+
+            # Start background capture and inference threads
+            stop_event = threading.Event()
+            capture_thread = threading.Thread(
+                target=self._capture_loop,
+                args=(camera_id, camera, stop_event),
+                daemon=True
+            )
+            inference_thread = threading.Thread(
+                target=self._inference_loop,
+                args=(camera_id, stop_event),
+                daemon=True
+            )
+            self._stop_events[camera_id] = stop_event
+            self._capture_threads[camera_id] = capture_thread
+            self._inference_threads[camera_id] = inference_thread
+            capture_thread.start()
+            inference_thread.start()
             
-            print(f"✅ Opened camera {camera_id}: {camera_info['name']}")
+            print(f"✅ Opened camera {camera_id}: {camera_info.name}")
             
             return {
                 'success': True,
@@ -245,15 +397,36 @@ class CameraManager:
             # Get camera instance
             camera = self.active_cameras[camera_id]
             
+            # Stop capture and inference threads before releasing the device. No
+            # join timeout: a thread still inside a read or an inference would
+            # race the release, and the camera stays in active_cameras until
+            # then so it cannot be reopened with a second pair of threads
+            self._stop_events[camera_id].set()
+            self.frame_events[camera_id].set()  # Wake the inference thread
+            self._capture_threads[camera_id].join()
+            self._inference_threads[camera_id].join()
+            del self._stop_events[camera_id]
+            del self._capture_threads[camera_id]
+            del self._inference_threads[camera_id]
+            
             # Release camera
             camera.release()
             
             # Remove from active cameras
             del self.active_cameras[camera_id]
-            del self.camera_locks[camera_id]
+            self._latest_raw.pop(camera_id, None)
+            self._latest_annotated.pop(camera_id, None)
+            self._latest_jpeg.pop(camera_id, None)
+            self._face_frame_counter.pop(camera_id, None)
+            self._last_face_results.pop(camera_id, None)
+            self._face_thumbnails.pop(camera_id, None)
+            if self.face_identifier:
+                self.face_identifier.reset_tracking(camera_id)
+            self.frame_events.pop(camera_id).set()
+            self.annotated_events.pop(camera_id).set()  # Wake any waiting stream
             
             camera_info = self.get_camera_by_id(camera_id)
-            print(f"✅ Closed camera {camera_id}: {camera_info['name']}")
+            print(f"✅ Closed camera {camera_id}: {camera_info.name}")
             
             return {
                 'success': True,
@@ -268,40 +441,25 @@ class CameraManager:
     
     def capture_raw_frame(self, camera_id: int):
         """Capture a raw frame from camera without any processing"""
-        # If camera is already active, use it
+        # If camera is already active, use the latest captured frame
         if camera_id in self.active_cameras:
-            camera = self.active_cameras[camera_id]
-            lock = self.camera_locks[camera_id]
-            with lock:
-                success, frame = camera.read_frame()
-                if success and frame is not None:
-                    return frame
-                return None
+            frame = self._latest_raw.get(camera_id)
+            frame_event = self.frame_events.get(camera_id)
+            if frame is None and frame_event is not None and frame_event.wait(1.0):
+                frame = self._latest_raw.get(camera_id)
+            return frame.copy() if frame is not None else None
 
         # Otherwise, temporarily open the camera
-        camera_info = next((cam for cam in self.available_cameras if cam['id'] == camera_id), None)
+        camera_info = self.get_camera_by_id(camera_id)
         if not camera_info:
             return None
 
         try:
-            if camera_info['type'] == 'webcam':
-                import cv2
-                cap = cv2.VideoCapture(camera_info['index'])
-                if not cap.isOpened():
-                    return None
-
-                # Read a few frames to let camera adjust
-                for _ in range(5):
-                    cap.read()
-
-                success, frame = cap.read()
-                cap.release()
-
-                if success and frame is not None:
-                    return frame
-            elif camera_info['type'] == 'rtsp':
+            if camera_info.type == 'webcam':
+                return self._read_warm_webcam(camera_id, camera_info)
+            elif camera_info.type == 'rtsp':
                 from device_connectivity.camera.rtsp_camera import RTSPCamera
-                camera = RTSPCamera(camera_info['url'])
+                camera = RTSPCamera(camera_info.url)
                 if camera.connect():
                     success, frame = camera.read_frame()
                     camera.disconnect()
@@ -312,80 +470,314 @@ class CameraManager:
 
         return None
 
+    def _read_warm_webcam(self, camera_id: int, camera_info: CameraInfo):
+        """
+        Read one frame from an inactive webcam, keeping it open for the next call.
+        Only a newly opened webcam pays the exposure warmup reads.
+        """
+        from device_connectivity.camera.webcam import WebcamCamera
+
+        with self._warm_lock:
+            camera, _ = self._warm_cameras.get(camera_id, (None, None))
+            if camera is not None:
+                self._warm_cameras.move_to_end(camera_id)
+            else:
+                camera = WebcamCamera(camera_info.index)
+                if not camera.initialize():
+                    return None
+
+                # Read a few frames to let camera adjust
+                for _ in range(5):
+                    camera.read_frame()
+
+                if len(self._warm_cameras) >= WARM_CAMERA_POOL_SIZE:
+                    _, (evicted, _) = self._warm_cameras.popitem(last=False)
+                    evicted.release()
+
+            success, frame = camera.read_frame()
+            self._warm_cameras[camera_id] = (camera, time.monotonic())
+            if self._warm_timer is None:
+                self._schedule_warm_expiry(WARM_CAMERA_IDLE_TTL)
+
+        if success and frame is not None:
+            return frame
+        return None
+
+    def _schedule_warm_expiry(self, delay: float):
+        """Start the timer that releases idle warm webcams (call with _warm_lock held)"""
+        self._warm_timer = threading.Timer(delay, self._expire_warm_cameras)
+        self._warm_timer.daemon = True
+        self._warm_timer.start()
+
+    def _expire_warm_cameras(self):
+        """Release warm webcams unused for WARM_CAMERA_IDLE_TTL, re-arming for the rest"""
+        with self._warm_lock:
+            now = time.monotonic()
+            expired = [camera_id for camera_id, (_, last_used) in self._warm_cameras.items()
+                       if now - last_used >= WARM_CAMERA_IDLE_TTL]
+            cameras = [self._warm_cameras.pop(camera_id)[0] for camera_id in expired]
+
+            if self._warm_cameras:
+                oldest = min(last_used for _, last_used in self._warm_cameras.values())
+                self._schedule_warm_expiry(oldest + WARM_CAMERA_IDLE_TTL - now)
+            else:
+                self._warm_timer = None
+
+        for camera in cameras:
+            camera.release()
+
+    def _capture_loop(self, camera_id: int, camera, stop_event: threading.Event):
+        """
+        Continuously read frames from a camera and signal waiting consumers.
+        This thread is the camera's only reader, so no lock is needed: each new
+        frame replaces the latest-frame slot with a single reference assignment.
+        """
+        frame_event = self.frame_events[camera_id]
+
+        while not stop_event.is_set():
+            success, frame = run_blocking(camera.read_frame)
+
+            if success and frame is not None:
+                self._latest_raw[camera_id] = frame
+                frame_event.set()
+            else:
+                # Avoid spinning on a camera that is not delivering frames
+                stop_event.wait(0.1)
+
+    def _inference_loop(self, camera_id: int, stop_event: threading.Event):
+        """Annotate the most recent captured frame, skipping frames that arrive mid-inference"""
+        frame_event = self.frame_events[camera_id]
+        annotated_event = self.annotated_events[camera_id]
+
+        while not stop_event.is_set():
+            if not frame_event.wait(1.0):
+                continue
+            frame_event.clear()
+
+            frame = self._latest_raw.get(camera_id)
+            if frame is None or stop_event.is_set():
+                continue
+
+            # Not run_blocking as a whole: it hands frames to the detection
+            # threads through queues and futures, offloading only the heavy steps
+            self._latest_annotated[camera_id] = self._annotate_frame(camera_id, frame)
+            annotated_event.set()
+
+    def wait_for_frame(self, camera_id: int, timeout: float = 1.0) -> bool:
+        """
+        Block until the inference thread publishes a new annotated frame.
+        Intended for a single consumer per camera (the stream broadcaster).
+        """
+        annotated_event = self.annotated_events.get(camera_id)
+        if annotated_event is None:
+            return False
+
+        got_frame = annotated_event.wait(timeout)
+        annotated_event.clear()
+        return got_frame and camera_id in self.active_cameras
+
     def get_camera_frame(self, camera_id: int):
-        """Get current frame from camera with object detection and face recognition"""
+        """Get the latest frame from camera with object detection and face recognition"""
         if camera_id not in self.active_cameras:
             return None
 
-        camera = self.active_cameras[camera_id]
-        lock = self.camera_locks[camera_id]
+        # Wait for the first annotated frame right after the camera is opened
+        if camera_id not in self._latest_annotated:
+            self.wait_for_frame(camera_id)
 
-        with lock:
-            success, frame = camera.read_frame()
-            if success and frame is not None:
-                # Apply object detection if enabled
-                if self.object_detection_enabled and self.detector and self.visualizer:
-                    try:
-                        # Detect objects
-                        detections = self.detector.detect(frame)
-
-                        # Draw detections on frame
-                        if detections:
-                            frame = self.visualizer.draw_detections(
-                                frame,
-                                detections,
-                                self.detector.class_names
-                            )
-                    except Exception as e:
-                        # If detection fails, just return original frame
-                        print(f"⚠️  Detection error: {e}")
-                        pass
-
-                # Apply face recognition if enabled
-                if self.face_recognition_enabled and self.face_encoder and self.face_identifier:
-                    try:
-                        # Detect and identify faces
-                        face_results = self.face_encoder.detect_faces_in_frame(frame)
-
-                        if face_results:
-                            # Extract encodings
-                            encodings = [encoding for encoding, _ in face_results]
-                            locations = [location for _, location in face_results]
-
-                            # Identify faces
-                            identifications = self.face_identifier.identify_faces_in_frame(encodings)
-
-                            # Draw face boxes and names
-                            frame = self._draw_face_identifications(frame, locations, identifications)
-                    except Exception as e:
-                        # If face recognition fails, just continue
-                        print(f"⚠️  Face recognition error: {e}")
-                        pass
-
-                return frame
+        return self._latest_annotated.get(camera_id)
 
-        return None
+    def get_camera_frame_jpeg(self, camera_id: int, quality: int = JPEG_QUALITY) -> Optional[bytes]:
+        """
+        Get the latest annotated frame as JPEG bytes.
+        Each annotated frame is encoded once and reused by every caller.
+        """
+        frame = self.get_camera_frame(camera_id)
+        if frame is None:
+            return None
+
+        cached = self._latest_jpeg.get(camera_id)
+        if cached is not None and cached[0] is frame and cached[1] == quality:
+            return cached[2]
+
+        jpeg_bytes = run_blocking(encode_jpeg, frame, quality)
+        if jpeg_bytes is not None:
+            self._latest_jpeg[camera_id] = (frame, quality, jpeg_bytes)
+
+        return jpeg_bytes
+
+    def _annotate_frame(self, camera_id: int, frame):
+        """
+        Run object detection and face recognition on a raw frame and draw the results.
+        Called from the inference thread; detection, recognition and drawing go
+        through run_blocking, the future handoffs stay on this thread.
+        """
+        # Run object detection and face recognition in parallel on the clean frame;
+        # OpenCV DNN and dlib release the GIL inside their native code
+        detection_future = None
+        face_future = None
+
+        if self.object_detection_enabled and self.detector and self.visualizer:
+            detection_future = self._submit_detection(frame)
+
+        if self.face_recognition_enabled and self.face_encoder and self.face_identifier:
+            # Identities rarely change frame to frame; reuse the last results in between
+            counter = self._face_frame_counter.get(camera_id, 0)
+            self._face_frame_counter[camera_id] = counter + 1
+            if camera_id not in self._last_face_results or (
+                counter % self._face_skip == 0
+                and not run_blocking(self._face_scene_unchanged, camera_id, frame)
+            ):
+                face_future = self._det_pool.submit(run_blocking, self._recognize_faces, camera_id, frame)
+
+        # Draw on a copy so the raw frame stays clean for other consumers;
+        # the copy is only made once there is something to draw
+        raw_frame = frame
+
+        # Apply object detection if enabled
+        if detection_future is not None:
+            try:
+                detections = detection_future.result()
+
+                # Draw detections on frame
+                if len(detections):
+                    frame = run_blocking(
+                        self.visualizer.draw_detections,
+                        frame.copy(),
+                        detections,
+                        self.detector.class_names
+                    )
+            except Exception as e:
+                # If detection fails, just return original frame
+                print(f"⚠️  Detection error: {e}")
+                pass
+
+        # Apply face recognition if enabled
+        if self.face_recognition_enabled and self.face_encoder and self.face_identifier:
+            try:
+                if face_future is not None:
+                    self._last_face_results[camera_id] = face_future.result()
+                locations, identifications = self._last_face_results.get(camera_id, ([], []))
+
+                # Draw face boxes and names
+                if locations:
+                    if frame is raw_frame:
+                        frame = frame.copy()
+                    frame = run_blocking(self._draw_face_identifications, frame, locations, identifications)
+            except Exception as e:
+                # If face recognition fails, just continue
+                print(f"⚠️  Face recognition error: {e}")
+                pass
+
+        return frame
+
+    def _face_scene_unchanged(self, camera_id: int, frame) -> bool:
+        """
+        Whether a frame shows the same scene as the last face recognition run,
+        so its results can be reused. Compares a tiny grayscale thumbnail by
+        mean absolute difference, which averages out sensor noise; results
+        older than MAX_FACE_RESULT_AGE seconds are never reused.
+        """
+        cv2 = _get_cv2()
+        size = (SCENE_THUMBNAIL_SIZE, SCENE_THUMBNAIL_SIZE)
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        thumbnail = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        now = time.monotonic()
+
+        previous = self._face_thumbnails.get(camera_id)
+        if previous is not None and now - previous[1] < MAX_FACE_RESULT_AGE:
+            # Against the thumbnail of the last run, so slow drift still adds up
+            difference = cv2.norm(thumbnail, previous[0], cv2.NORM_L1) / thumbnail.size
+            if difference < SCENE_CHANGE_THRESHOLD:
+                return True
+
+        self._face_thumbnails[camera_id] = (thumbnail, now)
+        return False
+
+    def _submit_detection(self, frame) -> Future:
+        """Queue a frame for the next batched YOLO forward pass"""
+        future = Future()
+        self._detect_requests.put((frame, future))
+        return future
+
+    def _batch_detection_loop(self):
+        """Run YOLO once per batch of frames gathered from all active cameras"""
+        while True:
+            requests = [self._detect_requests.get()]
+
+            # Take whatever else is already waiting, up to the batch limit
+            while len(requests) < MAX_DETECTION_BATCH:
+                try:
+                    requests.append(self._detect_requests.get_nowait())
+                except queue.Empty:
+                    break
+
+            frames = [frame for frame, _ in requests]
+            try:
+                results = run_blocking(self.detector.detect_batch, frames)
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), detections in zip(requests, results):
+                future.set_result(detections)
+
+    def _recognize_faces(self, camera_id: int, frame):
+        """
+        Detect and identify faces in a frame.
+        Faces still overlapping a box from earlier frames keep their identity
+        without being re-encoded.
+
+        Returns:
+            Tuple of (face_locations, identifications)
+        """
+        # Detect on a frame about FACE_DETECTION_WIDTH wide, encode at full resolution
+        detection_scale = min(1.0, FACE_DETECTION_WIDTH / frame.shape[1])
+        rgb_frame = self.face_encoder.prepare_rgb(frame)
+        locations = self.face_encoder.locate_faces(
+            frame, detection_scale=detection_scale, rgb_frame=rgb_frame
+        )
+
+        # Identify faces, encoding only new or stale tracks
+        identifications = self.face_identifier.identify_with_tracking(
+            camera_id, locations,
+            lambda boxes: self.face_encoder.encode_locations(rgb_frame, boxes)
+        )
+
+        return locations, identifications
 
     def _draw_face_identifications(self, frame, face_locations, identifications):
         """Draw face bounding boxes and names on frame"""
-        import cv2
+        cv2 = _get_cv2()
+
+        count = min(len(face_locations), len(identifications))
+        if count == 0:
+            return frame
+
+        # Outline every face with one polylines call per color; (top, right,
+        # bottom, left) boxes become clockwise (x, y) corners from top-left
+        boxes = np.asarray(face_locations[:count], dtype=np.int32).reshape(count, 4)
+        corners = boxes[:, _BOX_CORNER_COLUMNS].reshape(count, 4, 1, 2)
+
+        known = np.fromiter((ident['is_known'] for ident in identifications[:count]), dtype=bool, count=count)
+        for mask, color in ((known, KNOWN_FACE_COLOR), (~known, UNKNOWN_FACE_COLOR)):
+            if mask.any():
+                cv2.polylines(frame, list(corners[mask]), True, color, 2)
 
         for location, identification in zip(face_locations, identifications):
             top, right, bottom, left = location
 
             # Determine color based on whether person is known
             if identification['is_known']:
-                color = (0, 255, 0)  # Green for known faces
+                color = KNOWN_FACE_COLOR
                 label = f"{identification['person_name']} ({identification['confidence']:.1f}%)"
             else:
-                color = (0, 0, 255)  # Red for unknown faces
+                color = UNKNOWN_FACE_COLOR
                 label = "Unknown"
 
-            # Draw rectangle around face
-            cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
-
             # Draw label background
-            label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+            label_size = _text_size(label)
             cv2.rectangle(frame, (left, top - 30), (left + label_size[0], top), color, -1)
 
             # Draw label text
@@ -403,5 +795,14 @@ class CameraManager:
         camera_ids = list(self.active_cameras.keys())
         for camera_id in camera_ids:
             self.close_camera(camera_id)
+
+        # Release webcams kept open for raw captures
+        with self._warm_lock:
+            if self._warm_timer is not None:
+                self._warm_timer.cancel()
+                self._warm_timer = None
+            while self._warm_cameras:
+                _, (camera, _) = self._warm_cameras.popitem(last=False)
+                camera.release()
         print("✅ All cameras closed")
 
@@ -0,0 +1,101 @@
+"""
+Face Encoding Worker Pool
+Runs face detection and encoding for enrollments in separate processes
+"""
+
+import io
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from face_identification import FaceEncoder
+
+# Number of encoder processes
+ENCODER_PROCESSES = os.cpu_count() or 1
+
+# Per-process encoder, created once by the pool initializer
+_encoder = None
+
+_executor = None
+
+
+def _init_worker(model: str):
+    """Load the face encoder once in each worker process"""
+    global _encoder
+    _encoder = FaceEncoder(model=model)
+
+
+def get_executor(model: str = 'hog') -> ProcessPoolExecutor:
+    """Return the shared encoder process pool, creating it on first use"""
+    global _executor
+
+    if _executor is None:
+        # forkserver avoids forking a parent that holds camera threads and sockets
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        _executor = ProcessPoolExecutor(
+            max_workers=ENCODER_PROCESSES,
+            mp_context=multiprocessing.get_context(method),
+            initializer=_init_worker,
+            initargs=(model,)
+        )
+
+    return _executor
+
+
+def decode_image(data):
+    """
+    Decode uploaded image bytes into a BGR frame.
+    Falls back to Pillow for formats OpenCV cannot decode (e.g. GIF).
+    """
+    frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if frame is not None:
+        return frame
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            rgb = np.asarray(image.convert('RGB'))
+        return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+    except Exception:
+        return None
+
+
+def encode_upload(data):
+    """
+    Decode, validate and encode an uploaded image (runs in a worker process).
+
+    Returns:
+        Tuple of (encoding, error_message); encoding is None on failure
+    """
+    frame = decode_image(data)
+    if frame is None:
+        return None, 'Could not read image file'
+
+    # Validate image quality; the detected face is reused for encoding
+    analysis = _encoder.analyze_frame(frame)
+    if not analysis['ok']:
+        return None, analysis['message']
+
+    # Generate face encoding
+    encoding = _encoder.encode_analyzed(analysis)
+    if encoding is None:
+        return None, 'Could not detect face in image'
+
+    return encoding, None
+
+
+def encode_frame(frame, detection_scale: float = 1.0):
+    """
+    Encode a captured camera frame (runs in a worker process).
+
+    Returns:
+        Tuple of (encoding, error_message); encoding is None on failure
+    """
+    encoding, face_location = _encoder.encode_face_from_frame(frame, detection_scale=detection_scale)
+    if encoding is None:
+        return None, 'Could not detect face in camera frame'
+
+    return encoding, None
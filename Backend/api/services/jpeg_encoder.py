@@ -0,0 +1,57 @@
+"""
+JPEG Encoder Service
+Encodes frames with the fastest JPEG encoder available
+"""
+
+import threading
+
+try:
+    from nvjpeg import NvJpeg
+    _nvjpeg = NvJpeg()
+except Exception:
+    # pynvjpeg or an NVIDIA GPU is not available
+    _nvjpeg = None
+
+# Serializes access to the shared GPU encoder across camera threads.
+# Encoding may run on gevent's native thread pool, so use a real OS lock.
+try:
+    from gevent.monkey import get_original
+    _nvjpeg_lock = get_original('_thread', 'allocate_lock')()
+except ImportError:
+    _nvjpeg_lock = threading.Lock()
+
+try:
+    from turbojpeg import TurboJPEG, TJSAMP_420
+    _turbojpeg = TurboJPEG()
+except Exception:
+    # PyTurboJPEG or the libturbojpeg shared library is not available
+    _turbojpeg = None
+
+# JPEG quality used for stream frames and snapshots
+JPEG_QUALITY = 80
+
+
+def encode_jpeg(frame, quality: int = JPEG_QUALITY):
+    """
+    Encode a BGR frame as JPEG bytes
+    Prefers the GPU (nvJPEG), then libjpeg-turbo, then cv2.imencode
+    """
+    if _nvjpeg is not None:
+        try:
+            with _nvjpeg_lock:
+                return bytes(_nvjpeg.encode(frame, quality))
+        except Exception:
+            pass
+
+    if _turbojpeg is not None:
+        try:
+            return _turbojpeg.encode(frame, quality=quality, jpeg_subsample=TJSAMP_420)
+        except Exception:
+            pass
+
+    # OpenCV is only needed when neither accelerated encoder is available
+    import cv2
+    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ret:
+        return None
+    return buffer.tobytes()
@@ -4,11 +4,14 @@ Create a simple test face image using OpenCV
 This creates a basic face-like pattern for testing
 """
 
+import functools
+
 import cv2
 import numpy as np
 
-def create_test_face_image(output_path="test_face.jpg"):
-    """Create a simple test face image"""
+@functools.lru_cache(maxsize=1)
+def _face_template():
+    """Render the face pattern once; callers get a read-only array"""
     
     # Create a blank image (480x640, RGB)
     img = np.ones((480, 640, 3), dtype=np.uint8) * 200  # Light gray background
@@ -37,6 +40,13 @@ def create_test_face_image(output_path="test_face.jpg"):
     # Hair
     cv2.ellipse(img, (320, 140), (130, 80), 0, 0, 180, (60, 40, 20), -1)
     
+    img.setflags(write=False)
+    return img
+
+def create_test_face_image(output_path="test_face.jpg"):
+    """Create a simple test face image"""
+    img = _face_template()
+    
     # Save the image
     cv2.imwrite(output_path, img)
     print(f"✅ Test face image created: {output_path}")
@@ -44,6 +54,20 @@ def create_test_face_image(output_path="test_face.jpg"):
     
     return output_path
 
+def create_test_face_batch(n, noise=8, seed=None):
+    """
+    Create n test face images at once as an (n, 480, 640, 3) uint8 array.
+    Each image is the cached template plus per-pixel noise of up to +/- noise.
+    """
+    template = _face_template()
+    rng = np.random.default_rng(seed)
+    
+    # Perturb the whole batch in one vectorized pass
+    offsets = rng.integers(-noise, noise + 1, size=(n,) + template.shape, dtype=np.int16)
+    batch = np.broadcast_to(template, (n,) + template.shape) + offsets
+    
+    return np.clip(batch, 0, 255).astype(np.uint8)
+
 if __name__ == "__main__":
     create_test_face_image()
 
@@ -5,7 +5,6 @@ Handles connections to various camera types including webcams, IP cameras, and R
 
 from .base import CameraSource
 from .webcam import WebcamCamera
-from .tapo import TapoRTSPCamera
 from .discovery import CameraDiscovery
 from .selector import CameraSelector, select_camera_interactive
 
@@ -18,3 +17,11 @@ __all__ = [
     'select_camera_interactive'
 ]
 
+
+def __getattr__(name):
+    """Import the RTSP backend (and gevent, when installed) on first use"""
+    if name == 'TapoRTSPCamera':
+        from .tapo import TapoRTSPCamera
+        return TapoRTSPCamera
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
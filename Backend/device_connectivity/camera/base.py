@@ -36,6 +36,18 @@ class CameraSource(ABC):
         """
         pass
     
+    @abstractmethod
+    def start_stream(self) -> bool:
+        """
+        Capture continuously on a background thread.
+        read_frame then returns the newest frame instead of blocking on the
+        device, so capture overlaps with processing of the previous frame.
+        
+        Returns:
+            bool: True if the stream is running
+        """
+        pass
+    
     @abstractmethod
     def release(self) -> None:
         """Release camera resources."""
@@ -0,0 +1,110 @@
+"""
+Open Capture Handoff
+Keeps the webcam capture probed during interactive selection open, so the
+camera that is selected next reuses the handle instead of reopening the device.
+
+Only discovery with keep_open=True parks captures. The selector then keeps the
+chosen index and releases the others as soon as the user answers. So a webcam
+is held from its probe until the selection is made; the chosen one is held at
+most PARKED_CAPTURE_TTL seconds longer, until WebcamCamera.initialize() takes it.
+"""
+
+import atexit
+import threading
+import time
+from typing import Any, Optional
+
+# Seconds a parked capture stays open waiting for take_capture()
+PARKED_CAPTURE_TTL = 10.0
+
+# {(index, backend): (cv2.VideoCapture, monotonic deadline)}
+_PARKED = {}
+_PARKED_LOCK = threading.Lock()
+# Wakes the reaper when a capture is parked
+_PARKED_CHANGED = threading.Condition(_PARKED_LOCK)
+_reaper = None
+
+
+def park_capture(index: int, backend: int, capture: Any) -> None:
+    """
+    Hand an open capture over for the next take_capture() of the same device.
+    It is released if nobody takes it within PARKED_CAPTURE_TTL seconds.
+
+    Args:
+        index (int): Camera device index
+        backend (int): OpenCV capture backend the capture was opened with
+        capture: Open cv2.VideoCapture
+    """
+    global _reaper
+
+    key = (index, backend)
+    with _PARKED_LOCK:
+        previous = _PARKED.get(key)
+        _PARKED[key] = (capture, time.monotonic() + PARKED_CAPTURE_TTL)
+        if _reaper is None:
+            _reaper = threading.Thread(target=_reap_expired, daemon=True)
+            _reaper.start()
+        _PARKED_CHANGED.notify()
+
+    if previous is not None and previous[0] is not capture:
+        previous[0].release()
+
+
+def take_capture(index: int, backend: int) -> Optional[Any]:
+    """
+    Take ownership of a parked capture for a device.
+
+    Args:
+        index (int): Camera device index
+        backend (int): OpenCV capture backend
+
+    Returns:
+        cv2.VideoCapture that is still open, or None if the device must be opened
+    """
+    with _PARKED_LOCK:
+        parked = _PARKED.pop((index, backend), None)
+
+    if parked is None:
+        return None
+    if not parked[0].isOpened():
+        parked[0].release()
+        return None
+    return parked[0]
+
+
+def keep_only(index: Optional[int]) -> None:
+    """
+    Release every parked capture except the one for a device index.
+
+    Args:
+        index (int): Index of the selected webcam, or None to release all
+    """
+    with _PARKED_LOCK:
+        dropped = [key for key in _PARKED if key[0] != index]
+        captures = [_PARKED.pop(key)[0] for key in dropped]
+
+    for capture in captures:
+        capture.release()
+
+
+def _reap_expired() -> None:
+    """Release parked captures not taken in time (one thread for all of them)"""
+    while True:
+        with _PARKED_LOCK:
+            now = time.monotonic()
+            expired = [key for key, (_, deadline) in _PARKED.items() if deadline <= now]
+            captures = [_PARKED.pop(key)[0] for key in expired]
+            if not captures:
+                # Sleep until the next deadline, or until something is parked
+                deadlines = [deadline for _, deadline in _PARKED.values()]
+                _PARKED_CHANGED.wait(min(deadlines) - now if deadlines else None)
+                continue
+
+        for capture in captures:
+            capture.release()
+
+
+@atexit.register
+def release_all() -> None:
+    """Release every parked capture"""
+    keep_only(None)
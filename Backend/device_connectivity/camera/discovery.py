@@ -3,12 +3,43 @@ Camera Discovery Utility
 Discovers and lists all available cameras on the system.
 """
 
+import copy
 import cv2
+import os
 import platform
 import subprocess
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any, Optional
 
+from .capture_cache import park_capture
+from .webcam import default_capture_backend
+
+# Camera header in system_profiler output: four-space indent, then "Name:"
+_CAMERA_HEADER_RE = re.compile(r'^    ([A-Z][^:]+):\s*$')
+
+# Section headers that are not camera names
+_EXCLUDED_NAMES = frozenset({'Camera', ''})
+
+# Linux video device node names in /dev, e.g. video0
+_VIDEO_DEVICE_RE = re.compile(r'^video(\d+)$')
+
+# Set to probe every index on macOS even when system_profiler listed the cameras
+_PROBE_ALL_ENV = 'CAMERA_DISCOVERY_PROBE_ALL'
+
+# Seconds a discover_all_cameras result is reused; device lists rarely change faster
+_CACHE_TTL = 5.0
+
+# {(max_webcams, rtsp settings): (monotonic time, cameras)}
+_DISCOVERY_CACHE = {}
+_DISCOVERY_LOCK = threading.Lock()
+
+# Webcam indices that delivered a frame earlier in this process; re-probing
+# them only checks that they still open, skipping the slow first-frame read
+_KNOWN_WORKING = set()
+
 
 class CameraDiscovery:
     """Utility class for discovering available cameras."""
@@ -24,32 +55,33 @@ class CameraDiscovery:
         camera_names = {}
 
         try:
-            # Run system_profiler to get camera information
-            result = subprocess.run(
+            # Stream system_profiler output and pick out the camera headers line by line
+            process = subprocess.Popen(
                 ['system_profiler', 'SPCameraDataType'],
-                capture_output=True,
-                text=True,
-                timeout=5
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True
             )
 
-            if result.returncode == 0:
-                output = result.stdout
+            # Don't hang discovery if system_profiler stalls
+            timer = threading.Timer(5, process.kill)
+            timer.start()
 
-                # Parse camera names from output
+            temp_names = []
+            try:
                 # Format: "    Camera Name:\n      Model ID: ..."
-                camera_sections = re.split(r'\n\s{4}(?=[A-Z])', output)
-
-                temp_names = []
-                for section in camera_sections:
-                    # Look for camera name (first line of section)
-                    lines = section.strip().split('\n')
-                    if lines and ':' in lines[0]:
-                        camera_name = lines[0].split(':')[0].strip()
-
-                        # Clean up the name
-                        if camera_name and camera_name != 'Camera':
+                for line in process.stdout:
+                    match = _CAMERA_HEADER_RE.match(line)
+                    if match:
+                        camera_name = match.group(1).strip()
+                        if camera_name not in _EXCLUDED_NAMES:
                             temp_names.append(camera_name)
+            finally:
+                timer.cancel()
+                process.stdout.close()
+                process.wait()
 
+            if process.returncode == 0:
                 # IMPORTANT: On macOS, system_profiler returns cameras in different order
                 # than OpenCV indices. Testing shows we need to reverse the list.
                 # system_profiler: ['FaceTime HD Camera', 'USB Camera']
@@ -89,12 +121,114 @@ class CameraDiscovery:
             return f"External Camera {index}"
 
     @staticmethod
-    def discover_webcams(max_cameras: int = 10) -> List[Dict[str, Any]]:
+    def _candidate_indices(max_cameras: int, system_names: Dict[int, str]) -> List[int]:
+        """
+        Get the camera indices worth probing.
+        On Linux only indices with a /dev/videoN node can be cameras, and on
+        macOS only as many as system_profiler listed, so the rest are skipped
+        instead of waiting for each open to fail.
+
+        Args:
+            max_cameras (int): Maximum number of camera indices to check
+            system_names (dict): Mapping of index to system camera names (macOS)
+
+        Returns:
+            list: Sorted camera indices below max_cameras
+        """
+        system = platform.system()
+
+        if system == 'Darwin' and system_names and not os.environ.get(_PROBE_ALL_ENV):
+            return list(range(min(max_cameras, len(system_names))))
+
+        if system != 'Linux' or not os.path.isdir('/dev'):
+            return list(range(max_cameras))
+
+        indices = set()
+        with os.scandir('/dev') as entries:
+            for entry in entries:
+                match = _VIDEO_DEVICE_RE.match(entry.name)
+                if match and int(match.group(1)) < max_cameras:
+                    indices.add(int(match.group(1)))
+
+        return sorted(indices)
+
+    @staticmethod
+    def _probe_index(index: int, system_names: Dict[int, str], backend: int,
+                     keep_open: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Check whether a working camera exists at the given index.
+
+        Args:
+            index (int): Camera index to probe
+            system_names (dict): Mapping of index to system camera names
+            backend (int): OpenCV capture backend (cv2.CAP_*)
+            keep_open (bool): Park the working capture for WebcamCamera (see capture_cache)
+
+        Returns:
+            dict: Camera information, or None if no working camera was found
+        """
+        try:
+            # Try to open camera
+            cap = cv2.VideoCapture(index, backend)
+            parked = False
+
+            try:
+                if not cap.isOpened():
+                    _KNOWN_WORKING.discard(index)
+                    return None
+
+                if keep_open:
+                    # Configure like WebcamCamera.initialize() before streaming starts,
+                    # so the parked handle is used as is instead of reconfigured
+                    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+                    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+                # Try to read a frame to verify camera works (once per process)
+                if index not in _KNOWN_WORKING:
+                    ret, frame = cap.read()
+                    if not ret or frame is None:
+                        return None
+                    _KNOWN_WORKING.add(index)
+
+                # Get camera properties
+                width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+                height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                fps = int(cap.get(cv2.CAP_PROP_FPS))
+
+                # Leave the device open for a WebcamCamera opened right after selection
+                if keep_open:
+                    park_capture(index, backend, cap)
+                    parked = True
+            finally:
+                if not parked:
+                    cap.release()
+
+            # Get camera name from system or use fallback
+            camera_name = CameraDiscovery._get_camera_name(index, system_names)
+
+            return {
+                'index': index,
+                'name': camera_name,
+                'type': 'webcam',
+                'resolution': f"{width}x{height}",
+                'fps': fps if fps > 0 else 'Unknown',
+                'available': True
+            }
+
+        except Exception:
+            # Camera not available or error accessing it
+            return None
+
+    @staticmethod
+    def discover_webcams(max_cameras: int = 10, keep_open: bool = False) -> List[Dict[str, Any]]:
         """
         Discover all available webcams/USB cameras on the system.
+        All indices are probed concurrently, since each open can block on the driver.
 
         Args:
             max_cameras (int): Maximum number of camera indices to check
+            keep_open (bool): Park working captures until a selection is made;
+                the caller must then call capture_cache.keep_only()
 
         Returns:
             list: List of dictionaries containing camera information
@@ -108,41 +242,26 @@ class CameraDiscovery:
         if platform.system() == 'Darwin':
             system_names = CameraDiscovery._get_macos_camera_names()
 
-        for index in range(max_cameras):
-            try:
-                # Try to open camera
-                cap = cv2.VideoCapture(index)
-
-                if cap.isOpened():
-                    # Try to read a frame to verify camera works
-                    ret, frame = cap.read()
-
-                    if ret and frame is not None:
-                        # Get camera properties
-                        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                        fps = int(cap.get(cv2.CAP_PROP_FPS))
+        # Use one explicit backend so each index is opened only once
+        backend = default_capture_backend()
 
-                        # Get camera name from system or use fallback
-                        camera_name = CameraDiscovery._get_camera_name(index, system_names)
-
-                        camera_info = {
-                            'index': index,
-                            'name': camera_name,
-                            'type': 'webcam',
-                            'resolution': f"{width}x{height}",
-                            'fps': fps if fps > 0 else 'Unknown',
-                            'available': True
-                        }
+        indices = CameraDiscovery._candidate_indices(max_cameras, system_names)
 
+        if indices:
+            with ThreadPoolExecutor(max_workers=len(indices)) as executor:
+                futures = [
+                    executor.submit(CameraDiscovery._probe_index, index, system_names, backend, keep_open)
+                    for index in indices
+                ]
+                for future in as_completed(futures):
+                    camera_info = future.result()
+                    if camera_info is not None:
                         available_cameras.append(camera_info)
-                        print(f"   ✅ Found: {camera_name} - {width}x{height}")
-
-                    cap.release()
 
-            except Exception:
-                # Camera not available or error accessing it
-                pass
+        # Report in index order once all probes are done
+        available_cameras.sort(key=lambda camera: camera['index'])
+        for camera_info in available_cameras:
+            print(f"   ✅ Found: {camera_info['name']} - {camera_info['resolution']}")
         
         if not available_cameras:
             print("   ⚠️  No webcams found")
@@ -186,27 +305,42 @@ class CameraDiscovery:
         return rtsp_cameras
     
     @staticmethod
-    def discover_all_cameras(config: Dict[str, Any] = None, max_webcams: int = 10) -> List[Dict[str, Any]]:
+    def discover_all_cameras(config: Dict[str, Any] = None, max_webcams: int = 10,
+                             keep_open: bool = False) -> List[Dict[str, Any]]:
         """
         Discover all available cameras (webcams and RTSP).
+        Results are cached for a few seconds, so repeated calls skip re-probing.
         
         Args:
             config (dict): Configuration dictionary
             max_webcams (int): Maximum number of webcam indices to check
+            keep_open (bool): Park probed webcams for the selection (see discover_webcams)
             
         Returns:
             list: List of all available cameras
         """
+        # Only the RTSP section of the config affects the result
+        key = (max_webcams, repr(config.get('rtsp')) if config else None)
+        now = time.monotonic()
+
+        with _DISCOVERY_LOCK:
+            cached = _DISCOVERY_CACHE.get(key)
+            if cached is not None and now - cached[0] < _CACHE_TTL:
+                return copy.deepcopy(cached[1])
+
         all_cameras = []
         
         # Discover webcams
-        webcams = CameraDiscovery.discover_webcams(max_webcams)
+        webcams = CameraDiscovery.discover_webcams(max_webcams, keep_open)
         all_cameras.extend(webcams)
         
         # Load RTSP cameras if config provided
         if config:
             rtsp_cameras = CameraDiscovery.load_rtsp_cameras(config)
             all_cameras.extend(rtsp_cameras)
+
+        with _DISCOVERY_LOCK:
+            _DISCOVERY_CACHE[key] = (time.monotonic(), copy.deepcopy(all_cameras))
         
         return all_cameras
     
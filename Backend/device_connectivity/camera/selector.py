@@ -4,11 +4,17 @@ Interactive menu for selecting camera source.
 """
 
 import sys
-from typing import Dict, Any, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, Any, Optional, Tuple, Union
+from .capture_cache import keep_only
 from .discovery import CameraDiscovery
-from .webcam import WebcamCamera
-from .tapo import TapoRTSPCamera
+from ..yaml_cache import load_yaml
 
+if TYPE_CHECKING:
+    from .webcam import WebcamCamera
+    from .tapo import TapoRTSPCamera
+
+# Inputs that cancel the camera selection
+_QUIT_INPUTS = frozenset({'q', 'quit', 'exit'})
 
 class CameraSelector:
     """Interactive camera selection menu."""
@@ -29,34 +35,40 @@ class CameraSelector:
         print("🎥 Camera Discovery")
         print("="*70)
         
+        # Probed webcams stay open until the selection frees the others
         self.available_cameras = CameraDiscovery.discover_all_cameras(
             config=self.config,
-            max_webcams=10
+            max_webcams=10,
+            keep_open=True
         )
         
         if not self.available_cameras:
-            print("\n❌ No cameras found!")
-            print("\n💡 Troubleshooting:")
-            print("   • Ensure cameras are connected")
-            print("   • Check camera permissions (macOS: System Settings → Privacy → Camera)")
-            print("   • Configure RTSP camera in config/credentials.yaml")
+            sys.stdout.write(
+                "\n❌ No cameras found!\n"
+                "\n💡 Troubleshooting:\n"
+                "   • Ensure cameras are connected\n"
+                "   • Check camera permissions (macOS: System Settings → Privacy → Camera)\n"
+                "   • Configure RTSP camera in config/credentials.yaml\n"
+            )
+            sys.stdout.flush()
             sys.exit(1)
     
     def display_menu(self) -> None:
         """Display camera selection menu."""
-        print("\n" + "="*70)
-        print("📹 Available Cameras")
-        print("="*70)
+        # Built up front and written once; one write per line is slow over SSH
+        lines = ["\n" + "="*70 + "\n", "📹 Available Cameras\n", "="*70 + "\n"]
         
         for i, camera in enumerate(self.available_cameras, 1):
             camera_type = "📹 RTSP" if camera['type'] == 'rtsp' else "🎥 Webcam"
-            print(f"\n{i}. {camera_type} - {camera['name']}")
-            print(f"   Resolution: {camera['resolution']}")
-            print(f"   FPS: {camera['fps']}")
+            lines.append(f"\n{i}. {camera_type} - {camera['name']}\n")
+            lines.append(f"   Resolution: {camera['resolution']}\n")
+            lines.append(f"   FPS: {camera['fps']}\n")
             if camera['type'] == 'webcam':
-                print(f"   Device Index: {camera['index']}")
+                lines.append(f"   Device Index: {camera['index']}\n")
         
-        print("\n" + "="*70)
+        lines.append("\n" + "="*70 + "\n")
+        sys.stdout.write("".join(lines))
+        sys.stdout.flush()
     
     def get_user_selection(self) -> Optional[Dict[str, Any]]:
         """
@@ -65,31 +77,40 @@ class CameraSelector:
         Returns:
             dict: Selected camera information or None if cancelled
         """
+        camera_count = len(self.available_cameras)
+        
         while True:
             try:
-                print(f"\n📌 Select a camera (1-{len(self.available_cameras)}) or 'q' to quit: ", end='')
+                print(f"\n📌 Select a camera (1-{camera_count}) or 'q' to quit: ", end='')
                 user_input = input().strip()
                 
-                if user_input.lower() == 'q':
+                if user_input.lower() in _QUIT_INPUTS:
                     print("\n✅ Cancelled by user")
                     return None
                 
+                # Checked up front rather than letting int() raise on every bad entry
+                if not user_input.isdigit():
+                    print("❌ Invalid input. Please enter a number or 'q' to quit")
+                    continue
+                
                 selection = int(user_input)
                 
-                if 1 <= selection <= len(self.available_cameras):
+                if 1 <= selection <= camera_count:
                     selected_camera = self.available_cameras[selection - 1]
                     print(f"\n✅ Selected: {selected_camera['name']}")
                     return selected_camera
                 else:
-                    print(f"❌ Invalid selection. Please enter a number between 1 and {len(self.available_cameras)}")
+                    print(f"❌ Invalid selection. Please enter a number between 1 and {camera_count}")
                     
             except ValueError:
+                # Digits isdigit() accepts but int() does not (e.g. superscripts)
                 print("❌ Invalid input. Please enter a number or 'q' to quit")
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, EOFError):
+                # EOFError: piped input ran out without a selection
                 print("\n\n✅ Cancelled by user")
                 return None
     
-    def create_camera_instance(self, camera_info: Dict[str, Any]):
+    def create_camera_instance(self, camera_info: Dict[str, Any]) -> Union['WebcamCamera', 'TapoRTSPCamera']:
         """
         Create camera instance based on selection.
         
@@ -99,7 +120,10 @@ class CameraSelector:
         Returns:
             CameraSource: Camera instance (WebcamCamera or TapoRTSPCamera)
         """
+        # Each backend is imported only when it is the one selected
         if camera_info['type'] == 'rtsp':
+            from .tapo import TapoRTSPCamera
+            
             # Create RTSP camera
             rtsp_config = self.config.get('rtsp', {})
             return TapoRTSPCamera(
@@ -110,6 +134,8 @@ class CameraSelector:
                 buffer_size=rtsp_config.get('buffer_size', 1)
             )
         else:
+            from .webcam import WebcamCamera
+            
             # Create webcam camera
             webcam_config = self.config.get('webcam', {})
             return WebcamCamera(
@@ -132,8 +158,9 @@ class CameraSelector:
         # Display menu
         self.display_menu()
         
-        # Get user selection
+        # Get user selection, then free the webcams that were not chosen
         camera_info = self.get_user_selection()
+        keep_only(camera_info['index'] if camera_info and camera_info['type'] == 'webcam' else None)
         
         if camera_info is None:
             return None, None
@@ -160,23 +187,20 @@ def select_camera_interactive(config: Dict[str, Any]) -> Optional[Tuple[Any, Dic
 
 if __name__ == "__main__":
     # Test camera selector
-    import yaml
     from pathlib import Path
     
     # Load config
     config_path = Path(__file__).parent.parent.parent / 'object_detection' / 'config' / 'config.yaml'
     
     try:
-        with open(config_path, 'r') as f:
-            config = yaml.safe_load(f)
+        config = load_yaml(config_path)
         
         # Try to load credentials
         credentials_path = config_path.parent / 'credentials.yaml'
         if credentials_path.exists():
-            with open(credentials_path, 'r') as f:
-                credentials = yaml.safe_load(f)
-                if credentials and 'rtsp' in credentials:
-                    config['rtsp']['url'] = credentials['rtsp']['url']
+            credentials = load_yaml(credentials_path)
+            if credentials and 'rtsp' in credentials:
+                config['rtsp']['url'] = credentials['rtsp']['url']
         
         # Run selector
         camera, info = select_camera_interactive(config)
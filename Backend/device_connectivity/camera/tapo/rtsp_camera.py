@@ -4,11 +4,45 @@ Handles connection to TP-Link Tapo IP cameras via RTSP streams.
 """
 
 import cv2
+import os
+import sys
 import time
 from typing import Tuple, Optional, Dict, Any
 import numpy as np
 from ..base import CameraSource
 
+# Low-latency FFMPEG demuxing for RTSP: TCP transport, no input buffering or
+# frame reordering. OpenCV reads this each time a capture is opened; a value
+# already set in the environment takes precedence.
+os.environ.setdefault(
+    'OPENCV_FFMPEG_CAPTURE_OPTIONS',
+    'rtsp_transport;tcp|fflags;nobuffer|flags;low_delay|reorder_queue_size;0'
+)
+
+# The reader must be a real OS thread even when gevent has patched threading,
+# otherwise a blocking capture.read() would stall every greenlet
+try:
+    from gevent.monkey import get_original
+    _start_thread, _allocate_lock = get_original('_thread', ['start_new_thread', 'allocate_lock'])
+except ImportError:
+    from _thread import start_new_thread as _start_thread, allocate_lock as _allocate_lock
+
+# Seconds read_frame waits for a new frame before returning the last one again
+FRAME_WAIT_TIMEOUT = 1.0
+
+# Number of frame buffers the reader recycles instead of allocating per frame
+FRAME_POOL_SIZE = 3
+
+
+def _slot_refcount(pool, index):
+    """Reference count of pool[index], as seen from this function"""
+    return sys.getrefcount(pool[index])
+
+
+# Count for an object referenced only by its pool slot; measured rather than
+# hard-coded so it holds across interpreter versions
+_UNSHARED_REFCOUNT = _slot_refcount([object()], 0)
+
 
 class TapoRTSPCamera(CameraSource):
     """Handles Tapo IP camera RTSP stream connection and frame capture."""
@@ -41,10 +75,35 @@ class TapoRTSPCamera(CameraSource):
         self._last_frame = None
         self._frame_count = 0
         self._connection_errors = 0
+        self._running = False
+        self._new_frame = _allocate_lock()    # Unlocked while an unread frame is waiting
+        self._reader_done = _allocate_lock()  # Held by the reader thread while it runs
+        self._frame_pool = [None] * FRAME_POOL_SIZE  # Decode targets, filled on first use
+        self._pool_index = 0
         
     def initialize(self) -> bool:
         """
-        Initialize the RTSP camera connection.
+        Initialize the RTSP camera connection and start the background reader.
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        # A reader that outlived release()'s timeout still owns self.capture and
+        # releases it on exit; wait for it before connecting a new one
+        self._reader_done.acquire()
+        if not self._connect():
+            self._reader_done.release()
+            return False
+        
+        # The reader thread drains the stream and keeps only the latest frame
+        self._new_frame.acquire(False)
+        self._running = True
+        _start_thread(self._reader_loop, ())
+        return True
+    
+    def _connect(self) -> bool:
+        """
+        Open the RTSP stream, retrying on failure.
         
         Returns:
             bool: True if successful, False otherwise
@@ -69,8 +128,14 @@ class TapoRTSPCamera(CameraSource):
             try:
                 print(f"   🔄 Connection attempt {attempt}/{self.reconnect_attempts}...")
                 
-                # Create VideoCapture with RTSP URL
-                self.capture = cv2.VideoCapture(self.rtsp_url, cv2.CAP_FFMPEG)
+                # Create VideoCapture with RTSP URL, decoding on the GPU/VAAPI when available
+                if hasattr(cv2, 'CAP_PROP_HW_ACCELERATION'):
+                    self.capture = cv2.VideoCapture(self.rtsp_url, cv2.CAP_FFMPEG, [
+                        cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY
+                    ])
+                else:
+                    # OpenCV < 4.5.2 has no hardware decode option
+                    self.capture = cv2.VideoCapture(self.rtsp_url, cv2.CAP_FFMPEG)
                 
                 # Set buffer size (smaller = more recent frames, less lag)
                 self.capture.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
@@ -88,6 +153,8 @@ class TapoRTSPCamera(CameraSource):
                 if not success or frame is None:
                     raise IOError("Failed to read frame from RTSP stream")
                 
+                self._last_frame = frame
+                
                 # Get stream properties
                 width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
                 height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
@@ -97,6 +164,15 @@ class TapoRTSPCamera(CameraSource):
                 print(f"   📐 Resolution: {width}x{height}")
                 print(f"   🎬 FPS: {fps if fps > 0 else 'Unknown'}")
                 
+                # Stream properties don't change while connected, so query them once
+                self._properties = {
+                    'width': width,
+                    'height': height,
+                    'fps': fps,
+                    'backend': 'FFMPEG',
+                    'source_type': 'RTSP',
+                }
+                
                 self.is_initialized = True
                 self._connection_errors = 0
                 return True
@@ -118,66 +194,144 @@ class TapoRTSPCamera(CameraSource):
         
         return False
     
-    def read_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
+    def _reader_loop(self) -> None:
+        """
+        Read frames continuously, publishing only the most recent one.
+        grab() advances the stream; the BGR conversion in retrieve() is skipped
+        for up to buffer_size frames in a row while the consumer has not yet
+        taken the previous frame, since it would likely be overwritten unread.
+        """
+        skipped = 0
+        try:
+            while self._running:
+                try:
+                    success = self.capture.grab()
+                    frame = None
+                    
+                    if success:
+                        if self._new_frame.locked() or skipped >= self.buffer_size:
+                            success, frame = self._retrieve_pooled()
+                            skipped = 0
+                        else:
+                            skipped += 1
+                            self._connection_errors = 0
+                            continue
+                except Exception as e:
+                    print(f"   ❌ Error reading frame: {e}")
+                    success, frame = False, None
+                
+                if not success or frame is None:
+                    self._connection_errors += 1
+                    
+                    # Attempt reconnection if multiple consecutive errors
+                    if self._connection_errors >= 5 and self._running:
+                        print(f"\n   ⚠️  Multiple frame read failures detected")
+                        print(f"   🔄 Attempting to reconnect...")
+                        
+                        self.capture.release()
+                        self.capture = None
+                        if self._connect():
+                            print(f"   ✅ Reconnection successful")
+                        else:
+                            print(f"   ❌ Reconnection failed")
+                            self.is_initialized = False
+                            break
+                    continue
+                
+                # Reset error counter on successful read
+                self._connection_errors = 0
+                self._frame_count += 1
+                
+                # Publish by reference (no flip for RTSP - already correct orientation).
+                # Marked read-only so a consumer modifying the shared frame fails loudly.
+                frame.setflags(write=False)
+                self._last_frame = frame
+                try:
+                    self._new_frame.release()
+                except RuntimeError:
+                    pass  # Previous frame was never read; the consumer gets this one instead
+        finally:
+            # The reader owns the capture once started, so it is the one to release it
+            if self.capture is not None:
+                self.capture.release()
+                self.capture = None
+            self._running = False
+            self._reader_done.release()
+    
+    def _retrieve_pooled(self) -> Tuple[bool, Optional[np.ndarray]]:
         """
-        Read a frame from the RTSP stream.
+        Decode the grabbed frame into a recycled buffer when possible.
+        A buffer is only reused once nothing else (consumers, the published
+        latest frame, views of it) still references it; otherwise OpenCV
+        allocates a fresh one, which then joins the pool.
+        """
+        index = self._pool_index
+        self._pool_index = (index + 1) % FRAME_POOL_SIZE
+        
+        if self._frame_pool[index] is not None and _slot_refcount(self._frame_pool, index) <= _UNSHARED_REFCOUNT:
+            # Published frames are read-only; make the recycled buffer writable for OpenCV again
+            self._frame_pool[index].setflags(write=True)
+            success, frame = self.capture.retrieve(self._frame_pool[index])
+        else:
+            success, frame = self.capture.retrieve()
+        
+        # Keep whatever OpenCV decoded into (new array if the size changed)
+        self._frame_pool[index] = frame if success else None
+        return success, frame
+    
+    def read_frame(self, copy: bool = False) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Get the latest frame from the RTSP stream.
+        Waits briefly for a frame newer than the last one returned; frames the
+        caller was too slow to read are dropped rather than queued.
+        
+        The frame is shared, not copied: the same array may be returned again
+        while the stream is stalled, so it is read-only. Pass copy=True, or
+        copy it yourself, to get a private array that can be drawn on.
+        
+        Args:
+            copy (bool): Return a private copy of the frame
         
         Returns:
             tuple: (success, frame) where success is bool and frame is numpy array
         """
-        if not self.is_initialized or self.capture is None:
+        if not self.is_initialized:
             return False, None
         
-        try:
-            success, frame = self.capture.read()
-            
-            if not success or frame is None:
-                self._connection_errors += 1
-                
-                # Attempt reconnection if multiple consecutive errors
-                if self._connection_errors >= 5:
-                    print(f"\n   ⚠️  Multiple frame read failures detected")
-                    print(f"   🔄 Attempting to reconnect...")
-                    
-                    self.release()
-                    if self.initialize():
-                        print(f"   ✅ Reconnection successful")
-                        return self.capture.read()
-                    else:
-                        print(f"   ❌ Reconnection failed")
-                        return False, None
-                
-                # Return last known good frame if available
-                if self._last_frame is not None:
-                    return True, self._last_frame.copy()
-                
-                return False, None
-            
-            # Reset error counter on successful read
-            self._connection_errors = 0
-            self._frame_count += 1
-
-            # Store as last good frame (no flip for RTSP - already correct orientation)
-            self._last_frame = frame.copy()
-
-            return True, frame
-            
-        except Exception as e:
-            print(f"   ❌ Error reading frame: {e}")
-            self._connection_errors += 1
-            
-            # Return last known good frame if available
-            if self._last_frame is not None:
-                return True, self._last_frame.copy()
-            
+        # On timeout fall back to the last known good frame, if available
+        self._new_frame.acquire(timeout=FRAME_WAIT_TIMEOUT)
+        frame = self._last_frame
+        
+        if not self.is_initialized or frame is None:
             return False, None
+        
+        return True, frame.copy() if copy else frame
+    
+    def start_stream(self) -> bool:
+        """
+        The reader thread already streams from initialize(); nothing to start.
+        
+        Returns:
+            bool: True if the stream is running
+        """
+        return self._running
     
     def release(self) -> None:
         """Release RTSP camera resources."""
-        if self.capture is not None:
+        if self._running:
+            # Stop the reader, which releases the capture on its way out
+            self._running = False
+            if self._reader_done.acquire(timeout=self.timeout):
+                self._reader_done.release()
+            self.is_initialized = False
+            self._properties = {}
+            print("   📹 RTSP camera connection closed")
+        elif self.capture is not None and not self._reader_done.locked():
+            # Never connected a reader (or it has exited); otherwise the capture is the reader's
             self.capture.release()
             self.capture = None
             self.is_initialized = False
+            self._properties = {}
             print("   📹 RTSP camera connection closed")
     
     def get_properties(self) -> Dict[str, Any]:
@@ -187,17 +341,13 @@ class TapoRTSPCamera(CameraSource):
         Returns:
             dict: Camera properties
         """
-        if not self.is_initialized or self.capture is None:
+        if not self.is_initialized or not self._properties:
             return {}
         
         return {
-            'width': int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
-            'height': int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
-            'fps': int(self.capture.get(cv2.CAP_PROP_FPS)),
+            **self._properties,
             'frame_count': self._frame_count,
             'connection_errors': self._connection_errors,
-            'backend': 'FFMPEG',
-            'source_type': 'RTSP',
         }
     
     def _print_troubleshooting(self) -> None:
@@ -4,10 +4,51 @@ Handles connection to local webcams/USB cameras.
 """
 
 import cv2
+import functools
 import platform
+import threading
+import time
+from collections import deque
 from typing import Tuple, Optional, Dict, Any
 import numpy as np
 from .base import CameraSource
+from .capture_cache import take_capture
+
+# A grab returning faster than this came from the driver's buffer, not the sensor
+BUFFERED_GRAB_SECONDS = 0.002
+
+# Most buffered frames skipped per read, so a source that never blocks
+# (e.g. a video file) still returns
+MAX_STALE_GRABS = 8
+
+# Reader thread backoff after failed reads: grows by READ_RETRY_DELAY per
+# failure in a row, up to MAX_READ_RETRY_DELAY seconds
+READ_RETRY_DELAY = 0.02
+MAX_READ_RETRY_DELAY = 0.5
+
+# Capture properties resolved once from the cv2 module
+_PROP_WIDTH = cv2.CAP_PROP_FRAME_WIDTH
+_PROP_HEIGHT = cv2.CAP_PROP_FRAME_HEIGHT
+_PROP_FPS = cv2.CAP_PROP_FPS
+_PROP_BRIGHTNESS = cv2.CAP_PROP_BRIGHTNESS
+_PROP_CONTRAST = cv2.CAP_PROP_CONTRAST
+
+
+@functools.cache
+def default_capture_backend() -> int:
+    """
+    Native OpenCV capture backend for this platform.
+    Naming it explicitly stops OpenCV from trying every backend (e.g. V4L2
+    and then GStreamer on Linux) for each device it opens.
+    """
+    system = platform.system()
+    if system == 'Darwin':
+        return cv2.CAP_AVFOUNDATION
+    if system == 'Linux':
+        return cv2.CAP_V4L2
+    if system == 'Windows':
+        return cv2.CAP_DSHOW
+    return cv2.CAP_ANY
 
 
 class WebcamCamera(CameraSource):
@@ -18,7 +59,8 @@ class WebcamCamera(CameraSource):
         camera_index: int = 0,
         width: int = 0,
         height: int = 0,
-        fps: int = 0
+        fps: int = 0,
+        drop_stale: bool = True
     ):
         """
         Initialize webcam camera handler.
@@ -28,14 +70,23 @@ class WebcamCamera(CameraSource):
             width (int): Desired frame width (0 for default)
             height (int): Desired frame height (0 for default)
             fps (int): Desired FPS (0 for default)
+            drop_stale (bool): Skip frames the driver buffered since the last
+                read without decoding them, so reads return the newest frame
         """
         super().__init__()
         self.camera_index = camera_index
         self.width = width
         self.height = height
         self.fps = fps
+        self.drop_stale = drop_stale
         self.capture = None
         
+        # Background reader state (see start_stream)
+        self._frames = deque(maxlen=2)
+        self._frame_ready = threading.Event()
+        self._running = False
+        self._reader = None
+        
     def initialize(self) -> bool:
         """
         Initialize the webcam.
@@ -46,23 +97,40 @@ class WebcamCamera(CameraSource):
         try:
             print(f"\n🎥 Initializing webcam (index: {self.camera_index})...")
             
-            self.capture = cv2.VideoCapture(self.camera_index)
+            # Reuse the handle the selection just probed, if any, instead of
+            # reopening the device; it is already set up for MJPG with one buffer
+            backend = default_capture_backend()
+            self.capture = take_capture(self.camera_index, backend)
+            if self.capture is not None and not self._matches_requested(self.capture):
+                # Changing the format of a streaming capture is unreliable; start over
+                self.capture.release()
+                self.capture = None
+            reused = self.capture is not None
+            if not reused:
+                self.capture = cv2.VideoCapture(self.camera_index, backend)
             
             if not self.capture.isOpened():
                 raise IOError(f"Cannot access camera at index {self.camera_index}")
             
-            # Set camera properties if specified
-            if self.width > 0:
-                self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
-            if self.height > 0:
-                self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
-            if self.fps > 0:
-                self.capture.set(cv2.CAP_PROP_FPS, self.fps)
+            if not reused:
+                # Ask for MJPG before the resolution: raw YUYV caps USB webcams at low
+                # FPS at high resolutions, and JPEG decoding is cheaper than YUYV conversion
+                self.capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+                # Keep a single buffered frame so reads are never stale
+                self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                
+                # Set camera properties if specified
+                if self.width > 0:
+                    self.capture.set(_PROP_WIDTH, self.width)
+                if self.height > 0:
+                    self.capture.set(_PROP_HEIGHT, self.height)
+                if self.fps > 0:
+                    self.capture.set(_PROP_FPS, self.fps)
             
             # Get actual camera properties
-            actual_width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
-            actual_height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            actual_fps = int(self.capture.get(cv2.CAP_PROP_FPS))
+            actual_width = int(self.capture.get(_PROP_WIDTH))
+            actual_height = int(self.capture.get(_PROP_HEIGHT))
+            actual_fps = int(self.capture.get(_PROP_FPS))
             
             print(f"   ✅ Webcam initialized successfully")
             print(f"   📐 Resolution: {actual_width}x{actual_height}")
@@ -82,6 +150,13 @@ class WebcamCamera(CameraSource):
             
             return False
     
+    def _matches_requested(self, capture) -> bool:
+        """Whether an open capture already delivers the requested width, height and FPS"""
+        for prop, wanted in ((_PROP_WIDTH, self.width), (_PROP_HEIGHT, self.height), (_PROP_FPS, self.fps)):
+            if wanted > 0 and int(capture.get(prop)) != wanted:
+                return False
+        return True
+    
     def read_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
         """
         Read a frame from the webcam.
@@ -92,18 +167,93 @@ class WebcamCamera(CameraSource):
         if not self.is_initialized or self.capture is None:
             return False, None
         
-        success, frame = self.capture.read()
+        if self._reader is None:
+            return self._capture_frame()
         
-        # Flip frame horizontally to fix mirroring (makes it look natural like a mirror)
+        # Take the newest frame from the reader thread; older ones are stale
+        if not self._frame_ready.wait(timeout=1.0):
+            return False, None
+        self._frame_ready.clear()
+        try:
+            return self._frames.pop()
+        except IndexError:
+            return False, None
+    
+    def _capture_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Grab one frame from the device and mirror it"""
+        if self.drop_stale and self._reader is None:
+            # Polled reads can be far apart; skip the backlog and decode only the newest frame
+            success = self._grab_latest()
+            frame = self.capture.retrieve()[1] if success else None
+        else:
+            success, frame = self.capture.read()
+        
+        # Flip frame horizontally to fix mirroring (makes it look natural like a mirror);
+        # cv2.flip keeps frames contiguous for the accelerated JPEG encoders
         if success and frame is not None:
             frame = cv2.flip(frame, 1)
         
         return success, frame
     
+    def _grab_latest(self) -> bool:
+        """
+        Grab (without decoding) until a grab has to wait for the device.
+        
+        Returns:
+            bool: True if the last grab succeeded; retrieve() then decodes it
+        """
+        for _ in range(MAX_STALE_GRABS):
+            start = time.monotonic()
+            if not self.capture.grab():
+                return False
+            if time.monotonic() - start > BUFFERED_GRAB_SECONDS:
+                break
+        return True
+    
+    def _reader_loop(self) -> None:
+        """Keep the newest captured frames ready for read_frame"""
+        failures = 0
+        while self._running:
+            # Bounded buffer: when the consumer falls behind, the oldest frame is dropped
+            result = self._capture_frame()
+            self._frames.append(result)
+            self._frame_ready.set()
+            
+            if result[0]:
+                failures = 0
+            else:
+                # Back off on a device that stopped delivering instead of spinning
+                failures += 1
+                time.sleep(min(READ_RETRY_DELAY * failures, MAX_READ_RETRY_DELAY))
+    
+    def start_stream(self) -> bool:
+        """
+        Capture on a background thread so read_frame does not wait on the device.
+        
+        Returns:
+            bool: True if the stream is running
+        """
+        if not self.is_initialized or self.capture is None:
+            return False
+        
+        if self._reader is None:
+            self._running = True
+            self._reader = threading.Thread(target=self._reader_loop, daemon=True)
+            self._reader.start()
+        return True
+    
     def release(self) -> None:
         """Release webcam resources."""
+        if self._reader is not None:
+            # Wait for the reader to leave read()/grab() before the capture is freed
+            self._running = False
+            self._reader.join()
+            self._reader = None
+            self._frames.clear()
+        
         if self.capture is not None:
             self.capture.release()
+            self.capture = None
             self.is_initialized = False
             print("   🎥 Webcam released")
     
@@ -117,12 +267,13 @@ class WebcamCamera(CameraSource):
         if not self.is_initialized or self.capture is None:
             return {}
         
+        get = self.capture.get
         return {
-            'width': int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
-            'height': int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
-            'fps': int(self.capture.get(cv2.CAP_PROP_FPS)),
-            'brightness': self.capture.get(cv2.CAP_PROP_BRIGHTNESS),
-            'contrast': self.capture.get(cv2.CAP_PROP_CONTRAST),
+            'width': int(get(_PROP_WIDTH)),
+            'height': int(get(_PROP_HEIGHT)),
+            'fps': int(get(_PROP_FPS)),
+            'brightness': get(_PROP_BRIGHTNESS),
+            'contrast': get(_PROP_CONTRAST),
             'source_type': 'Webcam',
         }
 
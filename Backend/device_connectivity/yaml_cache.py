@@ -0,0 +1,46 @@
+"""
+Cached YAML Loading
+Parses config files once and re-parses them only after they change.
+"""
+
+import copy
+import threading
+from pathlib import Path
+from typing import Any, Union
+
+import yaml
+
+# libyaml C parser when PyYAML was built with it, pure-Python otherwise
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Parsed YAML files keyed by path: {path: (st_mtime_ns, st_size, data)}
+_YAML_CACHE = {}
+_YAML_CACHE_LOCK = threading.Lock()
+
+
+def load_yaml(path: Union[str, Path]) -> Any:
+    """
+    Load a YAML file, re-parsing only when its mtime or size changed.
+    Returns a deep copy so callers can mutate the result freely.
+
+    Args:
+        path: YAML file to load
+
+    Returns:
+        The parsed document (None for an empty file)
+    """
+    path = Path(path)
+    stat = path.stat()
+    key = str(path)
+
+    with _YAML_CACHE_LOCK:
+        cached = _YAML_CACHE.get(key)
+
+    if cached is None or cached[0] != stat.st_mtime_ns or cached[1] != stat.st_size:
+        with open(path, 'r') as f:
+            data = yaml.load(f, Loader=_YAML_LOADER)
+        cached = (stat.st_mtime_ns, stat.st_size, data)
+        with _YAML_CACHE_LOCK:
+            _YAML_CACHE[key] = cached
+
+    return copy.deepcopy(cached[2])
@@ -3,11 +3,33 @@ Face Recognition Module for Smart Home Automation
 
 This module provides face enrollment, encoding, and identification capabilities
 for recognizing people in camera feeds.
+
+Classes are imported on first access, so importing just FaceDatabase does not
+load face_recognition/dlib.
 """
 
-from .face_encoder import FaceEncoder
-from .face_identifier import FaceIdentifier
-from .database import FaceDatabase
+import importlib
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    'FaceEncoder': '.face_encoder',
+    'FaceIdentifier': '.face_identifier',
+    'FaceDatabase': '.database',
+}
 
 __all__ = ['FaceEncoder', 'FaceIdentifier', 'FaceDatabase']
 
+
+def __getattr__(name):
+    """Import the submodule defining name on first use (PEP 562)"""
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
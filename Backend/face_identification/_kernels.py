@@ -0,0 +1,232 @@
+"""
+Numeric kernels for face matching.
+Uses Numba-compiled loops when Numba is installed, otherwise NumPy.
+Large galleries can be searched through an hnswlib index when installed.
+"""
+
+import threading
+import numpy as np
+from typing import Tuple
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    HNSWLIB_AVAILABLE = False
+
+# dlib face descriptors are always this long; Numba freezes module globals
+# at compile time, so the kernel's inner loop has a constant trip count
+ENCODING_DIM = 128
+
+# Per-thread scratch buffers for squared_distances, grown on demand
+_scratch = threading.local()
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _nearest_numba(known, probe):
+        n = known.shape[0]
+        distances = np.empty(n, dtype=np.float64)
+
+        # Squared L2 distance to every known encoding, rows in parallel;
+        # the fixed 128-wide inner loop is fully unrolled into SIMD FMAs
+        for i in prange(n):
+            total = np.float32(0.0)
+            for j in range(ENCODING_DIM):
+                diff = known[i, j] - probe[j]
+                total += diff * diff
+            distances[i] = total
+
+        best = 0
+        for i in range(1, n):
+            if distances[i] < distances[best]:
+                best = i
+
+        return best, np.sqrt(distances[best])
+
+
+def squared_distances(known: np.ndarray, probe: np.ndarray) -> np.ndarray:
+    """
+    Squared L2 distance from a probe to every known encoding, without allocating.
+
+    The result is a view into a buffer owned by the calling thread and is
+    overwritten by its next call; copy it if it has to outlive that.
+
+    Args:
+        known: (N, 128) float32 matrix of known encodings
+        probe: 128-dimensional encoding
+
+    Returns:
+        (N,) float32 array of squared distances
+    """
+    n, dim = known.shape
+    diffs = getattr(_scratch, 'diffs', None)
+    if diffs is None or diffs.shape[0] < n or diffs.shape[1] != dim:
+        # Grow geometrically so a slowly growing gallery does not reallocate every call
+        rows = max(n, 2 * (0 if diffs is None else diffs.shape[0]), 64)
+        diffs = _scratch.diffs = np.empty((rows, dim), dtype=np.float32)
+        _scratch.squared = np.empty(rows, dtype=np.float32)
+
+    out = diffs[:n]
+    squared = _scratch.squared[:n]
+    np.subtract(known, probe, out=out, casting='unsafe')
+    np.einsum('ij,ij->i', out, out, out=squared)
+    return squared
+
+
+def nearest(known: np.ndarray, probe: np.ndarray,
+            known_sq_norms: np.ndarray = None) -> Tuple[int, float]:
+    """
+    Find the known encoding closest to a probe encoding.
+
+    Args:
+        known: (N, 128) matrix of known encodings (N >= 1)
+        probe: 128-dimensional encoding
+        known_sq_norms: Optional (N,) squared L2 norms of the known rows;
+            lets the NumPy path use one matrix-vector product
+
+    Returns:
+        Tuple of (index, euclidean_distance)
+    """
+    if NUMBA_AVAILABLE and known.shape[1] == ENCODING_DIM:
+        index, distance = _nearest_numba(known, probe)
+        return int(index), float(distance)
+
+    if known_sq_norms is not None:
+        # ||k - p||^2 = ||k||^2 - 2 k.p + ||p||^2; ||p||^2 is constant, so rank by the rest
+        scores = known_sq_norms - 2.0 * (known @ probe)
+        index = int(np.argmin(scores))
+        return index, float(np.sqrt(max(scores[index] + np.dot(probe, probe), 0.0)))
+
+    squared = squared_distances(known, probe)
+    index = int(np.argmin(squared))
+    return index, float(np.sqrt(squared[index]))
+
+
+def nearest_batch(known: np.ndarray, known_sq_norms: np.ndarray,
+                  probes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the closest known encoding for several probes with one matrix product.
+
+    Args:
+        known: (N, 128) matrix of known encodings (N >= 1)
+        known_sq_norms: (N,) squared L2 norms of the known rows
+        probes: (M, 128) matrix of probe encodings
+
+    Returns:
+        Tuple of (indices, euclidean_distances), one entry per probe
+    """
+    # ||k - p||^2 = ||k||^2 + ||p||^2 - 2 k.p, all pairs in a single GEMM
+    probe_sq_norms = np.einsum('ij,ij->i', probes, probes)
+    distances = known_sq_norms[np.newaxis, :] - 2.0 * (probes @ known.T)
+    distances += probe_sq_norms[:, np.newaxis]
+
+    indices = np.argmin(distances, axis=1)
+    best = distances[np.arange(len(indices)), indices]
+
+    # Rounding can push near-identical pairs slightly below zero
+    return indices, np.sqrt(np.maximum(best, 0.0))
+
+
+def quantize_int8(matrix: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize encodings and quantize them to int8.
+
+    Args:
+        matrix: (N, 128) matrix of encodings
+
+    Returns:
+        (N, 128) int8 matrix scaled so unit vectors span [-127, 127]
+    """
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.round(matrix / norms * 127).astype(np.int8)
+
+
+def shortlist_int8(known_q: np.ndarray, probe_q: np.ndarray, k: int) -> np.ndarray:
+    """
+    Select the k known encodings with the highest int8 cosine similarity.
+
+    Args:
+        known_q: (N, 128) int8 quantized encodings
+        probe_q: 128-dimensional int8 quantized probe
+        k: Number of candidates to keep
+
+    Returns:
+        Array of candidate row indices (unordered)
+    """
+    # Accumulate in int32 without materializing an upcast copy of the gallery
+    scores = np.einsum('ij,j->i', known_q, probe_q, dtype=np.int32)
+    k = min(k, len(scores))
+    return np.argpartition(-scores, k - 1)[:k]
+
+
+class AnnIndex:
+    """
+    Approximate nearest-neighbour index over gallery rows (hnswlib HNSW graph).
+
+    Labels are gallery row indices, so results can be re-ranked exactly
+    against the float32 matrix. Queries may run concurrently with add().
+    """
+
+    def __init__(self, matrix: np.ndarray, ef_construction: int = 200, m: int = 16, ef: int = 64):
+        """
+        Build the index.
+
+        Args:
+            matrix: (N, 128) float32 gallery matrix
+            ef_construction: Graph build quality
+            m: Graph out-degree
+            ef: Search breadth (higher = better recall, slower)
+        """
+        self._ef = ef
+        # Leave room so enrollments do not trigger a resize right away
+        self._index = hnswlib.Index(space='l2', dim=matrix.shape[1])
+        self._index.init_index(max_elements=max(2 * len(matrix), 1024),
+                               ef_construction=ef_construction, M=m)
+        if len(matrix):
+            self._index.add_items(matrix, np.arange(len(matrix)))
+        self._index.set_ef(ef)
+
+    @property
+    def capacity(self) -> int:
+        """Rows the index can hold before it has to be rebuilt"""
+        return self._index.get_max_elements()
+
+    def add(self, rows: np.ndarray, first_label: int):
+        """
+        Insert gallery rows.
+
+        Args:
+            rows: (M, 128) float32 encodings
+            first_label: Gallery row index of rows[0]
+        """
+        self._index.add_items(rows, np.arange(first_label, first_label + len(rows)))
+
+    def query(self, probe: np.ndarray, k: int) -> np.ndarray:
+        """
+        Find candidate rows for a probe.
+
+        Args:
+            probe: 128-dimensional encoding
+            k: Number of candidates
+
+        Returns:
+            Array of candidate gallery row indices
+        """
+        k = min(k, self._index.get_current_count())
+        labels, _ = self._index.knn_query(probe, k=k)
+        return labels[0].astype(np.intp)
+
+
+def warmup():
+    """Compile the kernels up front so the first identification is not slowed down"""
+    if NUMBA_AVAILABLE:
+        _nearest_numba(np.zeros((1, ENCODING_DIM), dtype=np.float32),
+                       np.zeros(ENCODING_DIM, dtype=np.float32))
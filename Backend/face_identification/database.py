@@ -3,13 +3,36 @@ Database module for face recognition system.
 Handles storage and retrieval of person data and face encodings.
 """
 
+import os
 import sqlite3
 import json
+import threading
 import numpy as np
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 
+# Encodings are also kept in a flat float32 (N, 128) file next to the database
+# so the identifier can memory-map the whole gallery instead of reading it row by row
+GALLERY_DIM = 128
+GALLERY_DTYPE = np.float32
+GALLERY_ROW_BYTES = GALLERY_DIM * np.dtype(GALLERY_DTYPE).itemsize
+
+# Serializes appends to gallery files shared by several FaceDatabase instances
+_gallery_lock = threading.Lock()
+
+
+def _encoding_to_blob(encoding: np.ndarray) -> sqlite3.Binary:
+    """Pack an encoding as raw float32 bytes for the encoding_data column"""
+    return sqlite3.Binary(np.ascontiguousarray(encoding, dtype=GALLERY_DTYPE).tobytes())
+
+
+def _blob_to_encoding(data) -> np.ndarray:
+    """Unpack an encoding_data value (raw float32 bytes, or legacy JSON text)"""
+    if isinstance(data, str):
+        return np.array(json.loads(data), dtype=GALLERY_DTYPE)
+    return np.frombuffer(data, dtype=GALLERY_DTYPE)
+
 
 class FaceDatabase:
     """Manages face recognition database operations"""
@@ -28,14 +51,23 @@ class FaceDatabase:
             db_path = db_dir / 'faces.db'
         
         self.db_path = str(db_path)
+        self.gallery_path = str(Path(self.db_path).with_suffix('.gallery.f32'))
         self.conn = None
         self._connect()
         self._create_tables()
+        self._sync_gallery()
     
     def _connect(self):
         """Establish database connection"""
         self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
         self.conn.row_factory = sqlite3.Row  # Enable column access by name
+        
+        # WAL lets readers run alongside a writer; NORMAL sync is safe in WAL mode
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA cache_size=-8000')      # ~8 MB page cache
+        self.conn.execute('PRAGMA mmap_size=268435456')   # Memory-map up to 256 MB of the file
+        self.conn.execute('PRAGMA temp_store=MEMORY')
     
     def _create_tables(self):
         """Create database tables if they don't exist"""
@@ -57,7 +89,7 @@ class FaceDatabase:
             CREATE TABLE IF NOT EXISTS face_encodings (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 person_id INTEGER NOT NULL,
-                encoding_data TEXT NOT NULL,
+                encoding_data BLOB NOT NULL,
                 photo_path TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (person_id) REFERENCES persons(id) ON DELETE CASCADE
@@ -70,7 +102,101 @@ class FaceDatabase:
             ON face_encodings(person_id)
         ''')
         
+        # Serves get_all_persons' newest-first ordering without sorting every row
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_persons_enrolled_at
+            ON persons(enrolled_at DESC)
+        ''')
+        
+        # Lets the persons join and per-person counts be answered from the index alone
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_fe_covering
+            ON face_encodings(person_id, id)
+        ''')
+        
+        # Row of each encoding in the memory-mapped gallery file
+        columns = [row['name'] for row in cursor.execute('PRAGMA table_info(face_encodings)')]
+        if 'gallery_row' not in columns:
+            cursor.execute('ALTER TABLE face_encodings ADD COLUMN gallery_row INTEGER')
+        
+        self.conn.commit()
+        self._migrate_json_encodings()
+    
+    def _migrate_json_encodings(self):
+        """Rewrite encodings stored as JSON text by older versions as float32 BLOBs"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT id, encoding_data FROM face_encodings WHERE typeof(encoding_data) = 'text'")
+        
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        
+        cursor.executemany(
+            'UPDATE face_encodings SET encoding_data = ? WHERE id = ?',
+            [(_encoding_to_blob(_blob_to_encoding(row['encoding_data'])), row['id']) for row in rows]
+        )
+        self.conn.commit()
+        print(f"🗂️  Converted {len(rows)} face encoding(s) to binary storage")
+    
+    def _gallery_rows(self) -> int:
+        """Number of complete rows in the gallery file"""
+        try:
+            return os.path.getsize(self.gallery_path) // GALLERY_ROW_BYTES
+        except OSError:
+            return 0
+    
+    def _append_to_gallery(self, encoding: np.ndarray) -> int:
+        """
+        Append an encoding to the gallery file.
+        
+        Returns:
+            int: Row index of the new encoding
+        """
+        return self._append_many_to_gallery([encoding])
+    
+    def _append_many_to_gallery(self, encodings: List[np.ndarray]) -> int:
+        """
+        Append several encodings to the gallery file with a single fsync.
+        
+        Returns:
+            int: Row index of the first new encoding (the rest follow in order)
+        """
+        rows = np.ascontiguousarray(encodings, dtype=GALLERY_DTYPE).reshape(-1, GALLERY_DIM)
+        
+        with _gallery_lock:
+            row_index = self._gallery_rows()
+            with open(self.gallery_path, 'r+b' if os.path.exists(self.gallery_path) else 'wb') as f:
+                # Overwrite any partial row left by an interrupted write
+                f.seek(row_index * GALLERY_ROW_BYTES)
+                f.write(rows.tobytes())
+                f.truncate()
+                f.flush()
+                os.fsync(f.fileno())
+        
+        return row_index
+    
+    def _sync_gallery(self):
+        """Make sure every stored encoding has a valid row in the gallery file"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT id, encoding_data FROM face_encodings
+            WHERE gallery_row IS NULL OR gallery_row >= ?
+        ''', (self._gallery_rows(),))
+        
+        missing = cursor.fetchall()
+        if not missing:
+            return
+        
+        # Backfill rows from the stored encodings (first run or damaged gallery file)
+        for row in missing:
+            encoding_array = _blob_to_encoding(row['encoding_data'])
+            cursor.execute(
+                'UPDATE face_encodings SET gallery_row = ? WHERE id = ?',
+                (self._append_to_gallery(encoding_array), row['id'])
+            )
+        
         self.conn.commit()
+        print(f"🗂️  Added {len(missing)} encoding(s) to face gallery file")
     
     def enroll_person(self, name: str, encoding: np.ndarray, 
                      photo_path: str = None, notes: str = None) -> int:
@@ -96,10 +222,9 @@ class FaceDatabase:
         person_id = cursor.lastrowid
         
         # Insert face encoding
-        encoding_json = json.dumps(encoding.tolist())
         cursor.execute(
-            'INSERT INTO face_encodings (person_id, encoding_data, photo_path) VALUES (?, ?, ?)',
-            (person_id, encoding_json, photo_path)
+            'INSERT INTO face_encodings (person_id, encoding_data, photo_path, gallery_row) VALUES (?, ?, ?, ?)',
+            (person_id, _encoding_to_blob(encoding), photo_path, self._append_to_gallery(encoding))
         )
         
         self.conn.commit()
@@ -119,32 +244,77 @@ class FaceDatabase:
             int: Encoding ID
         """
         cursor = self.conn.cursor()
-        encoding_json = json.dumps(encoding.tolist())
         
         cursor.execute(
-            'INSERT INTO face_encodings (person_id, encoding_data, photo_path) VALUES (?, ?, ?)',
-            (person_id, encoding_json, photo_path)
+            'INSERT INTO face_encodings (person_id, encoding_data, photo_path, gallery_row) VALUES (?, ?, ?, ?)',
+            (person_id, _encoding_to_blob(encoding), photo_path, self._append_to_gallery(encoding))
         )
         
         self.conn.commit()
         return cursor.lastrowid
     
-    def get_all_persons(self) -> List[Dict]:
+    def bulk_enroll(self, entries: List[Dict]) -> List[int]:
         """
-        Get all enrolled persons.
+        Enroll many persons in a single transaction (one commit, one gallery fsync).
         
+        Args:
+            entries: List of dicts with 'name' and 'encoding', and optional
+                     'photo_path' and 'notes'
+            
         Returns:
-            List of person dictionaries
+            List of new person IDs, in the order of entries
+        """
+        if not entries:
+            return []
+        
+        first_row = self._append_many_to_gallery([entry['encoding'] for entry in entries])
+        
+        # The connection context manager commits once, or rolls back on error
+        with self.conn:
+            cursor = self.conn.cursor()
+            
+            person_ids = []
+            for entry in entries:
+                cursor.execute(
+                    'INSERT INTO persons (name, notes) VALUES (?, ?)',
+                    (entry['name'], entry.get('notes'))
+                )
+                person_ids.append(cursor.lastrowid)
+            
+            cursor.executemany(
+                'INSERT INTO face_encodings (person_id, encoding_data, photo_path, gallery_row) VALUES (?, ?, ?, ?)',
+                [
+                    (person_id, _encoding_to_blob(entry['encoding']), entry.get('photo_path'), first_row + i)
+                    for i, (person_id, entry) in enumerate(zip(person_ids, entries))
+                ]
+            )
+        
+        return person_ids
+    
+    def get_all_persons(self, limit: int = None, offset: int = 0) -> List[Dict]:
+        """
+        Get enrolled persons, newest first.
+        
+        Args:
+            limit: Maximum number of persons to return (all if None)
+            offset: Number of persons to skip (for pagination)
+        
+        Returns:
+            List of person dictionaries (including the first photo_path)
         """
         cursor = self.conn.cursor()
+        
+        # Page over persons first so counts and photos are only computed for the page
         cursor.execute('''
             SELECT p.id, p.name, p.notes, p.enrolled_at, p.updated_at,
-                   COUNT(fe.id) as encoding_count
+                   (SELECT COUNT(*) FROM face_encodings
+                    WHERE person_id = p.id) as encoding_count,
+                   (SELECT photo_path FROM face_encodings
+                    WHERE person_id = p.id LIMIT 1) as photo_path
             FROM persons p
-            LEFT JOIN face_encodings fe ON p.id = fe.person_id
-            GROUP BY p.id
             ORDER BY p.enrolled_at DESC
-        ''')
+            LIMIT ? OFFSET ?
+        ''', (-1 if limit is None else limit, offset))
         
         persons = []
         for row in cursor.fetchall():
@@ -154,7 +324,8 @@ class FaceDatabase:
                 'notes': row['notes'],
                 'enrolled_at': row['enrolled_at'],
                 'updated_at': row['updated_at'],
-                'encoding_count': row['encoding_count']
+                'encoding_count': row['encoding_count'],
+                'photo_path': row['photo_path']
             })
         
         return persons
@@ -205,7 +376,7 @@ class FaceDatabase:
         
         encodings = []
         for row in cursor.fetchall():
-            encoding_array = np.array(json.loads(row['encoding_data']))
+            encoding_array = _blob_to_encoding(row['encoding_data'])
             encodings.append((row['id'], encoding_array, row['photo_path']))
         
         return encodings
@@ -217,19 +388,74 @@ class FaceDatabase:
         Returns:
             List of tuples (person_id, person_name, encoding_array)
         """
+        matrix, person_ids, person_names = self.get_all_encodings_packed()
+
+        # Rows of the packed matrix are views, so no per-row arrays are built
+        return list(zip(person_ids.tolist(), person_names, matrix))
+    
+    def get_all_encodings_packed(self) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """
+        Get all face encodings as one contiguous matrix read from the database rows.
+
+        Returns:
+            Tuple of ((N, 128) float32 encoding matrix, (N,) person_ids, person_names)
+        """
         cursor = self.conn.cursor()
         cursor.execute('''
             SELECT p.id, p.name, fe.encoding_data
             FROM persons p
             JOIN face_encodings fe ON p.id = fe.person_id
         ''')
+        rows = cursor.fetchall()
+        blobs = [row['encoding_data'] for row in rows]
+
+        if all(isinstance(blob, bytes) for blob in blobs):
+            # Concatenate the raw float32 rows and view them as one matrix
+            matrix = np.frombuffer(bytearray(b''.join(blobs)), dtype=GALLERY_DTYPE)
+            matrix = matrix.reshape(len(rows), GALLERY_DIM)
+        else:
+            # Legacy JSON rows written since startup by an older version
+            matrix = np.empty((len(rows), GALLERY_DIM), dtype=GALLERY_DTYPE)
+            for i, blob in enumerate(blobs):
+                matrix[i] = _blob_to_encoding(blob)
+
+        person_ids = np.fromiter((row['id'] for row in rows), dtype=np.int64, count=len(rows))
+        person_names = [row['name'] for row in rows]
+
+        return matrix, person_ids, person_names
+
+    def get_gallery(self) -> Tuple[List[int], List[str], np.ndarray]:
+        """
+        Get all face encodings as one matrix read from the memory-mapped gallery.
         
-        encodings = []
-        for row in cursor.fetchall():
-            encoding_array = np.array(json.loads(row['encoding_data']))
-            encodings.append((row['id'], row['name'], encoding_array))
+        Returns:
+            Tuple of (person_ids, person_names, (N, 128) float32 encoding matrix)
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT p.id, p.name, fe.gallery_row
+            FROM persons p
+            JOIN face_encodings fe ON p.id = fe.person_id
+            ORDER BY fe.gallery_row
+        ''')
+        rows = cursor.fetchall()
         
-        return encodings
+        if not rows:
+            return [], [], np.empty((0, GALLERY_DIM), dtype=GALLERY_DTYPE)
+        
+        # Encodings added by another instance since startup
+        total_rows = self._gallery_rows()
+        if any(row['gallery_row'] is None or row['gallery_row'] >= total_rows for row in rows):
+            self._sync_gallery()
+            return self.get_gallery()
+        
+        gallery = np.memmap(self.gallery_path, dtype=GALLERY_DTYPE, mode='r',
+                            shape=(total_rows, GALLERY_DIM))
+        
+        # Gather live rows (deleted persons leave unused rows behind)
+        matrix = np.asarray(gallery[[row['gallery_row'] for row in rows]])
+        
+        return [row['id'] for row in rows], [row['name'] for row in rows], matrix
     
     def update_person(self, person_id: int, name: str = None, notes: str = None) -> bool:
         """
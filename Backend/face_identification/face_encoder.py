@@ -3,26 +3,270 @@ Face encoding module using face_recognition library.
 Generates 128-dimensional face encodings from images.
 """
 
+import functools
+import os
+import platform
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import face_recognition
 import numpy as np
 import cv2
 from typing import List, Tuple, Optional
 from pathlib import Path
 
+# OpenCV res10 SSD face detector used by model='dnn'
+DNN_MODEL_DIR = Path(__file__).parent / 'models'
+DNN_PROTOTXT = 'deploy.prototxt'
+DNN_WEIGHTS = 'res10_300x300_ssd_iter_140000.caffemodel'
+
+# Minimum SSD score for a detection to count as a face
+DNN_CONFIDENCE = 0.5
+
+# OpenCV Zoo YuNet face detector used by model='yunet' (OpenCV 4.5.4+)
+YUNET_MODEL = 'face_detection_yunet_2023mar.onnx'
+YUNET_SCORE_THRESHOLD = 0.9
+YUNET_NMS_THRESHOLD = 0.3
+
+# Still photos are detected on a copy at most this many pixels on the long side
+PHOTO_DETECTION_MAX_SIDE = 1024
+
+# Loaded DNN face detectors shared by all encoders in the process:
+# {model path: (net or FaceDetectorYN, lock serializing its forward passes)}
+_DNN_DETECTORS = {}
+_DNN_DETECTORS_LOCK = threading.Lock()
+
+
+@functools.cache
+def _cpu_dnn_target() -> Tuple[int, str]:
+    """
+    OpenCV DNN target for CPU inference: FP16 where OpenCV (4.9+) has
+    half-precision CPU kernels and the CPU does FP16 arithmetic (ARMv8.2
+    NEON, e.g. Apple Silicon), FP32 otherwise.
+    
+    Returns:
+        tuple: (DNN target, description for logging)
+    """
+    if hasattr(cv2.dnn, 'DNN_TARGET_CPU_FP16'):
+        neon_fp16 = getattr(cv2, 'CPU_NEON_FP16', None)
+        if neon_fp16 is not None:
+            has_fp16 = cv2.checkHardwareSupport(neon_fp16)
+        else:
+            has_fp16 = platform.machine().lower() == 'arm64' and platform.system() == 'Darwin'
+        if has_fp16:
+            return cv2.dnn.DNN_TARGET_CPU_FP16, "CPU backend (FP16)"
+    return cv2.dnn.DNN_TARGET_CPU, "CPU backend"
+
+
+def _face_encodings(image: np.ndarray, face_locations: List[Tuple]) -> List[np.ndarray]:
+    """
+    Compute 128-d encodings as contiguous float32 vectors.
+    
+    dlib returns float64; the gallery, database and matching kernels all
+    work in float32, so convert once here instead of at every consumer.
+    """
+    return [np.ascontiguousarray(encoding, dtype=np.float32)
+            for encoding in face_recognition.face_encodings(image, face_locations)]
+
 
 class FaceEncoder:
     """Handles face detection and encoding generation"""
     
-    def __init__(self, model: str = 'hog'):
+    def __init__(self, model: str = 'hog', batch_size: int = 16):
         """
         Initialize face encoder.
         
         Args:
-            model: Face detection model - 'hog' (faster, CPU) or 'cnn' (more accurate, GPU)
+            model: Face detection model - 'hog' (faster, CPU), 'cnn' (more accurate, GPU),
+                'dnn' (OpenCV SSD) or 'yunet' (OpenCV FaceDetectorYN), both on CUDA
+                FP16 or OpenCL when available; 'dnn' and 'yunet' fall back
+                to 'hog' if their model files are missing from DNN_MODEL_DIR
+            batch_size: Frames per GPU batch when detecting with the CNN model
         """
         self.model = model
+        self.batch_size = batch_size
+        self._dnn_net = None
+        self._yunet = None
+        self._dnn_lock = None
+        if model in ('dnn', 'yunet') and not self._load_dnn_detector(model):
+            self.model = model = 'hog'
+        # Per-thread buffers reused by prepare_rgb and the detection downscale
+        self._local = threading.local()
+        # Thread pool for multi-image encoding, created on first use
+        self._pool = None
+        self._pool_lock = threading.Lock()
         print(f"🔍 Face encoder initialized with {model.upper()} model")
     
+    def _load_dnn_detector(self, model: str) -> bool:
+        """
+        Load an OpenCV DNN face detector ('dnn' or 'yunet') on the fastest
+        available target. The loaded detector is cached, so later encoders
+        share it instead of parsing the model again.
+        """
+        if model == 'yunet':
+            model_path = DNN_MODEL_DIR / YUNET_MODEL
+        else:
+            model_path = DNN_MODEL_DIR / DNN_WEIGHTS
+        
+        # Held while loading so two encoders created together load the model once
+        with _DNN_DETECTORS_LOCK:
+            cached = _DNN_DETECTORS.get(str(model_path))
+            if cached is None:
+                if model == 'yunet':
+                    cached = self._read_yunet_detector(model_path)
+                else:
+                    cached = self._read_dnn_detector(DNN_MODEL_DIR / DNN_PROTOTXT, model_path)
+                if cached is None:
+                    return False
+                _DNN_DETECTORS[str(model_path)] = cached
+        
+        detector, self._dnn_lock = cached
+        if model == 'yunet':
+            self._yunet = detector
+        else:
+            self._dnn_net = detector
+        return True
+    
+    @staticmethod
+    def _read_dnn_detector(prototxt: Path, weights: Path) -> Optional[Tuple]:
+        """Read the SSD model files; returns (net, lock) or None if unavailable"""
+        if not prototxt.exists() or not weights.exists():
+            print(f"⚠️  DNN face detector files not found in {DNN_MODEL_DIR}, using HOG")
+            return None
+        
+        try:
+            net = cv2.dnn.readNetFromCaffe(str(prototxt), str(weights))
+            
+            if cv2.cuda.getCudaEnabledDeviceCount() > 0:
+                net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+                net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA_FP16)
+                print("   ✅ DNN face detector using CUDA backend (FP16)")
+            elif cv2.ocl.haveOpenCL():
+                net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+                net.setPreferableTarget(cv2.dnn.DNN_TARGET_OPENCL)
+                print("   ✅ DNN face detector using OpenCL target")
+            else:
+                target, label = _cpu_dnn_target()
+                net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+                net.setPreferableTarget(target)
+                print(f"   ✅ DNN face detector using {label}")
+            
+            return net, threading.Lock()
+            
+        except Exception as e:
+            print(f"⚠️  Could not load DNN face detector ({e}), using HOG")
+            return None
+    
+    @staticmethod
+    def _read_yunet_detector(model_path: Path) -> Optional[Tuple]:
+        """Create a YuNet FaceDetectorYN; returns (detector, lock) or None if unavailable"""
+        if not hasattr(cv2, 'FaceDetectorYN'):
+            print("⚠️  OpenCV has no FaceDetectorYN (needs 4.5.4+), using HOG")
+            return None
+        if not model_path.exists():
+            print(f"⚠️  YuNet model {model_path.name} not found in {DNN_MODEL_DIR}, using HOG")
+            return None
+        
+        try:
+            # Same preference as the SSD: CUDA FP16, then OpenCL (e.g. Intel iGPU), then CPU
+            if cv2.cuda.getCudaEnabledDeviceCount() > 0:
+                backend, target, label = cv2.dnn.DNN_BACKEND_CUDA, cv2.dnn.DNN_TARGET_CUDA_FP16, "CUDA backend (FP16)"
+            elif cv2.ocl.haveOpenCL():
+                backend, target, label = cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_OPENCL, "OpenCL target"
+            else:
+                backend = cv2.dnn.DNN_BACKEND_OPENCV
+                target, label = _cpu_dnn_target()
+            
+            # The input size is set per frame in _yunet_face_locations
+            detector = cv2.FaceDetectorYN.create(
+                str(model_path), "", (320, 320),
+                YUNET_SCORE_THRESHOLD, YUNET_NMS_THRESHOLD, 5000, backend, target
+            )
+            print(f"   ✅ YuNet face detector using {label}")
+            return detector, threading.Lock()
+            
+        except Exception as e:
+            print(f"⚠️  Could not load YuNet face detector ({e}), using HOG")
+            return None
+    
+    @staticmethod
+    def clear_detector_cache():
+        """Forget the shared DNN face detectors; the next 'dnn'/'yunet' encoder reloads its model"""
+        with _DNN_DETECTORS_LOCK:
+            _DNN_DETECTORS.clear()
+    
+    def _face_locations(self, rgb_image: np.ndarray) -> List[Tuple]:
+        """Run the configured face detector on an RGB image"""
+        if self._yunet is not None:
+            return self._yunet_face_locations(rgb_image)
+        if self._dnn_net is None:
+            return face_recognition.face_locations(rgb_image, model=self.model)
+        
+        # The SSD was trained on BGR input with these channel means
+        height, width = rgb_image.shape[:2]
+        blob = cv2.dnn.blobFromImage(rgb_image, 1.0, (300, 300), (104.0, 177.0, 123.0), swapRB=True)
+        
+        # A Net is not safe to run from several threads at once (and is shared by encoders)
+        with self._dnn_lock:
+            self._dnn_net.setInput(blob)
+            detections = self._dnn_net.forward()
+        
+        locations = []
+        for detection in detections[0, 0]:
+            if detection[2] < DNN_CONFIDENCE:
+                continue
+            left = max(0, int(detection[3] * width))
+            top = max(0, int(detection[4] * height))
+            right = min(width, int(detection[5] * width))
+            bottom = min(height, int(detection[6] * height))
+            if right > left and bottom > top:
+                locations.append((top, right, bottom, left))
+        
+        return locations
+    
+    def _yunet_face_locations(self, rgb_image: np.ndarray) -> List[Tuple]:
+        """Run YuNet on an RGB image; boxes come back as pixel (x, y, w, h)"""
+        height, width = rgb_image.shape[:2]
+        
+        # YuNet was trained on BGR; the image here is already detection-sized.
+        # Convert into this thread's buffer rather than a fresh array per frame
+        bgr_image = getattr(self._local, 'bgr', None)
+        if bgr_image is None or bgr_image.shape != rgb_image.shape or bgr_image.dtype != rgb_image.dtype:
+            bgr_image = np.empty_like(rgb_image)
+            self._local.bgr = bgr_image
+        cv2.cvtColor(rgb_image, cv2.COLOR_RGB2BGR, dst=bgr_image)
+        
+        # The detector is shared, and changing its input size regenerates its anchors
+        with self._dnn_lock:
+            if tuple(self._yunet.getInputSize()) != (width, height):
+                self._yunet.setInputSize((width, height))
+            _, faces = self._yunet.detect(bgr_image)
+        
+        if faces is None:
+            return []
+        
+        locations = []
+        for x, y, w, h in faces[:, :4].tolist():
+            left, top = max(0, int(x)), max(0, int(y))
+            right, bottom = min(width, int(x + w)), min(height, int(y + h))
+            if right > left and bottom > top:
+                locations.append((top, right, bottom, left))
+        
+        return locations
+    
+    @staticmethod
+    def _load_rgb(image_path: str) -> np.ndarray:
+        """Decode an image file with OpenCV (libjpeg-turbo) and convert it to RGB"""
+        image = cv2.imread(str(image_path), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Could not read image file {image_path}")
+        
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    
+    @staticmethod
+    def _photo_detection_scale(image: np.ndarray) -> float:
+        """Detection scale that caps a still photo's long side at PHOTO_DETECTION_MAX_SIDE"""
+        return min(1.0, PHOTO_DETECTION_MAX_SIDE / max(image.shape[:2]))
+    
     def encode_face_from_file(self, image_path: str) -> Tuple[Optional[np.ndarray], Optional[Tuple]]:
         """
         Generate face encoding from an image file.
@@ -35,10 +279,10 @@ class FaceEncoder:
         """
         try:
             # Load image
-            image = face_recognition.load_image_file(image_path)
+            image = self._load_rgb(image_path)
             
             # Detect faces
-            face_locations = face_recognition.face_locations(image, model=self.model)
+            face_locations = self._locate_faces(image, self._photo_detection_scale(image))
             
             if len(face_locations) == 0:
                 print(f"⚠️  No face detected in {image_path}")
@@ -48,7 +292,7 @@ class FaceEncoder:
                 print(f"⚠️  Multiple faces detected in {image_path}, using the first one")
             
             # Generate encoding for the first face
-            face_encodings = face_recognition.face_encodings(image, face_locations)
+            face_encodings = _face_encodings(image, face_locations)
             
             if len(face_encodings) == 0:
                 print(f"⚠️  Could not generate encoding for {image_path}")
@@ -60,22 +304,68 @@ class FaceEncoder:
             print(f"❌ Error encoding face from {image_path}: {e}")
             return None, None
     
-    def encode_face_from_frame(self, frame: np.ndarray) -> Tuple[Optional[np.ndarray], Optional[Tuple]]:
+    def prepare_rgb(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Convert a BGR frame to RGB into a buffer reused across calls.
+        
+        The buffer belongs to the calling thread and is overwritten by its
+        next call, so pass the result on rather than keeping it.
+        
+        Args:
+            frame: Video frame (BGR format from OpenCV)
+            
+        Returns:
+            Frame in RGB format
+        """
+        buffer = getattr(self._local, 'rgb', None)
+        if buffer is None or buffer.shape != frame.shape or buffer.dtype != frame.dtype:
+            buffer = np.empty_like(frame)
+            self._local.rgb = buffer
+        
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=buffer)
+    
+    def encode_face_from_files(self, image_paths: List[str]) -> List[Tuple[Optional[np.ndarray], Optional[Tuple]]]:
+        """
+        Generate face encodings for several image files in parallel.
+        
+        Args:
+            image_paths: Paths to image files
+            
+        Returns:
+            List of (encoding, face_location) tuples in input order,
+            (None, None) for images without a usable face
+        """
+        if len(image_paths) <= 1:
+            return [self.encode_face_from_file(path) for path in image_paths]
+        
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1,
+                                                thread_name_prefix='face-encoder')
+        
+        return list(self._pool.map(self.encode_face_from_file, image_paths))
+    
+    def encode_face_from_frame(self, frame: np.ndarray, detection_scale: float = 1.0,
+                               rgb_frame: Optional[np.ndarray] = None) -> Tuple[Optional[np.ndarray], Optional[Tuple]]:
         """
         Generate face encoding from a video frame.
         
         Args:
             frame: Video frame (BGR format from OpenCV)
+            detection_scale: Resize factor applied before face detection;
+                the encoding is always computed at full resolution
+            rgb_frame: RGB version of frame, if the caller already converted it
             
         Returns:
             Tuple of (encoding, face_location) or (None, None) if no face found
         """
         try:
             # Convert BGR to RGB (face_recognition uses RGB)
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            if rgb_frame is None:
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             
             # Detect faces
-            face_locations = face_recognition.face_locations(rgb_frame, model=self.model)
+            face_locations = self._locate_faces(rgb_frame, detection_scale)
             
             if len(face_locations) == 0:
                 print("⚠️  No face detected in frame")
@@ -85,7 +375,7 @@ class FaceEncoder:
                 print(f"⚠️  Multiple faces detected in frame, using the first one")
             
             # Generate encoding for the first face
-            face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+            face_encodings = _face_encodings(rgb_frame, face_locations)
             
             if len(face_encodings) == 0:
                 print("⚠️  Could not generate encoding from frame")
@@ -97,28 +387,109 @@ class FaceEncoder:
             print(f"❌ Error encoding face from frame: {e}")
             return None, None
     
-    def detect_faces_in_frame(self, frame: np.ndarray) -> List[Tuple[np.ndarray, Tuple]]:
+    def locate_faces(self, frame: np.ndarray, detection_scale: float = 1.0,
+                     rgb_frame: Optional[np.ndarray] = None) -> List[Tuple]:
+        """
+        Detect faces in a frame without encoding them.
+        
+        Args:
+            frame: Video frame (BGR format from OpenCV)
+            detection_scale: Resize factor applied before face detection
+            rgb_frame: RGB version of frame, if the caller already converted it
+            
+        Returns:
+            List of face locations (top, right, bottom, left) in full-resolution coordinates
+        """
+        try:
+            if rgb_frame is None:
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            
+            return self._locate_faces(rgb_frame, detection_scale)
+            
+        except Exception as e:
+            print(f"❌ Error locating faces in frame: {e}")
+            return []
+    
+    def encode_locations(self, rgb_frame: np.ndarray, face_locations: List[Tuple]) -> List[np.ndarray]:
+        """
+        Generate encodings for already-detected faces.
+        
+        Args:
+            rgb_frame: Frame in RGB format
+            face_locations: Face locations (top, right, bottom, left)
+            
+        Returns:
+            List of encodings, one per location
+        """
+        if len(face_locations) == 0:
+            return []
+        
+        return _face_encodings(rgb_frame, face_locations)
+    
+    def _locate_faces(self, rgb_frame: np.ndarray, scale: float = 1.0) -> List[Tuple]:
+        """
+        Detect faces, optionally on a downscaled copy of the frame.
+        
+        Args:
+            rgb_frame: Frame in RGB format
+            scale: Resize factor for detection (1.0 = native resolution)
+            
+        Returns:
+            List of face locations (top, right, bottom, left) in full-resolution coordinates
+        """
+        if scale >= 1.0:
+            return self._face_locations(rgb_frame)
+        
+        # Downscale into this thread's buffer; frames of one camera keep the same size
+        height, width = rgb_frame.shape[:2]
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        small = getattr(self._local, 'small', None)
+        if small is None or small.shape != (size[1], size[0]) + rgb_frame.shape[2:] or small.dtype != rgb_frame.dtype:
+            small = np.empty((size[1], size[0]) + rgb_frame.shape[2:], dtype=rgb_frame.dtype)
+            self._local.small = small
+        
+        cv2.resize(rgb_frame, size, dst=small, interpolation=cv2.INTER_AREA)
+        small_locations = self._face_locations(small)
+        
+        return self._scale_locations(small_locations, scale, rgb_frame.shape)
+    
+    @staticmethod
+    def _scale_locations(small_locations: List[Tuple], scale: float, shape: Tuple) -> List[Tuple]:
+        """Map boxes found on a downscaled frame back to the full-resolution frame"""
+        height, width = shape[:2]
+        return [
+            (max(0, int(top / scale)), min(width, int(right / scale)),
+             min(height, int(bottom / scale)), max(0, int(left / scale)))
+            for top, right, bottom, left in small_locations
+        ]
+    
+    def detect_faces_in_frame(self, frame: np.ndarray, detection_scale: float = 1.0,
+                              rgb_frame: Optional[np.ndarray] = None) -> List[Tuple[np.ndarray, Tuple]]:
         """
         Detect all faces in a frame and generate encodings.
         
         Args:
             frame: Video frame (BGR format from OpenCV)
+            detection_scale: Resize factor applied before face detection;
+                encodings are always computed at full resolution
+            rgb_frame: RGB version of frame, if the caller already converted it
             
         Returns:
             List of tuples (encoding, face_location) for each detected face
         """
         try:
             # Convert BGR to RGB
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            if rgb_frame is None:
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             
             # Detect faces
-            face_locations = face_recognition.face_locations(rgb_frame, model=self.model)
+            face_locations = self._locate_faces(rgb_frame, detection_scale)
             
             if len(face_locations) == 0:
                 return []
             
             # Generate encodings for all faces
-            face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+            face_encodings = _face_encodings(rgb_frame, face_locations)
             
             # Combine encodings with locations
             results = list(zip(face_encodings, face_locations))
@@ -129,19 +500,95 @@ class FaceEncoder:
             print(f"❌ Error detecting faces in frame: {e}")
             return []
     
-    def get_face_landmarks(self, frame: np.ndarray, face_location: Tuple) -> Optional[dict]:
+    def encode_faces_from_frames(self, frames: List[np.ndarray], batch_size: Optional[int] = None,
+                                 detection_scale: float = 1.0) -> List[List[Tuple[np.ndarray, Tuple]]]:
+        """
+        Detect and encode faces in several frames at once.
+        
+        With the CNN model, detection for same-sized frames is submitted to
+        dlib in GPU batches; the HOG model falls back to per-frame detection.
+        
+        Args:
+            frames: Video frames (BGR format from OpenCV)
+            batch_size: Frames per GPU batch (defaults to the encoder's batch_size)
+            detection_scale: Resize factor applied before face detection;
+                encodings are always computed at full resolution
+            
+        Returns:
+            One list of (encoding, face_location) tuples per input frame
+        """
+        try:
+            rgb_frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in frames]
+            
+            if self.model == 'cnn' and rgb_frames:
+                locations = self._batch_locate_faces(rgb_frames, batch_size or self.batch_size, detection_scale)
+            else:
+                locations = [self._locate_faces(rgb, detection_scale) for rgb in rgb_frames]
+            
+            results = []
+            for rgb_frame, face_locations in zip(rgb_frames, locations):
+                if len(face_locations) == 0:
+                    results.append([])
+                    continue
+                face_encodings = _face_encodings(rgb_frame, face_locations)
+                results.append(list(zip(face_encodings, face_locations)))
+            
+            return results
+            
+        except Exception as e:
+            print(f"❌ Error encoding faces from frames: {e}")
+            return [[] for _ in frames]
+    
+    def _batch_locate_faces(self, rgb_frames: List[np.ndarray], batch_size: int,
+                            scale: float = 1.0) -> List[List[Tuple]]:
+        """
+        Run CNN face detection over frames in GPU batches.
+        
+        dlib batches only same-sized images, so frames are grouped by shape
+        and each group is submitted separately.
+        """
+        if scale < 1.0:
+            inputs = [cv2.resize(rgb, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                      for rgb in rgb_frames]
+        else:
+            inputs = rgb_frames
+        
+        groups = {}
+        for i, image in enumerate(inputs):
+            groups.setdefault(image.shape, []).append(i)
+        
+        locations = [None] * len(inputs)
+        for indices in groups.values():
+            batch = face_recognition.batch_face_locations(
+                [inputs[i] for i in indices],
+                number_of_times_to_upsample=0,
+                batch_size=batch_size
+            )
+            for i, found in zip(indices, batch):
+                locations[i] = found
+        
+        if scale < 1.0:
+            locations = [self._scale_locations(found, scale, rgb.shape)
+                         for found, rgb in zip(locations, rgb_frames)]
+        
+        return locations
+    
+    def get_face_landmarks(self, frame: np.ndarray, face_location: Tuple,
+                           rgb_frame: Optional[np.ndarray] = None) -> Optional[dict]:
         """
         Get facial landmarks for a detected face.
         
         Args:
             frame: Video frame (BGR format)
             face_location: Face location tuple (top, right, bottom, left)
+            rgb_frame: RGB version of frame, if the caller already converted it
             
         Returns:
             Dictionary of facial landmarks or None
         """
         try:
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            if rgb_frame is None:
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             landmarks = face_recognition.face_landmarks(rgb_frame, [face_location])
             
             if landmarks:
@@ -152,57 +599,135 @@ class FaceEncoder:
             print(f"❌ Error getting face landmarks: {e}")
             return None
     
-    def validate_image_quality(self, image_path: str) -> Tuple[bool, str]:
+    def analyze_image(self, image_path: str) -> dict:
         """
-        Validate if an image is suitable for face enrollment.
+        Load an image file, run face detection once and validate it for enrollment.
         
         Args:
             image_path: Path to image file
             
         Returns:
-            Tuple of (is_valid, message)
+            Dictionary with 'ok' (bool), 'message' (str), 'image' (RGB array or None)
+            and 'face_location' (first detected face or None)
         """
         try:
             # Load image
-            image = face_recognition.load_image_file(image_path)
+            image = self._load_rgb(image_path)
             
-            # Check image size
-            height, width = image.shape[:2]
-            if width < 100 or height < 100:
-                return False, "Image too small (minimum 100x100 pixels)"
+            return self._analyze_rgb_image(image)
             
-            # Detect faces
-            face_locations = face_recognition.face_locations(image, model=self.model)
-            
-            if len(face_locations) == 0:
-                return False, "No face detected in image"
-            
-            if len(face_locations) > 1:
-                return False, f"Multiple faces detected ({len(face_locations)}). Please use an image with only one face."
+        except Exception as e:
+            return {'ok': False, 'message': f"Error validating image: {str(e)}",
+                    'image': None, 'face_location': None}
+    
+    def analyze_frame(self, frame: np.ndarray) -> dict:
+        """
+        Run face detection once on an in-memory frame and validate it for enrollment.
+        
+        Args:
+            frame: Image frame (BGR format from OpenCV)
             
-            # Check face size
-            top, right, bottom, left = face_locations[0]
-            face_width = right - left
-            face_height = bottom - top
+        Returns:
+            Same dictionary as analyze_image, with 'image' in RGB format
+        """
+        try:
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             
-            if face_width < 50 or face_height < 50:
-                return False, "Face too small in image. Please use a closer photo."
+            return self._analyze_rgb_image(rgb_frame)
             
-            # Check if face is too small relative to image
-            face_area = face_width * face_height
-            image_area = width * height
-            face_ratio = face_area / image_area
+        except Exception as e:
+            return {'ok': False, 'message': f"Error validating image: {str(e)}",
+                    'image': None, 'face_location': None}
+    
+    def validate_image_quality(self, image_path: str) -> Tuple[bool, str]:
+        """
+        Validate if an image is suitable for face enrollment.
+        
+        Args:
+            image_path: Path to image file
             
-            if face_ratio < 0.05:
-                return False, "Face is too small relative to image size. Please use a closer photo."
+        Returns:
+            Tuple of (is_valid, message)
+        """
+        analysis = self.analyze_image(image_path)
+        return analysis['ok'], analysis['message']
+    
+    def validate_image_quality_frame(self, frame: np.ndarray) -> Tuple[bool, str]:
+        """
+        Validate if an in-memory frame is suitable for face enrollment.
+        
+        Args:
+            frame: Image frame (BGR format from OpenCV)
             
-            return True, "Image is suitable for enrollment"
+        Returns:
+            Tuple of (is_valid, message)
+        """
+        analysis = self.analyze_frame(frame)
+        return analysis['ok'], analysis['message']
+    
+    def encode_analyzed(self, analysis: dict) -> Optional[np.ndarray]:
+        """
+        Generate the encoding for the face found by analyze_image/analyze_frame.
+        
+        Args:
+            analysis: Result of analyze_image or analyze_frame
             
-        except Exception as e:
-            return False, f"Error validating image: {str(e)}"
+        Returns:
+            128-dimensional encoding, or None if no face was found
+        """
+        if analysis['image'] is None or analysis['face_location'] is None:
+            return None
+        
+        encodings = _face_encodings(analysis['image'], [analysis['face_location']])
+        return encodings[0] if encodings else None
+    
+    def _analyze_rgb_image(self, image: np.ndarray) -> dict:
+        """Run the enrollment quality checks on an RGB image"""
+        result = {'ok': False, 'message': '', 'image': image, 'face_location': None}
+        
+        # Check image size
+        height, width = image.shape[:2]
+        if width < 100 or height < 100:
+            result['message'] = "Image too small (minimum 100x100 pixels)"
+            return result
+        
+        # Detect faces
+        face_locations = self._locate_faces(image, self._photo_detection_scale(image))
+        
+        if len(face_locations) == 0:
+            result['message'] = "No face detected in image"
+            return result
+        
+        result['face_location'] = face_locations[0]
+        
+        if len(face_locations) > 1:
+            result['message'] = f"Multiple faces detected ({len(face_locations)}). Please use an image with only one face."
+            return result
+        
+        # Check face size
+        top, right, bottom, left = face_locations[0]
+        face_width = right - left
+        face_height = bottom - top
+        
+        if face_width < 50 or face_height < 50:
+            result['message'] = "Face too small in image. Please use a closer photo."
+            return result
+        
+        # Check if face is too small relative to image
+        face_area = face_width * face_height
+        image_area = width * height
+        face_ratio = face_area / image_area
+        
+        if face_ratio < 0.05:
+            result['message'] = "Face is too small relative to image size. Please use a closer photo."
+            return result
+        
+        result['ok'] = True
+        result['message'] = "Image is suitable for enrollment"
+        return result
     
     def crop_face_from_image(self, image_path: str, output_path: str, 
-                            padding: int = 50) -> bool:
+                            padding: int = 50, analysis: Optional[dict] = None) -> bool:
         """
         Crop and save the face region from an image.
         
@@ -210,37 +735,32 @@ class FaceEncoder:
             image_path: Path to input image
             output_path: Path to save cropped face
             padding: Pixels to add around face
+            analysis: Result of analyze_image for the same file, to skip detection
             
         Returns:
             bool: True if successful
         """
         try:
-            # Load image
-            image = cv2.imread(image_path)
-            if image is None:
-                return False
-            
-            # Convert to RGB for face detection
-            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            
-            # Detect face
-            face_locations = face_recognition.face_locations(rgb_image, model=self.model)
+            # Detect face (or reuse an earlier analysis of this file)
+            if analysis is None:
+                analysis = self.analyze_image(image_path)
             
-            if len(face_locations) == 0:
+            if analysis['image'] is None or analysis['face_location'] is None:
                 return False
             
             # Get first face location
-            top, right, bottom, left = face_locations[0]
+            top, right, bottom, left = analysis['face_location']
             
             # Add padding
+            image = analysis['image']
             height, width = image.shape[:2]
             top = max(0, top - padding)
             bottom = min(height, bottom + padding)
             left = max(0, left - padding)
             right = min(width, right + padding)
             
-            # Crop face
-            face_crop = image[top:bottom, left:right]
+            # Crop face and convert back to BGR for OpenCV
+            face_crop = cv2.cvtColor(image[top:bottom, left:right], cv2.COLOR_RGB2BGR)
             
             # Save cropped face
             cv2.imwrite(output_path, face_crop)
@@ -250,4 +770,3 @@ class FaceEncoder:
         except Exception as e:
             print(f"❌ Error cropping face: {e}")
             return False
-
@@ -3,10 +3,76 @@ Face identification module.
 Matches detected faces against enrolled face encodings.
 """
 
+import threading
 import face_recognition
 import numpy as np
-from typing import List, Tuple, Optional, Dict
+from typing import Any, Callable, List, NamedTuple, Tuple, Optional, Dict
 from .database import FaceDatabase
+from ._kernels import (
+    HNSWLIB_AVAILABLE, AnnIndex, nearest, nearest_batch, quantize_int8,
+    shortlist_int8, squared_distances, warmup
+)
+
+# Galleries larger than this are pre-filtered (HNSW index if hnswlib is
+# installed, int8 similarity otherwise) before exact re-ranking
+SHORTLIST_MIN_GALLERY = 1024
+
+# Number of shortlisted candidates re-ranked with exact float distances
+SHORTLIST_SIZE = 32
+
+# Galleries are scanned in blocks of this many rows, and the scan stops
+# early once a block holds a match closer than EARLY_EXIT_DISTANCE
+EARLY_EXIT_BLOCK = 256
+EARLY_EXIT_DISTANCE = 0.3
+
+# A detected box overlapping a track by more than this keeps the track's identity
+TRACK_IOU_THRESHOLD = 0.5
+
+# Tracks not matched for this many frames are dropped
+TRACK_MAX_MISSED = 5
+
+# Tracked faces are re-identified after this many frames
+TRACK_REFRESH_FRAMES = 30
+
+
+def _box_iou(a: Tuple, b: Tuple) -> float:
+    """Intersection over union of two (top, right, bottom, left) boxes"""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    if bottom <= top or right <= left:
+        return 0.0
+    
+    inter = (bottom - top) * (right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return inter / float(area_a + area_b - inter)
+
+
+class _Gallery(NamedTuple):
+    """
+    One consistent state of the in-memory gallery.
+    
+    Writers build a new snapshot and publish it with a single assignment;
+    readers take one reference, so rows, IDs and names always line up.
+    """
+    matrix: np.ndarray                  # (N, 128) float32 encodings for the matching kernels
+    sq_norms: np.ndarray                # (N,) squared L2 norms of the rows
+    int8: np.ndarray                    # (N, 128) int8 copy for candidate pruning
+    person_ids: Tuple[int, ...]
+    person_names: Tuple[str, ...]
+    ann_index: Optional[AnnIndex]       # May hold rows past N (grown in place by appends)
+
+
+def _empty_gallery() -> _Gallery:
+    return _Gallery(np.empty((0, 128), dtype=np.float32), np.empty(0, dtype=np.float32),
+                    np.empty((0, 128), dtype=np.int8), (), (), None)
+
+
+def _ann_index_for(matrix: np.ndarray) -> Optional[AnnIndex]:
+    """HNSW index over the gallery once it is large enough to benefit from one"""
+    if HNSWLIB_AVAILABLE and len(matrix) > SHORTLIST_MIN_GALLERY:
+        return AnnIndex(matrix)
+    return None
 
 
 class FaceIdentifier:
@@ -22,31 +88,147 @@ class FaceIdentifier:
         """
         self.database = database
         self.tolerance = tolerance
-        self.known_encodings = []
-        self.known_person_ids = []
-        self.known_person_names = []
+        # Current gallery snapshot; replaced, never mutated (see _Gallery)
+        self._gallery = _empty_gallery()
+        # Serializes gallery writers so concurrent edits do not drop each other
+        self._write_lock = threading.Lock()
+        # Stacked encodings per person for verify_person, dropped on gallery changes
+        self._person_enc_cache: Dict[int, np.ndarray] = {}
+        # Gallery row of the latest match; its block is scanned first
+        self._last_match_index = 0
+        # Face tracks per video source: {track_key: {'frame': int, 'tracks': [dict]}}
+        self._tracks: Dict[Any, Dict] = {}
+        self._dirty = False
         self._load_known_faces()
+
+        # Compile matching kernels before the first frame arrives
+        warmup()
         
         print(f"👤 Face identifier initialized with {len(self.known_encodings)} known faces")
     
+    @property
+    def known_encodings(self) -> np.ndarray:
+        """(N, 128) float32 matrix of enrolled encodings"""
+        return self._gallery.matrix
+    
+    @property
+    def known_person_ids(self) -> Tuple[int, ...]:
+        """Person ID of each gallery row"""
+        return self._gallery.person_ids
+    
+    @property
+    def known_person_names(self) -> Tuple[str, ...]:
+        """Person name of each gallery row"""
+        return self._gallery.person_names
+    
     def _load_known_faces(self):
-        """Load all known face encodings from database"""
-        encodings_data = self.database.get_all_encodings()
+        """Load all known face encodings from the database's gallery file"""
+        person_ids, person_names, matrix = self.database.get_gallery()
         
-        self.known_encodings = []
-        self.known_person_ids = []
-        self.known_person_names = []
-        
-        for person_id, person_name, encoding in encodings_data:
-            self.known_encodings.append(encoding)
-            self.known_person_ids.append(person_id)
-            self.known_person_names.append(person_name)
+        # Contiguous (N, 128) float32 matrix used by the matching kernels
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self._gallery = _Gallery(
+            matrix,
+            np.einsum('ij,ij->i', matrix, matrix),
+            quantize_int8(matrix),
+            tuple(person_ids),
+            tuple(person_names),
+            _ann_index_for(matrix),
+        )
     
     def reload_known_faces(self):
         """Reload known faces from database (call after enrolling new faces)"""
-        self._load_known_faces()
+        with self._write_lock:
+            self._dirty = False
+            self._person_enc_cache.clear()
+            self._tracks.clear()
+            self._load_known_faces()
         print(f"🔄 Reloaded {len(self.known_encodings)} known faces")
     
+    def mark_dirty(self):
+        """Schedule a full reload before the next identification (for bulk changes)"""
+        self._dirty = True
+        self._person_enc_cache.clear()
+        self._tracks.clear()
+    
+    def append_encoding(self, person_id: int, person_name: str, encoding: np.ndarray):
+        """
+        Add one encoding to the in-memory gallery without reloading the database.
+        
+        Args:
+            person_id: Person the encoding belongs to
+            person_name: Person's name
+            encoding: 128-dimensional face encoding
+        """
+        row = np.ascontiguousarray(encoding, dtype=np.float32).reshape(1, 128)
+        self._person_enc_cache.pop(person_id, None)
+        # Tracked unknown faces may be the person just enrolled
+        self._tracks.clear()
+        
+        with self._write_lock:
+            gallery = self._gallery
+            matrix = np.vstack([gallery.matrix, row])
+            
+            # Grow the ANN index in place (readers of older snapshots ignore
+            # labels past their rows); rebuild it when full or newly worthwhile
+            row_index = len(matrix) - 1
+            ann_index = gallery.ann_index
+            if ann_index is not None and row_index < ann_index.capacity:
+                ann_index.add(row, row_index)
+            else:
+                ann_index = _ann_index_for(matrix)
+            
+            self._gallery = _Gallery(
+                matrix,
+                np.append(gallery.sq_norms, np.dot(row[0], row[0])),
+                np.vstack([gallery.int8, quantize_int8(row)]),
+                gallery.person_ids + (person_id,),
+                gallery.person_names + (person_name,),
+                ann_index,
+            )
+    
+    def remove_person(self, person_id: int):
+        """
+        Drop all encodings of a person from the in-memory gallery.
+        
+        Args:
+            person_id: Person ID to remove
+        """
+        self._person_enc_cache.pop(person_id, None)
+        self._tracks.clear()
+        
+        with self._write_lock:
+            gallery = self._gallery
+            keep = np.array([pid != person_id for pid in gallery.person_ids], dtype=bool)
+            if keep.all():
+                return
+            
+            matrix = np.ascontiguousarray(gallery.matrix[keep])
+            self._gallery = _Gallery(
+                matrix,
+                gallery.sq_norms[keep],
+                np.ascontiguousarray(gallery.int8[keep]),
+                tuple(pid for pid, k in zip(gallery.person_ids, keep) if k),
+                tuple(name for name, k in zip(gallery.person_names, keep) if k),
+                # Row indices shifted, so the old index labels are stale
+                _ann_index_for(matrix),
+            )
+    
+    def rename_person(self, person_id: int, person_name: str):
+        """
+        Update a person's name in the in-memory gallery.
+        
+        Args:
+            person_id: Person ID
+            person_name: New name
+        """
+        with self._write_lock:
+            gallery = self._gallery
+            self._gallery = gallery._replace(person_names=tuple(
+                person_name if pid == person_id else name
+                for pid, name in zip(gallery.person_ids, gallery.person_names)
+            ))
+    
     def identify_face(self, face_encoding: np.ndarray) -> Tuple[Optional[int], Optional[str], float]:
         """
         Identify a face by comparing against known encodings.
@@ -57,24 +239,78 @@ class FaceIdentifier:
         Returns:
             Tuple of (person_id, person_name, confidence) or (None, None, 0.0) if unknown
         """
-        if len(self.known_encodings) == 0:
-            return None, None, 0.0
+        if self._dirty:
+            self.reload_known_faces()
         
-        # Calculate face distances
-        face_distances = face_recognition.face_distance(self.known_encodings, face_encoding)
+        return self._identify(self._gallery, face_encoding)
+    
+    def _identify(self, gallery: _Gallery, face_encoding: np.ndarray) -> Tuple[Optional[int], Optional[str], float]:
+        """identify_face against one gallery snapshot"""
+        gallery_size = len(gallery.matrix)
+        if gallery_size == 0:
+            return None, None, 0.0
         
         # Find the best match
-        best_match_index = np.argmin(face_distances)
-        best_distance = face_distances[best_match_index]
+        probe = np.ascontiguousarray(face_encoding, dtype=np.float32)
+
+        if gallery_size > SHORTLIST_MIN_GALLERY:
+            # Prune with the HNSW index or int8 similarity, then re-rank candidates exactly
+            candidates = None
+            if gallery.ann_index is not None:
+                candidates = gallery.ann_index.query(probe, SHORTLIST_SIZE)
+                # Rows appended after this snapshot was taken
+                candidates = candidates[candidates < gallery_size]
+            if candidates is None or len(candidates) == 0:
+                probe_q = quantize_int8(probe[np.newaxis, :])[0]
+                candidates = shortlist_int8(gallery.int8, probe_q, SHORTLIST_SIZE)
+            candidate_index, best_distance = nearest(gallery.matrix[candidates], probe,
+                                                     gallery.sq_norms[candidates])
+            best_match_index = int(candidates[candidate_index])
+        else:
+            best_match_index, best_distance = self._nearest_early_exit(gallery, probe)
         
-        # Check if match is within tolerance
         if best_distance <= self.tolerance:
-            person_id = self.known_person_ids[best_match_index]
-            person_name = self.known_person_names[best_match_index]
+            self._last_match_index = best_match_index
+        
+        return self._match(gallery, best_match_index, best_distance)
+    
+    def _nearest_early_exit(self, gallery: _Gallery, probe: np.ndarray) -> Tuple[int, float]:
+        """
+        Find the nearest gallery row block by block, stopping at a near-certain match.
+        
+        The scan starts at the block of the previous match, since the same
+        faces tend to recur from frame to frame.
+        """
+        gallery_size = len(gallery.matrix)
+        if gallery_size <= EARLY_EXIT_BLOCK:
+            return nearest(gallery.matrix, probe, gallery.sq_norms)
+        
+        block_count = -(-gallery_size // EARLY_EXIT_BLOCK)
+        first_block = min(self._last_match_index, gallery_size - 1) // EARLY_EXIT_BLOCK
+        best_index, best_distance = 0, float('inf')
+        
+        for step in range(block_count):
+            start = ((first_block + step) % block_count) * EARLY_EXIT_BLOCK
+            index, distance = nearest(gallery.matrix[start:start + EARLY_EXIT_BLOCK], probe,
+                                      gallery.sq_norms[start:start + EARLY_EXIT_BLOCK])
+            if distance < best_distance:
+                best_index, best_distance = start + index, distance
+            if best_distance < EARLY_EXIT_DISTANCE:
+                break
+        
+        return best_index, best_distance
+    
+    def _match(self, gallery: _Gallery, index: int,
+               distance: float) -> Tuple[Optional[int], Optional[str], float]:
+        """Turn the nearest row of a gallery snapshot into (person_id, person_name, confidence)"""
+        # Check if match is within tolerance
+        if distance <= self.tolerance:
+            person_id = gallery.person_ids[index]
+            person_name = gallery.person_names[index]
             
             # Convert distance to confidence (0-100%)
             # Distance of 0 = 100% confidence, distance of tolerance = 0% confidence
-            confidence = max(0, (1 - (best_distance / self.tolerance)) * 100)
+            confidence = max(0, (1 - (distance / self.tolerance)) * 100)
             
             return person_id, person_name, confidence
         
@@ -90,11 +326,117 @@ class FaceIdentifier:
         Returns:
             List of dictionaries with identification results
         """
+        if len(face_encodings) == 0:
+            return []
+        
+        probes = np.ascontiguousarray(face_encodings, dtype=np.float32).reshape(-1, 128)
+        matches = self.identify_faces_batch(probes)
+        
         results = []
         
-        for encoding in face_encodings:
-            person_id, person_name, confidence = self.identify_face(encoding)
+        for person_id, person_name, confidence in matches:
+            results.append({
+                'person_id': person_id,
+                'person_name': person_name if person_name else 'Unknown',
+                'confidence': confidence,
+                'is_known': person_id is not None
+            })
+        
+        return results
+    
+    def identify_faces_batch(self, probes: np.ndarray) -> List[Tuple[Optional[int], Optional[str], float]]:
+        """
+        Identify a batch of faces in one pass over the gallery.
+        
+        Args:
+            probes: (K, 128) float32 array of face encodings
             
+        Returns:
+            List of (person_id, person_name, confidence) tuples, one per probe
+        """
+        if self._dirty:
+            self.reload_known_faces()
+        
+        gallery = self._gallery
+        gallery_size = len(gallery.matrix)
+        if gallery_size == 0:
+            return [(None, None, 0.0)] * len(probes)
+        
+        if gallery_size > SHORTLIST_MIN_GALLERY:
+            # Large galleries go through the int8 shortlist per probe
+            return [self._identify(gallery, probe) for probe in probes]
+        
+        # One (K, 128) @ (128, N) product gives the full distance matrix
+        probes = np.ascontiguousarray(probes, dtype=np.float32).reshape(-1, 128)
+        indices, distances = nearest_batch(gallery.matrix, gallery.sq_norms, probes)
+        return [self._match(gallery, int(i), float(d)) for i, d in zip(indices, distances)]
+    
+    def identify_with_tracking(self, track_key: Any, face_locations: List[Tuple],
+                               encode: Callable[[List[Tuple]], List[np.ndarray]]) -> List[Dict]:
+        """
+        Identify faces in a video frame, reusing identities of faces that persist.
+        
+        Each detected box is matched by IoU against the tracks from earlier
+        frames of the same source; only boxes without a track (or whose track
+        is due for a refresh) are encoded and identified.
+        
+        Args:
+            track_key: Identifies the video source (e.g. camera ID)
+            face_locations: Face boxes (top, right, bottom, left) in this frame
+            encode: Callable returning encodings for a list of face locations
+            
+        Returns:
+            List of dictionaries with identification results, one per location
+        """
+        if self._dirty:
+            self.reload_known_faces()
+        
+        state = self._tracks.setdefault(track_key, {'frame': 0, 'tracks': []})
+        state['frame'] += 1
+        frame_idx = state['frame']
+        tracks = state['tracks']
+        
+        # Greedily pair each box with its best-overlapping unused track
+        assigned = [None] * len(face_locations)
+        used = set()
+        for i, location in enumerate(face_locations):
+            best_iou, best_track = TRACK_IOU_THRESHOLD, None
+            for t, track in enumerate(tracks):
+                if t in used:
+                    continue
+                iou = _box_iou(location, track['bbox'])
+                if iou > best_iou:
+                    best_iou, best_track = iou, t
+            if best_track is not None:
+                used.add(best_track)
+                assigned[i] = tracks[best_track]
+        
+        # Encode and identify only new or stale faces
+        pending = [
+            i for i, track in enumerate(assigned)
+            if track is None or frame_idx - track['identified_frame'] >= TRACK_REFRESH_FRAMES
+        ]
+        if pending:
+            encodings = encode([face_locations[i] for i in pending])
+            probes = np.ascontiguousarray(encodings, dtype=np.float32).reshape(-1, 128)
+            for i, match in zip(pending, self.identify_faces_batch(probes)):
+                if assigned[i] is None:
+                    assigned[i] = {}
+                    tracks.append(assigned[i])
+                assigned[i]['match'] = match
+                assigned[i]['identified_frame'] = frame_idx
+        
+        results = []
+        for location, track in zip(face_locations, assigned):
+            if track is None:
+                # Encoding failed for this box
+                results.append({'person_id': None, 'person_name': 'Unknown',
+                                'confidence': 0.0, 'is_known': False})
+                continue
+            
+            track['bbox'] = location
+            track['last_seen_frame'] = frame_idx
+            person_id, person_name, confidence = track['match']
             results.append({
                 'person_id': person_id,
                 'person_name': person_name if person_name else 'Unknown',
@@ -102,8 +444,26 @@ class FaceIdentifier:
                 'is_known': person_id is not None
             })
         
+        # Evict tracks that have not been seen recently
+        state['tracks'] = [
+            track for track in tracks
+            if 'match' in track and frame_idx - track['last_seen_frame'] < TRACK_MAX_MISSED
+        ]
+        
         return results
     
+    def reset_tracking(self, track_key: Any = None):
+        """
+        Forget face tracks for one video source, or for all sources.
+        
+        Args:
+            track_key: Video source to reset (None = all)
+        """
+        if track_key is None:
+            self._tracks.clear()
+        else:
+            self._tracks.pop(track_key, None)
+    
     def compare_faces(self, encoding1: np.ndarray, encoding2: np.ndarray) -> Tuple[bool, float]:
         """
         Compare two face encodings.
@@ -132,27 +492,26 @@ class FaceIdentifier:
         Returns:
             List of tuples (person_id, person_name, distance) sorted by distance
         """
-        if len(self.known_encodings) == 0:
+        gallery = self._gallery
+        if len(gallery.matrix) == 0:
             return []
         
         if max_distance is None:
             max_distance = self.tolerance
         
-        # Calculate distances to all known faces
-        face_distances = face_recognition.face_distance(self.known_encodings, face_encoding)
+        # Squared distances to all known faces in one pass over the gallery matrix
+        squared = squared_distances(gallery.matrix, np.asarray(face_encoding, dtype=np.float32))
         
-        # Find all matches within tolerance
-        matches = []
-        for i, distance in enumerate(face_distances):
-            if distance <= max_distance:
-                person_id = self.known_person_ids[i]
-                person_name = self.known_person_names[i]
-                matches.append((person_id, person_name, distance))
+        # Find all matches within tolerance (compared squared, so no sqrt per row)
+        within = np.flatnonzero(squared <= max_distance ** 2)
         
         # Sort by distance (best matches first)
-        matches.sort(key=lambda x: x[2])
+        within = within[np.argsort(squared[within])]
         
-        return matches
+        return [
+            (gallery.person_ids[i], gallery.person_names[i], float(np.sqrt(squared[i])))
+            for i in within.tolist()
+        ]
     
     def set_tolerance(self, tolerance: float):
         """
@@ -197,18 +556,20 @@ class FaceIdentifier:
         Returns:
             Tuple of (is_verified, confidence)
         """
-        # Get all encodings for this person
-        person_encodings = self.database.get_person_encodings(person_id)
-        
-        if not person_encodings:
-            return False, 0.0
-        
-        # Compare against all encodings for this person
-        best_distance = float('inf')
+        # Get all encodings for this person as one (M, 128) matrix
+        matrix = self._person_enc_cache.get(person_id)
+        if matrix is None:
+            person_encodings = self.database.get_person_encodings(person_id)
+            
+            if not person_encodings:
+                return False, 0.0
+            
+            matrix = np.stack([encoding for _, encoding, _ in person_encodings]).astype(np.float32)
+            self._person_enc_cache[person_id] = matrix
         
-        for _, encoding, _ in person_encodings:
-            distance = face_recognition.face_distance([encoding], face_encoding)[0]
-            best_distance = min(best_distance, distance)
+        # Compare against all encodings for this person in one pass
+        squared = squared_distances(matrix, np.asarray(face_encoding, dtype=np.float32))
+        best_distance = float(np.sqrt(squared.min()))
         
         # Check if verified
         is_verified = best_distance <= self.tolerance
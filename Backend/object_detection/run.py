@@ -5,6 +5,7 @@ Cross-platform launcher that handles everything automatically!
 """
 
 import os
+import shlex
 import sys
 import subprocess
 from pathlib import Path
@@ -23,19 +24,19 @@ def print_step(emoji, text):
 
 
 def run_command(cmd, cwd=None, capture=False):
-    """Run a command and return success status."""
+    """Run a command (argv list or command string) without a shell and return success status."""
     try:
+        args = shlex.split(cmd) if isinstance(cmd, str) else cmd
         if capture:
             result = subprocess.run(
-                cmd,
-                shell=True,
+                args,
                 cwd=cwd,
                 capture_output=True,
                 text=True
             )
             return result.returncode == 0, result.stdout
         else:
-            result = subprocess.run(cmd, shell=True, cwd=cwd)
+            result = subprocess.run(args, cwd=cwd)
             return result.returncode == 0, None
     except Exception as e:
         print(f"   ❌ Error: {e}")
@@ -44,7 +45,11 @@ def run_command(cmd, cwd=None, capture=False):
 
 def main():
     """Main launcher function."""
-    os.system('clear' if os.name != 'nt' else 'cls')
+    # ANSI clear avoids spawning a process; old Windows consoles still need cls
+    if os.name == 'nt':
+        os.system('cls')
+    else:
+        print('\033[2J\033[H', end='', flush=True)
     
     print_header("🚀 YOLO Object Detection - One-Click Launcher")
     
@@ -61,7 +66,7 @@ def main():
     # Step 2: Install dependencies
     print_step("📦", "Checking dependencies...")
     success, _ = run_command(
-        f"{sys.executable} -m pip install -q -r requirements.txt",
+        [sys.executable, '-m', 'pip', 'install', '-q', '-r', 'requirements.txt'],
         capture=True
     )
     if success:
@@ -75,7 +80,7 @@ def main():
     
     if not model_path.exists():
         print_step("📥", "Downloading YOLO model (first time only, ~23 MB)...")
-        success, _ = run_command(f"{sys.executable} scripts/download_models.py")
+        success, _ = run_command([sys.executable, 'scripts/download_models.py'])
         if not success:
             print("\n❌ Failed to download model")
             return 1
@@ -94,7 +99,7 @@ def main():
     print("\n" + "="*70 + "\n")
     
     # Launch detector
-    success, _ = run_command(f"{sys.executable} scripts/detect_objects.py")
+    success, _ = run_command([sys.executable, 'scripts/detect_objects.py'])
     
     # Cleanup
     print_header("👋 Object detection stopped")
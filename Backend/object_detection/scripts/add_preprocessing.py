@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+ONNX Preprocessing Wrapper
+Prepends BGR->RGB, NHWC->NCHW (for channels-first models) and /255 scaling to
+a YOLO ONNX model, so the TensorRT backend can upload raw uint8 frames instead
+of float blobs.
+
+Usage:
+    python scripts/add_preprocessing.py models/yolov4-tiny.onnx [output.onnx]
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import onnx
+    from onnx import helper, numpy_helper, TensorProto
+except ImportError:
+    print("❌ The onnx package is required: pip install onnx")
+    sys.exit(1)
+
+
+def add_preprocessing(model):
+    """
+    Rewire a model's float input behind a uint8 NHWC BGR image input.
+
+    Args:
+        model: onnx.ModelProto whose first input is (N, 3, H, W) or (N, H, W, 3) float
+
+    Returns:
+        onnx.ModelProto: The wrapped model
+    """
+    graph = model.graph
+    old_input = graph.input[0]
+    dims = old_input.type.tensor_type.shape.dim
+    batch = dims[0].dim_param or dims[0].dim_value or 'batch'
+    channels_last = dims[3].dim_value == 3
+    if channels_last:
+        height, width = dims[1].dim_value, dims[2].dim_value
+    else:
+        height, width = dims[2].dim_value, dims[3].dim_value
+
+    image = helper.make_tensor_value_info('image', TensorProto.UINT8, [batch, height, width, 3])
+    scale = numpy_helper.from_array(np.array(1 / 255.0, dtype=np.float32), 'preprocess_scale')
+    bgr_to_rgb = numpy_helper.from_array(np.array([2, 1, 0], dtype=np.int64), 'preprocess_channels')
+
+    nodes = [helper.make_node('Cast', ['image'], ['preprocess_float'], to=TensorProto.FLOAT)]
+    if channels_last:
+        # Already NHWC; only the channel order changes
+        nodes.append(helper.make_node('Gather', ['preprocess_float', 'preprocess_channels'], ['preprocess_rgb'], axis=3))
+    else:
+        nodes += [
+            helper.make_node('Transpose', ['preprocess_float'], ['preprocess_nchw'], perm=[0, 3, 1, 2]),
+            helper.make_node('Gather', ['preprocess_nchw', 'preprocess_channels'], ['preprocess_rgb'], axis=1),
+        ]
+    nodes.append(helper.make_node('Mul', ['preprocess_rgb', 'preprocess_scale'], [old_input.name]))
+
+    graph.initializer.extend([scale, bgr_to_rgb])
+    for node in reversed(nodes):
+        graph.node.insert(0, node)
+    graph.input.remove(old_input)
+    graph.input.insert(0, image)
+
+    onnx.checker.check_model(model)
+    return model
+
+
+def main():
+    """Wrap the model given on the command line."""
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return 1
+
+    source = Path(sys.argv[1])
+    target = Path(sys.argv[2]) if len(sys.argv) > 2 else source.with_suffix('.uint8.onnx')
+
+    print(f"📦 Loading {source}")
+    model = add_preprocessing(onnx.load(str(source)))
+    onnx.save(model, str(target))
+    print(f"✅ Saved {target}")
+    print("   Point performance.onnx at it to upload uint8 frames to TensorRT")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
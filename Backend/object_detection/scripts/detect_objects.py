@@ -4,10 +4,13 @@ Real-time Object Detection using YOLO
 Main application script for detecting objects from webcam or RTSP camera feed.
 """
 
+import os
 import sys
 import cv2
-import yaml
 import time
+import queue
+import threading
+from collections import deque
 from pathlib import Path
 from datetime import datetime
 
@@ -20,6 +23,30 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 from detector import ObjectDetector
 from visualizer import Visualizer
 from device_connectivity.camera import WebcamCamera, TapoRTSPCamera, select_camera_interactive
+from api.services.jpeg_encoder import encode_jpeg
+from device_connectivity.yaml_cache import load_yaml
+
+# Frames the displayed FPS is averaged over
+FPS_WINDOW = 60
+
+# Detected batches waiting to be drawn; bounds how far inference runs ahead of the display
+PIPELINE_DEPTH = 2
+
+# JPEG quality of saved frames (cv2.imwrite's default)
+SAVE_JPEG_QUALITY = 95
+
+def _pin_current_thread(cpus):
+    """
+    Restrict the calling thread to a set of CPUs (Linux only).
+    Threads it starts afterwards inherit the set.
+    
+    Args:
+        cpus: Iterable of CPU indices
+    """
+    try:
+        os.sched_setaffinity(0, cpus)
+    except (OSError, ValueError) as e:
+        print(f"   ⚠️  Could not pin thread to CPUs {sorted(cpus)}: {e}")
 
 
 class ObjectDetectionApp:
@@ -31,28 +58,36 @@ class ObjectDetectionApp:
         self.config_path = self.project_root / config_path
         self.config = self.load_config()
         
+        # Model file paths, resolved once from the configured model type
+        model_files = self.config['model_files'][self.config['model']['type']]
+        self.weights_path = self.project_root / model_files['weights']
+        self.cfg_path = self.project_root / model_files['config']
+        self.names_path = self.project_root / model_files['names']
+        
         self.detector = None
         self.camera = None
         self.visualizer = None
         self.output_dir = self.project_root / "output"
         self.output_dir.mkdir(exist_ok=True)
         
+        # Saved frames are encoded and written on a background thread (see save_frame)
+        self._save_queue = queue.Queue()
+        self._save_thread = None
+        
     def load_config(self):
         """Load configuration from YAML file."""
         try:
-            with open(self.config_path, 'r') as f:
-                config = yaml.safe_load(f)
+            config = load_yaml(self.config_path)
 
             # Load credentials if using RTSP and URL is empty
             if config.get('camera_source', {}).get('type') == 'rtsp':
                 if not config.get('rtsp', {}).get('url'):
                     credentials_path = self.project_root / 'config' / 'credentials.yaml'
                     if credentials_path.exists():
-                        with open(credentials_path, 'r') as f:
-                            credentials = yaml.safe_load(f)
-                            if credentials and 'rtsp' in credentials:
-                                config['rtsp']['url'] = credentials['rtsp']['url']
-                                print("   ✅ Loaded RTSP credentials from credentials.yaml")
+                        credentials = load_yaml(credentials_path)
+                        if credentials and 'rtsp' in credentials:
+                            config['rtsp']['url'] = credentials['rtsp']['url']
+                            print("   ✅ Loaded RTSP credentials from credentials.yaml")
                     else:
                         print(f"   ⚠️  Warning: credentials.yaml not found")
                         print(f"   💡 Copy credentials.yaml.example to credentials.yaml and add your RTSP URL")
@@ -71,16 +106,8 @@ class ObjectDetectionApp:
         # Initialize detector
         self.detector = ObjectDetector(self.config)
         
-        # Get model file paths
-        model_type = self.config['model']['type']
-        model_files = self.config['model_files'][model_type]
-        
-        weights_path = self.project_root / model_files['weights']
-        config_path = self.project_root / model_files['config']
-        names_path = self.project_root / model_files['names']
-        
         # Load model
-        if not self.detector.load_model(weights_path, config_path, names_path):
+        if not self.detector.load_model(self.weights_path, self.cfg_path, self.names_path):
             print("\n❌ Failed to load model")
             print("\n💡 Did you download the model files?")
             print("   Run: python scripts/download_models.py")
@@ -142,32 +169,72 @@ class ObjectDetectionApp:
         
         # Initialize visualizer
         self.visualizer = Visualizer(self.config['display'])
+        self.visualizer.precompute(len(self.detector.get_class_names()))
         
         print("\n✅ All components initialized successfully")
         return True
     
     def save_frame(self, frame, detections):
-        """Save current frame with detections."""
+        """
+        Save current frame with detections.
+        
+        The JPEG encode and file writes happen on a background thread so the
+        detection loop does not stall; the files appear shortly after.
+        """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"detection_{timestamp}.jpg"
         filepath = self.output_dir / filename
         
-        cv2.imwrite(str(filepath), frame)
-        
         # Also save detection info
         info_file = self.output_dir / f"detection_{timestamp}.txt"
-        with open(info_file, 'w') as f:
-            f.write(f"Timestamp: {timestamp}\n")
-            f.write(f"Total detections: {len(detections)}\n\n")
-            for detection in detections:
-                class_id, class_name, confidence, x, y, w, h = detection
-                f.write(f"{class_name}: {confidence:.2f} at ({x}, {y}, {w}, {h})\n")
+        class_names = self.detector.get_class_names()
+        lines = [f"Timestamp: {timestamp}\n", f"Total detections: {len(detections)}\n\n"]
+        lines.extend(
+            f"{class_names[class_id]}: {confidence:.2f} at ({x}, {y}, {w}, {h})\n"
+            for class_id, confidence, x, y, w, h in zip(
+                detections[:, 0].astype(int).tolist(),
+                detections[:, 1].tolist(),
+                *detections[:, 2:6].astype(int).T.tolist()
+            )
+        )
         
-        print(f"\n📸 Frame saved: {filename}")
+        if self._save_thread is None:
+            self._save_thread = threading.Thread(target=self._save_worker, daemon=True)
+            self._save_thread.start()
+        # Copy: the loop may draw into or reuse the frame's buffer
+        self._save_queue.put((filepath, frame.copy(), info_file, "".join(lines)))
         return filepath
     
+    def _save_worker(self):
+        """Encode and write frames queued by save_frame until a None sentinel"""
+        while True:
+            item = self._save_queue.get()
+            if item is None:
+                return
+            
+            filepath, frame, info_file, info_text = item
+            try:
+                # nvJPEG or libjpeg-turbo when available, cv2.imencode otherwise
+                jpeg_bytes = encode_jpeg(frame, SAVE_JPEG_QUALITY)
+                if jpeg_bytes is None:
+                    raise IOError("JPEG encoding failed")
+                filepath.write_bytes(jpeg_bytes)
+                info_file.write_text(info_text)
+                print(f"\n📸 Frame saved: {filepath.name}")
+            except Exception as e:
+                print(f"\n❌ Error saving frame: {e}")
+    
     def run(self):
         """Main detection loop."""
+        affinity = self._cpu_affinity()
+        if affinity:
+            # Size OpenCV's pool for the inference CPUs, not the capture ones
+            # this thread is pinned to while the model loads
+            performance = self.config.setdefault('performance', {})
+            performance.setdefault('num_threads', len(affinity['inference']))
+            # Camera reader threads (started during initialize/start_stream) inherit this
+            _pin_current_thread(affinity['capture'])
+        
         if not self.initialize():
             return False
         
@@ -180,54 +247,92 @@ class ObjectDetectionApp:
         print("   • Press 'i' to show model info")
         print("\n" + "="*70 + "\n")
         
-        # FPS calculation variables
+        # FPS over a rolling window of recent frame timestamps
         fps = 0
-        frame_count = 0
-        start_time = time.time()
+        timestamps = deque(maxlen=FPS_WINDOW)
+        
+        # Repaint the window every Nth frame; every frame is still detected
+        display_every = max(1, int(self.config['display'].get('display_every', 1)))
+        # Wider frames are shown downscaled; saving still uses the full frame
+        preview_max_width = int(self.config['display'].get('preview_max_width', 960))
+        frame_index = 0
+        # pollKey (OpenCV 4.5+) handles key events without waiting
+        poll_key = getattr(cv2, 'pollKey', lambda: cv2.waitKey(1))
+        
+        # Frames detected per forward pass; on a GPU a few frames cost little
+        # more than one, at the price of batch_size - 1 frames of latency
+        batch_size = max(1, int(self.config.get('performance', {}).get('frame_batch', 1)))
+        if self.detector.trt_engine is not None:
+            batch_size = min(batch_size, self.detector.trt_engine.max_batch)
+        
+        # Capture on a background thread so camera I/O overlaps with inference
+        self.camera.start_stream()
+        
+        # Detect on a worker thread while this one draws and shows the previous
+        # batch; HighGUI windows must stay on the main thread
+        batches = queue.Queue(maxsize=PIPELINE_DEPTH)
+        stop_event = threading.Event()
+        worker = threading.Thread(
+            target=self._inference_loop, args=(batches, stop_event, batch_size), daemon=True
+        )
+        if affinity:
+            # The worker, and OpenCV's thread pool it creates, inherit the inference set
+            _pin_current_thread(affinity['inference'])
+            worker.start()
+            _pin_current_thread(affinity['display'])
+        else:
+            worker.start()
         
         try:
-            while True:
-                # Read frame
-                ret, frame = self.camera.read_frame()
-                
-                if not ret:
-                    print("❌ Failed to capture frame")
-                    break
-                
-                # Detect objects
-                detections = self.detector.detect(frame)
-                
-                # Draw detections
-                frame = self.visualizer.draw_detections(
-                    frame,
-                    detections,
-                    self.detector.get_class_names()
-                )
+            running = True
+            while running:
+                batch = batches.get()
+                if batch is None:
+                    break  # The camera stopped delivering frames
+                if isinstance(batch, Exception):
+                    raise batch
                 
-                # Calculate FPS
-                frame_count += 1
-                if frame_count >= 30:
-                    end_time = time.time()
-                    fps = 30 / (end_time - start_time)
-                    start_time = time.time()
-                    frame_count = 0
-                
-                # Draw info overlay
-                frame = self.visualizer.draw_info_overlay(frame, detections, fps)
-                
-                # Display frame
-                cv2.imshow('YOLO Object Detection', frame)
-                
-                # Handle key presses
-                key = cv2.waitKey(1) & 0xFF
-                
-                if key == ord('q') or key == 27:  # 'q' or ESC
-                    print("\n✅ Exiting...")
-                    break
-                elif key == ord('s'):  # Save frame
-                    self.save_frame(frame, detections)
-                elif key == ord('i'):  # Show info
-                    self.print_model_info()
+                frames, results = batch
+                for frame, detections in zip(frames, results):
+                    # Draw detections
+                    frame = self.visualizer.draw_detections(
+                        frame,
+                        detections,
+                        self.detector.get_class_names()
+                    )
+                    
+                    # Calculate FPS
+                    timestamps.append(time.perf_counter_ns())
+                    if len(timestamps) > 1 and timestamps[-1] > timestamps[0]:
+                        fps = (len(timestamps) - 1) * 1e9 / (timestamps[-1] - timestamps[0])
+                    
+                    # Draw info overlay
+                    frame = self.visualizer.draw_info_overlay(
+                        frame, detections, fps, self.detector.get_class_names()
+                    )
+                    
+                    # Display frame
+                    frame_index += 1
+                    if frame_index % display_every == 0:
+                        preview = frame
+                        if 0 < preview_max_width < frame.shape[1]:
+                            scale = preview_max_width / frame.shape[1]
+                            preview = cv2.resize(frame, (preview_max_width, round(frame.shape[0] * scale)),
+                                                 interpolation=cv2.INTER_AREA)
+                        cv2.imshow('YOLO Object Detection', preview)
+                        key = cv2.waitKey(1) & 0xFF
+                    else:
+                        # Keep the exit keys responsive without repainting
+                        key = poll_key() & 0xFF
+                    
+                    if key == ord('q') or key == 27:  # 'q' or ESC
+                        print("\n✅ Exiting...")
+                        running = False
+                        break
+                    elif key == ord('s'):  # Save frame
+                        self.save_frame(frame, detections)
+                    elif key == ord('i'):  # Show info
+                        self.print_model_info()
                     
         except KeyboardInterrupt:
             print("\n✅ Interrupted by user")
@@ -237,10 +342,77 @@ class ObjectDetectionApp:
             traceback.print_exc()
             return False
         finally:
+            # The worker gives up queueing once stopped; wait for it to leave
+            # read_frame()/detect() before the camera and detector are freed
+            stop_event.set()
+            worker.join()
             self.cleanup()
         
         return True
     
+    def _cpu_affinity(self):
+        """
+        CPU sets for the capture, inference and display threads from
+        performance.cpu_affinity, or None when unset or unsupported.
+        Roles left out keep the CPUs the process started with.
+        """
+        configured = self.config.get('performance', {}).get('cpu_affinity')
+        if not configured or not hasattr(os, 'sched_setaffinity'):
+            return None
+        
+        available = os.sched_getaffinity(0)
+        return {
+            role: set(configured.get(role) or ()) or available
+            for role in ('capture', 'inference', 'display')
+        }
+    
+    def _inference_loop(self, batches, stop_event, batch_size):
+        """
+        Read and detect batches of frames on a worker thread.
+        
+        Puts (frames, detections) tuples on batches; None when the camera
+        stops delivering frames, or the exception if detection failed.
+        """
+        try:
+            while not stop_event.is_set():
+                # Read a batch of frames
+                frames = []
+                ret = True
+                while len(frames) < batch_size:
+                    ret, frame = self.camera.read_frame()
+                    if not ret:
+                        break
+                    
+                    # RTSP frames are shared and read-only; draw on a private copy
+                    if not frame.flags.writeable:
+                        frame = frame.copy()
+                    frames.append(frame)
+                
+                # Detect objects
+                if len(frames) == 1:
+                    self._hand_over(batches, (frames, [self.detector.detect(frames[0])]), stop_event)
+                elif frames:
+                    self._hand_over(batches, (frames, self.detector.detect_batch(frames)), stop_event)
+                
+                if not ret:
+                    print("❌ Failed to capture frame")
+                    break
+        except Exception as e:
+            self._hand_over(batches, e, stop_event)
+            return
+        
+        self._hand_over(batches, None, stop_event)
+    
+    @staticmethod
+    def _hand_over(batches, item, stop_event):
+        """Queue an item for the display loop, giving up once the app is stopping"""
+        while not stop_event.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+    
     def print_model_info(self):
         """Print model information to console."""
         info = self.detector.get_model_info()
@@ -253,6 +425,12 @@ class ObjectDetectionApp:
     
     def cleanup(self):
         """Clean up resources."""
+        # Let queued saves finish before exiting
+        if self._save_thread is not None:
+            self._save_queue.put(None)
+            self._save_thread.join()
+            self._save_thread = None
+        
         if self.camera:
             self.camera.release()
         cv2.destroyAllWindows()
@@ -2,14 +2,40 @@
 """
 YOLO Model Downloader
 Downloads required YOLO model files (weights, config, class names)
+
+Usage:
+    python scripts/download_models.py [model_type] [--calibrate] [--engine]
+
+--calibrate saves frames from a camera into performance.calibration_images
+(default calibration/) for INT8 calibration. --engine also builds the
+TensorRT engine from the model's ONNX export (performance.onnx, or the
+weights path with .onnx) so the detector does not build it on its first run.
 """
 
+import hashlib
 import os
 import sys
+import threading
+import urllib.error
 import urllib.request
 import yaml
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# Frames saved by --calibrate, and live frames skipped between saves so the
+# set covers more of the scene than a one-second burst
+CALIBRATION_FRAMES = 500
+CALIBRATION_FRAME_STRIDE = 5
+
+# Bytes read from the connection and written to disk per step
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# Seconds without data before a download attempt gives up
+DOWNLOAD_TIMEOUT = 60
+
+# libyaml C parser when PyYAML was built with it, pure-Python otherwise
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
 
 class ModelDownloader:
     """Download and manage YOLO model files."""
@@ -22,42 +48,110 @@ class ModelDownloader:
         self.models_dir = self.project_root / "models"
         self.models_dir.mkdir(exist_ok=True)
         
+        # Downloads run concurrently; keeps their progress lines from interleaving
+        self._print_lock = threading.Lock()
+        
     def load_config(self):
         """Load configuration from YAML file."""
         try:
             with open(self.config_path, 'r') as f:
-                return yaml.safe_load(f)
+                return yaml.load(f, Loader=_YAML_LOADER)
         except Exception as e:
             print(f"❌ Error loading config: {e}")
             sys.exit(1)
     
     def download_file(self, url, destination, description="file"):
-        """Download a file with progress indication."""
+        """
+        Download a file with progress indication.
+        
+        Data is streamed into <destination>.part and renamed once complete;
+        an interrupted download resumes from the partial file on the next run
+        when the server supports HTTP range requests.
+        """
+        destination = Path(destination)
+        partial = destination.with_name(destination.name + '.part')
+        
         try:
-            print(f"\n📥 Downloading {description}...")
-            print(f"   URL: {url}")
-            print(f"   Destination: {destination}")
+            with self._print_lock:
+                print(f"\n📥 Downloading {description}...")
+                print(f"   URL: {url}")
+                print(f"   Destination: {destination}")
+            
+            # Last reported tenth of the download (or 10 MB step without a size)
+            last_step = [-1]
             
-            def progress_hook(block_num, block_size, total_size):
-                """Show download progress."""
-                downloaded = block_num * block_size
+            def report_progress(downloaded, total_size):
+                """Show download progress, one line per 10%."""
+                mb_downloaded = downloaded / (1024 * 1024)
                 if total_size > 0:
                     percent = min(downloaded * 100.0 / total_size, 100)
-                    mb_downloaded = downloaded / (1024 * 1024)
-                    mb_total = total_size / (1024 * 1024)
-                    print(f"\r   Progress: {percent:.1f}% ({mb_downloaded:.1f}/{mb_total:.1f} MB)", end='')
+                    step = int(percent // 10)
+                    message = f"   {description}: {percent:.1f}% ({mb_downloaded:.1f}/{total_size / (1024 * 1024):.1f} MB)"
                 else:
-                    mb_downloaded = downloaded / (1024 * 1024)
-                    print(f"\r   Downloaded: {mb_downloaded:.1f} MB", end='')
+                    step = int(mb_downloaded // 10)
+                    message = f"   {description}: {mb_downloaded:.1f} MB"
+                if step != last_step[0]:
+                    last_step[0] = step
+                    with self._print_lock:
+                        print(message)
             
-            urllib.request.urlretrieve(url, destination, progress_hook)
-            print(f"\n   ✅ Downloaded successfully!")
+            offset = partial.stat().st_size if partial.exists() else 0
+            request = urllib.request.Request(url)
+            if offset:
+                request.add_header('Range', f'bytes={offset}-')
+            
+            try:
+                response = urllib.request.urlopen(request, timeout=DOWNLOAD_TIMEOUT)
+            except urllib.error.HTTPError as e:
+                if e.code != 416 or not offset:
+                    raise
+                # Range starts at the end of the file: the partial download is complete
+                response = None
+            
+            if response is not None:
+                with response:
+                    if offset and response.status != 206:
+                        offset = 0  # Server ignored the range; start over
+                    elif offset:
+                        with self._print_lock:
+                            print(f"   ↪️  Resuming {description} at {offset / (1024 * 1024):.1f} MB")
+                    
+                    length = response.headers.get('Content-Length')
+                    total_size = offset + int(length) if length else 0
+                    downloaded = offset
+                    
+                    with open(partial, 'ab' if offset else 'wb') as f:
+                        while True:
+                            chunk = response.read(DOWNLOAD_CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            f.write(chunk)
+                            downloaded += len(chunk)
+                            report_progress(downloaded, total_size)
+                
+                if total_size and downloaded < total_size:
+                    raise IOError(f"connection closed at {downloaded}/{total_size} bytes; run again to resume")
+            
+            os.replace(partial, destination)
+            with self._print_lock:
+                print(f"   ✅ Downloaded {description} successfully!")
             return True
             
         except Exception as e:
-            print(f"\n   ❌ Error downloading: {e}")
+            with self._print_lock:
+                print(f"   ❌ Error downloading {description}: {e}")
             return False
     
+    @staticmethod
+    def file_sha256(filepath):
+        """SHA-256 hex digest of a file, read in DOWNLOAD_CHUNK_SIZE blocks"""
+        # hashlib uses OpenSSL, which has SHA-NI / ARMv8 crypto code paths
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
     def check_file_exists(self, filepath):
         """Check if a file exists and show its size."""
         if filepath.exists():
@@ -78,39 +172,26 @@ class ModelDownloader:
             return False
         
         model_info = self.config['model_files'][model_type]
-        success = True
         
-        # Download weights
-        weights_path = self.project_root / model_info['weights']
-        if not self.check_file_exists(weights_path):
-            if not self.download_file(
-                model_info['weights_url'],
-                weights_path,
-                f"{model_type} weights"
-            ):
-                success = False
-        
-        # Download config
-        config_path = self.project_root / model_info['config']
-        if not self.check_file_exists(config_path):
-            if not self.download_file(
-                model_info['config_url'],
-                config_path,
-                f"{model_type} config"
-            ):
-                success = False
-        
-        # Download class names
-        names_path = self.project_root / model_info['names']
-        if not self.check_file_exists(names_path):
-            if not self.download_file(
-                model_info['names_url'],
-                names_path,
-                "COCO class names"
-            ):
-                success = False
+        # Weights, config and class names, skipping files already present
+        tasks = [
+            (model_info[f'{key}_url'], self.project_root / model_info[key], description)
+            for key, description in (
+                ('weights', f"{model_type} weights"),
+                ('config', f"{model_type} config"),
+                ('names', "COCO class names"),
+            )
+            if not self.check_file_exists(self.project_root / model_info[key])
+        ]
+        if not tasks:
+            return True
+        
+        # The files are independent, so fetch them concurrently; the small
+        # config and names finish while the weights are still streaming
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            results = list(executor.map(lambda task: self.download_file(*task), tasks))
         
-        return success
+        return all(results)
     
     def verify_model(self, model_type):
         """Verify that all model files exist and are valid."""
@@ -123,13 +204,18 @@ class ModelDownloader:
         model_info = self.config['model_files'][model_type]
         all_valid = True
         
-        # Check weights
+        # Check weights; against the configured checksum when there is one,
+        # which also catches truncated or corrupted downloads of plausible size
         weights_path = self.project_root / model_info['weights']
-        if weights_path.exists() and weights_path.stat().st_size > 1000000:  # > 1MB
-            print(f"   ✅ Weights file OK")
-        else:
+        expected_sha256 = model_info.get('weights_sha256')
+        if not weights_path.exists() or weights_path.stat().st_size <= 1000000:  # > 1MB
             print(f"   ❌ Weights file missing or invalid")
             all_valid = False
+        elif expected_sha256 and self.file_sha256(weights_path) != expected_sha256.lower():
+            print(f"   ❌ Weights file checksum mismatch (delete it and download again)")
+            all_valid = False
+        else:
+            print(f"   ✅ Weights file OK{' (SHA-256 verified)' if expected_sha256 else ''}")
         
         # Check config
         config_path = self.project_root / model_info['config']
@@ -149,6 +235,78 @@ class ModelDownloader:
         
         return all_valid
     
+    def calibrate(self, count=CALIBRATION_FRAMES):
+        """
+        Save representative camera frames for TensorRT INT8 calibration.
+        The camera is picked from the discovery menu; frames are stored as
+        JPEGs, which the engine build resizes to the network input.
+        """
+        import cv2
+        sys.path.insert(0, str(self.project_root.parent))
+        from device_connectivity.camera import select_camera_interactive
+        
+        performance = self.config.get('performance') or {}
+        output_dir = self.project_root / performance.get('calibration_images', 'calibration')
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        camera, _ = select_camera_interactive(self.config)
+        if camera is None or not camera.initialize():
+            print("   ❌ No camera available for calibration")
+            return False
+        
+        print(f"\n📸 Saving {count} calibration frames to {output_dir}...")
+        saved = 0
+        frame_index = 0
+        try:
+            while saved < count:
+                success, frame = camera.read_frame()
+                if not success or frame is None:
+                    print("\n   ❌ Camera stopped delivering frames")
+                    break
+                
+                frame_index += 1
+                if frame_index % CALIBRATION_FRAME_STRIDE:
+                    continue
+                
+                cv2.imwrite(str(output_dir / f"calib_{saved:04d}.jpg"), frame)
+                saved += 1
+                print(f"\r   Progress: {saved}/{count}", end='')
+        finally:
+            camera.release()
+        
+        print(f"\n   ✅ Saved {saved} frames")
+        print(f"   Set performance.precision: int8 and performance.calibration_images: {output_dir}")
+        return saved > 0
+    
+    def build_engine(self, model_type):
+        """
+        Build and cache the TensorRT engine for a model ahead of time.
+        Uses the performance settings from the config (onnx, max_batch,
+        precision, calibration_images), like the detector does at startup.
+        """
+        print(f"\n🔧 Building TensorRT engine for {model_type}...")
+        
+        sys.path.insert(0, str(self.project_root / 'src'))
+        from detector import ObjectDetector
+        
+        config = dict(self.config)
+        config['performance'] = dict(config.get('performance') or {}, backend='tensorrt')
+        model_info = self.config['model_files'][model_type]
+        
+        detector = ObjectDetector(config)
+        loaded = detector.load_model(
+            self.project_root / model_info['weights'],
+            self.project_root / model_info['config'],
+            self.project_root / model_info['names']
+        )
+        
+        if not loaded or detector.trt_engine is None:
+            print("   ❌ TensorRT engine was not built")
+            return False
+        
+        print("   ✅ TensorRT engine cached next to the ONNX model")
+        return True
+    
     def list_available_models(self):
         """List all available YOLO models."""
         print("\n📋 Available YOLO Models:")
@@ -169,8 +327,11 @@ def main():
     # Get model type from config or command line
     model_type = downloader.config['model']['type']
     
-    if len(sys.argv) > 1:
-        model_type = sys.argv[1]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    build_engine = '--engine' in sys.argv[1:]
+    calibrate = '--calibrate' in sys.argv[1:]
+    if args:
+        model_type = args[0]
     
     print(f"\n🎯 Target model: {model_type}")
     
@@ -184,6 +345,11 @@ def main():
     if success:
         # Verify the download
         if downloader.verify_model(model_type):
+            if calibrate and not downloader.calibrate():
+                return 1
+            if build_engine and not downloader.build_engine(model_type):
+                return 1
+            
             print(f"\n{'='*70}")
             print(f"✅ SUCCESS! {model_type} model is ready to use!")
             print(f"{'='*70}")
@@ -4,10 +4,43 @@ Setup Test Script
 Verifies that all dependencies and components are properly installed.
 """
 
+import io
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 
+class _PerThreadStdout:
+    """stdout stand-in that sends each thread's prints to its own buffer"""
+    
+    def __init__(self, fallback):
+        self._fallback = fallback
+        self._local = threading.local()
+    
+    def capture(self):
+        """Start buffering output for the calling thread and return the buffer"""
+        self._local.buffer = io.StringIO()
+        return self._local.buffer
+    
+    def write(self, text):
+        return getattr(self._local, 'buffer', self._fallback).write(text)
+    
+    def flush(self):
+        getattr(self._local, 'buffer', self._fallback).flush()
+
+
+def _run_captured(stdout, test):
+    """Run one test with its output buffered; returns (result, output)"""
+    buffer = stdout.capture()
+    try:
+        result = test()
+    except Exception as e:
+        print(f"   ❌ Unexpected error: {e}")
+        result = False
+    return result, buffer.getvalue()
+
+
 def test_imports():
     """Test if all required packages can be imported."""
     print("\n" + "="*70)
@@ -179,14 +212,31 @@ def main():
     print("Object Detection Setup Test")
     print("="*70)
     
-    results = {
-        'Imports': test_imports(),
-        'Configuration': test_config(),
-        'Model Files': test_model_files(),
-        'Camera': test_camera(),
-        'OpenCV DNN': test_opencv_dnn(),
+    tests = {
+        'Imports': test_imports,
+        'Configuration': test_config,
+        'Model Files': test_model_files,
+        'Camera': test_camera,
+        'OpenCV DNN': test_opencv_dnn,
     }
     
+    # Run the checks concurrently (camera open alone can take seconds), then
+    # print each one's buffered output in order so sections do not interleave
+    original_stdout = sys.stdout
+    stdout = _PerThreadStdout(original_stdout)
+    sys.stdout = stdout
+    try:
+        with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+            futures = {name: executor.submit(_run_captured, stdout, test) for name, test in tests.items()}
+            outcomes = {name: future.result() for name, future in futures.items()}
+    finally:
+        sys.stdout = original_stdout
+    
+    results = {}
+    for name, (result, output) in outcomes.items():
+        sys.stdout.write(output)
+        results[name] = result
+    
     # Summary
     print("\n" + "="*70)
     print("Test Summary")
@@ -0,0 +1,107 @@
+"""
+Numeric kernels for YOLO post-processing.
+Uses a Numba-compiled loop when Numba is installed, otherwise NumPy.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Passed instead of a class mask when every class is allowed
+_ALL_CLASSES = np.zeros(0, dtype=np.bool_)
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _decode_numba(rows, width, height, threshold, allowed):
+        n, cols = rows.shape
+        best_ids = np.empty(n, dtype=np.int64)
+        best_scores = np.empty(n, dtype=np.float32)
+
+        # Best class per anchor in one pass over its scores, anchors in parallel;
+        # no (N, classes) intermediate is ever materialized
+        for i in prange(n):
+            best = 5
+            for j in range(6, cols):
+                if rows[i, j] > rows[i, best]:
+                    best = j
+            best_ids[i] = best - 5
+            best_scores[i] = rows[i, best]
+
+        keep = np.empty(n, dtype=np.bool_)
+        count = 0
+        for i in range(n):
+            keep[i] = best_scores[i] > threshold and (allowed.shape[0] == 0 or allowed[best_ids[i]])
+            if keep[i]:
+                count += 1
+
+        boxes = np.empty((count, 4), dtype=np.int32)
+        class_ids = np.empty(count, dtype=np.int64)
+        confidences = np.empty(count, dtype=np.float32)
+        k = 0
+        for i in range(n):
+            if not keep[i]:
+                continue
+            # Normalized center/size to a pixel top-left box, truncating like astype(int32)
+            center_x = np.int32(rows[i, 0] * width)
+            center_y = np.int32(rows[i, 1] * height)
+            w = np.int32(rows[i, 2] * width)
+            h = np.int32(rows[i, 3] * height)
+            boxes[k, 0] = np.int32(center_x - w / 2.0)
+            boxes[k, 1] = np.int32(center_y - h / 2.0)
+            boxes[k, 2] = w
+            boxes[k, 3] = h
+            class_ids[k] = best_ids[i]
+            confidences[k] = best_scores[i]
+            k += 1
+
+        return boxes, class_ids, confidences
+
+
+def _decode_numpy(rows, width, height, threshold, allowed):
+    scores = rows[:, 5:]
+    all_class_ids = scores.argmax(axis=1)
+    all_confidences = scores[np.arange(len(scores)), all_class_ids]
+
+    # Keep confident detections of allowed classes
+    mask = all_confidences > threshold
+    if allowed.shape[0]:
+        mask &= allowed[all_class_ids]
+
+    kept = rows[mask]
+    center_x = (kept[:, 0] * width).astype(np.int32)
+    center_y = (kept[:, 1] * height).astype(np.int32)
+    w = (kept[:, 2] * width).astype(np.int32)
+    h = (kept[:, 3] * height).astype(np.int32)
+
+    # Calculate top-left corner
+    x = (center_x - w / 2).astype(np.int32)
+    y = (center_y - h / 2).astype(np.int32)
+
+    return np.stack([x, y, w, h], axis=1), all_class_ids[mask], all_confidences[mask]
+
+
+def decode_detections(rows, width, height, threshold, allowed_mask=None):
+    """
+    Decode one YOLO output into boxes above the confidence threshold.
+
+    Args:
+        rows: (N, 5 + classes) array of normalized cx, cy, w, h, objectness, class scores
+        width: Frame width
+        height: Frame height
+        threshold: Minimum class score
+        allowed_mask: Boolean mask indexed by class ID, or None for all classes
+
+    Returns:
+        tuple: (boxes, class_ids, confidences) as (K, 4) int32 x, y, w, h,
+            (K,) int64 and (K,) float32 arrays
+    """
+    allowed = _ALL_CLASSES if allowed_mask is None else allowed_mask
+    if NUMBA_AVAILABLE:
+        rows = np.ascontiguousarray(rows, dtype=np.float32)
+        return _decode_numba(rows, width, height, np.float32(threshold), allowed)
+    return _decode_numpy(rows, width, height, threshold, allowed)
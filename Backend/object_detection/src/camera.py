@@ -4,13 +4,38 @@ Handles camera initialization, frame capture, and camera-related utilities.
 """
 
 import cv2
+import functools
 import platform
+import threading
+import time
+from collections import deque
+
+# Reader thread backoff after failed reads: grows by READ_RETRY_DELAY per
+# failure in a row, up to MAX_READ_RETRY_DELAY seconds
+READ_RETRY_DELAY = 0.02
+MAX_READ_RETRY_DELAY = 0.5
+
+
+@functools.cache
+def _capture_backend():
+    """
+    Native OpenCV capture backend for this platform, so OpenCV does not
+    probe every backend it was built with when opening the device.
+    """
+    system = platform.system()
+    if system == 'Darwin':
+        return cv2.CAP_AVFOUNDATION
+    if system == 'Linux':
+        return cv2.CAP_V4L2
+    if system == 'Windows':
+        return cv2.CAP_DSHOW
+    return cv2.CAP_ANY
 
 
 class CameraHandler:
     """Manages camera operations and frame capture."""
     
-    def __init__(self, camera_index=0, width=0, height=0, fps=0):
+    def __init__(self, camera_index=0, width=0, height=0, fps=0, mirror=True, threaded=False):
         """
         Initialize camera handler.
         
@@ -19,14 +44,26 @@ class CameraHandler:
             width (int): Desired frame width (0 for default)
             height (int): Desired frame height (0 for default)
             fps (int): Desired FPS (0 for default)
+            mirror (bool): Flip frames horizontally so the view looks like a mirror;
+                mirrored frames are negative-stride views, see read_frame
+            threaded (bool): Call start_async() on initialize, so read_frame
+                returns the newest frame without waiting on the camera
         """
         self.camera_index = camera_index
         self.width = width
         self.height = height
         self.fps = fps
+        self.mirror = mirror
+        self.threaded = threaded
         self.capture = None
         self.is_initialized = False
         
+        # Background reader state (see start_async)
+        self._frames = deque(maxlen=2)
+        self._frame_ready = threading.Event()
+        self._running = False
+        self._reader = None
+        
     def initialize(self):
         """
         Initialize the camera.
@@ -37,11 +74,17 @@ class CameraHandler:
         try:
             print(f"\n🎥 Initializing camera (index: {self.camera_index})...")
             
-            self.capture = cv2.VideoCapture(self.camera_index)
+            self.capture = cv2.VideoCapture(self.camera_index, _capture_backend())
             
             if not self.capture.isOpened():
                 raise IOError(f"Cannot access camera at index {self.camera_index}")
             
+            # Ask for MJPG before the resolution: raw YUYV caps USB webcams at low
+            # FPS at high resolutions, and JPEG decoding is cheaper than YUYV conversion
+            self.capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+            # Keep a single buffered frame so reads are never stale
+            self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            
             # Set camera properties if specified
             if self.width > 0:
                 self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
@@ -60,6 +103,10 @@ class CameraHandler:
             print(f"   🎬 FPS: {actual_fps if actual_fps > 0 else 'Unknown'}")
             
             self.is_initialized = True
+            
+            if self.threaded:
+                self.start_async()
+            
             return True
             
         except Exception as e:
@@ -73,28 +120,106 @@ class CameraHandler:
             
             return False
     
+    def _capture_frame(self):
+        """Grab one frame from the device, mirrored if enabled"""
+        success, frame = self.capture.read()
+
+        # Mirror by reversing the column stride (makes it look natural like a mirror);
+        # unlike cv2.flip this is a view, so no pixels are copied
+        if success and frame is not None and self.mirror:
+            frame = frame[:, ::-1]
+
+        return success, frame
+    
+    def _reader_loop(self):
+        """Keep the newest captured frames ready for read_frame_async"""
+        failures = 0
+        while self._running:
+            # Bounded buffer: when the consumer falls behind, the oldest frame is dropped
+            result = self._capture_frame()
+            self._frames.append(result)
+            self._frame_ready.set()
+            
+            if result[0]:
+                failures = 0
+            else:
+                # Back off on a device that stopped delivering instead of spinning
+                failures += 1
+                time.sleep(min(READ_RETRY_DELAY * failures, MAX_READ_RETRY_DELAY))
+    
+    def start_async(self):
+        """
+        Start capturing on a background thread.
+        Camera I/O then overlaps with whatever the caller does between reads
+        (e.g. inference), instead of adding to it.
+
+        Returns:
+            bool: True if the reader thread is running
+        """
+        if not self.is_initialized or self.capture is None:
+            return False
+        
+        if self._reader is None:
+            self._running = True
+            self._reader = threading.Thread(target=self._reader_loop, daemon=True)
+            self._reader.start()
+        self.threaded = True
+        return True
+    
+    def read_frame_async(self, timeout=1.0):
+        """
+        Take the newest frame captured by the start_async() reader thread.
+
+        Args:
+            timeout (float): Seconds to wait for a frame not returned before
+
+        Returns:
+            tuple: (success, frame) where success is bool and frame is numpy array
+        """
+        if self._reader is None:
+            return False, None
+
+        # Older buffered frames are stale, so only the newest is returned
+        if not self._frame_ready.wait(timeout=timeout):
+            return False, None
+        self._frame_ready.clear()
+        try:
+            return self._frames.pop()
+        except IndexError:
+            return False, None
+    
     def read_frame(self):
         """
         Read a frame from the camera.
 
+        Mirrored frames are views with a negative column stride. Read-only
+        consumers (e.g. the detector's blob building) take them as they are;
+        OpenCV cannot draw into them, so pass a frame that will be drawn on
+        through np.ascontiguousarray() first (Visualizer does this itself).
+
         Returns:
             tuple: (success, frame) where success is bool and frame is numpy array
         """
         if not self.is_initialized or self.capture is None:
             return False, None
 
-        success, frame = self.capture.read()
-
-        # Flip frame horizontally to fix mirroring (makes it look natural like a mirror)
-        if success and frame is not None:
-            frame = cv2.flip(frame, 1)
+        if self._reader is not None:
+            return self.read_frame_async()
 
-        return success, frame
+        return self._capture_frame()
     
     def release(self):
         """Release camera resources."""
+        if self._reader is not None:
+            # Wait for the reader to leave read() before the capture is freed
+            self._running = False
+            self._reader.join()
+            self._reader = None
+            self._frames.clear()
+        
         if self.capture is not None:
             self.capture.release()
+            self.capture = None
             self.is_initialized = False
             print("   🎥 Camera released")
     
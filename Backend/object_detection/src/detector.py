@@ -3,10 +3,23 @@ Object Detector Module
 Core YOLO object detection functionality.
 """
 
+import os
+
 import cv2
 import numpy as np
 from pathlib import Path
 
+# Columns of a detection row returned by detect()/detect_batch()
+DETECTION_COLUMNS = ('class_id', 'confidence', 'x', 'y', 'w', 'h')
+
+try:
+    from ._kernels import decode_detections
+    from .trt_backend import TENSORRT_AVAILABLE, TensorRTEngine
+except ImportError:
+    # Imported as a top-level module (scripts put src/ on sys.path)
+    from _kernels import decode_detections
+    from trt_backend import TENSORRT_AVAILABLE, TensorRTEngine
+
 
 class ObjectDetector:
     """YOLO-based object detector."""
@@ -21,8 +34,20 @@ class ObjectDetector:
         self.config = config
         self.model_config = config['model']
         self.net = None
+        self.trt_engine = None
         self.class_names = []
         self.output_layers = []
+        # Boolean mask of the classes allowed by the filter (None = all classes)
+        self._allowed_class_mask = None
+        # Input blob reused across forward passes, how to fill it (OpenCV 4.8+)
+        # and its layout, which follows the backend's model input
+        self._blob = None
+        self._blob_params = None
+        self._layout = 'NCHW'
+        # Fixed per model: network input size, and post-processing with the
+        # thresholds and class filter bound in (see _make_decoder)
+        self._input_size = None
+        self._decode = None
         self.is_initialized = False
         
     def load_model(self, weights_path, config_path, names_path):
@@ -59,30 +84,75 @@ class ObjectDetector:
             
             print(f"   ✅ Loaded {len(self.class_names)} class names")
             
+            # Resolve the class filter once instead of per detection
+            self._allowed_class_mask = self._build_class_mask()
+            self._input_size = self.model_config.get('input_size', 416)
+            self._decode = self._make_decoder()
+            
+            configure_opencv_threads(self.config.get('performance', {}).get('num_threads'))
+            
+            # Set backend and target
+            backend = self.config.get('performance', {}).get('backend', 'opencv')
+            target = self.config.get('performance', {}).get('target', 'cpu')
+            
+            # TensorRT engine from an ONNX export next to the weights, if configured
+            use_tensorrt = backend == 'tensorrt' and self._load_tensorrt(weights_path)
+            
+            # Darknet nets in OpenCV DNN only take NCHW; TensorRT takes the
+            # layout its ONNX model was exported with
+            self._layout = self.trt_engine.layout if use_tensorrt else 'NCHW'
+            
+            # Preallocate the input blob so frames are written into the same buffer
+            input_size = self._input_size
+            if hasattr(cv2.dnn, 'blobFromImagesWithParams'):
+                self._blob = np.empty(self._blob_shape(1, input_size), dtype=np.float32)
+                self._blob_params = cv2.dnn.Image2BlobParams(
+                    scalefactor=(1/255.0, 1/255.0, 1/255.0),
+                    size=(input_size, input_size),
+                    mean=(0, 0, 0),
+                    swapRB=True,
+                    ddepth=cv2.CV_32F,
+                    datalayout=(
+                        cv2.dnn.DNN_LAYOUT_NHWC if self._layout == 'NHWC' else cv2.dnn.DNN_LAYOUT_NCHW
+                    )
+                )
+            
+            if use_tensorrt:
+                self.is_initialized = True
+                return True
+            
             # Load YOLO network
             self.net = cv2.dnn.readNetFromDarknet(
                 str(config_path),
                 str(weights_path)
             )
             
-            # Set backend and target
-            backend = self.config.get('performance', {}).get('backend', 'opencv')
-            target = self.config.get('performance', {}).get('target', 'cpu')
-            
             if backend == 'cuda' and cv2.cuda.getCudaEnabledDeviceCount() > 0:
                 self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
-                self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA)
-                print(f"   ✅ Using CUDA backend")
+                if target == 'cuda_fp16':
+                    self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA_FP16)
+                    print(f"   ✅ Using CUDA backend (FP16)")
+                else:
+                    self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA)
+                    print(f"   ✅ Using CUDA backend")
+            elif backend in ('openvino', 'cuda', 'tensorrt') and _openvino_targets():
+                # Requested, or the fallback when no NVIDIA backend is usable:
+                # OpenVINO runs on Intel CPUs (oneDNN AVX-512/VNNI kernels) and iGPUs
+                self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE)
+                self.net.setPreferableTarget(_openvino_target(target))
+                print(f"   ✅ Using OpenVINO backend ({target})")
             else:
+                if backend == 'openvino':
+                    print("   ⚠️  OpenCV was built without OpenVINO, falling back to CPU")
                 self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
                 self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
                 print(f"   ✅ Using CPU backend")
             
             # Get output layer names
             layer_names = self.net.getLayerNames()
-            self.output_layers = [
-                layer_names[i - 1] for i in self.net.getUnconnectedOutLayers()
-            ]
+            self.output_layers = tuple(
+                layer_names[i - 1] for i in np.asarray(self.net.getUnconnectedOutLayers()).flatten()
+            )
             
             print(f"   ✅ Model loaded successfully")
             print(f"   📊 Output layers: {len(self.output_layers)}")
@@ -94,6 +164,47 @@ class ObjectDetector:
             print(f"   ❌ Error loading model: {e}")
             return False
     
+    def _load_tensorrt(self, weights_path):
+        """
+        Load the TensorRT engine for this model.
+        
+        Args:
+            weights_path (Path): Darknet weights; the ONNX export is expected
+                next to it (same name, .onnx) unless performance.onnx is set
+            
+        Returns:
+            bool: True if the engine is ready, False to fall back to OpenCV DNN
+        """
+        performance = self.config.get('performance', {})
+        onnx_path = Path(performance.get('onnx') or weights_path.with_suffix('.onnx'))
+        
+        if not TENSORRT_AVAILABLE:
+            print("   ⚠️  TensorRT/pycuda not installed, falling back to OpenCV DNN")
+            return False
+        if not onnx_path.exists():
+            print(f"   ⚠️  ONNX model not found ({onnx_path}), falling back to OpenCV DNN")
+            return False
+        
+        # Precision defaults from the target: cuda = FP32, otherwise FP16
+        precision = performance.get('precision') or (
+            'fp32' if performance.get('target', 'cuda_fp16') == 'cuda' else 'fp16'
+        )
+        
+        try:
+            self.trt_engine = TensorRTEngine(
+                onnx_path,
+                self._input_size,
+                max_batch=performance.get('max_batch', 8),
+                precision=precision,
+                calibration_dir=performance.get('calibration_images')
+            )
+            print(f"   ✅ Using TensorRT backend ({precision.upper()}, {len(self.trt_engine.output_names)} outputs)")
+            return True
+        except Exception as e:
+            print(f"   ⚠️  TensorRT engine unavailable ({e}), falling back to OpenCV DNN")
+            self.trt_engine = None
+            return False
+    
     def detect(self, frame):
         """
         Detect objects in a frame.
@@ -102,122 +213,203 @@ class ObjectDetector:
             frame: Input frame (numpy array)
             
         Returns:
-            list: List of detections (class_id, class_name, confidence, x, y, w, h)
+            numpy.ndarray: (K, 6) float32 detections, one row of
+                DETECTION_COLUMNS (class_id, confidence, x, y, w, h) each; look
+                class names up in get_class_names() by int(class_id)
         """
         if not self.is_initialized:
-            return []
-        
-        height, width = frame.shape[:2]
-        
-        # Prepare input blob
-        input_size = self.model_config.get('input_size', 416)
-        blob = cv2.dnn.blobFromImage(
-            frame,
-            1/255.0,
-            (input_size, input_size),
-            swapRB=True,
-            crop=False
-        )
+            return _no_detections()
+        
+        return self.detect_batch([frame])[0]
+    
+    def detect_batch(self, frames):
+        """
+        Detect objects in several frames with a single forward pass.
+        
+        Args:
+            frames: List of input frames (numpy arrays)
+            
+        Returns:
+            list: One (K, 6) detections array per frame (see detect), in input order
+        """
+        if not self.is_initialized or not frames:
+            return [_no_detections() for _ in frames]
+        
+        input_size = self._input_size
+        if self.trt_engine is not None and self.trt_engine.raw_input:
+            # The engine swaps channels and scales itself; upload resized uint8
+            # frames, resizing straight into its pinned staging buffer when they fit
+            if len(frames) <= self.trt_engine.max_batch:
+                blob = self.trt_engine.staging_buffer(len(frames))
+                for i, frame in enumerate(frames):
+                    cv2.resize(frame, (input_size, input_size), dst=blob[i])
+            else:
+                blob = np.stack([
+                    cv2.resize(frame, (input_size, input_size)) for frame in frames
+                ])
+        else:
+            # Prepare one batched input blob in the backend's layout
+            blob = self._prepare_blob(frames, input_size)
         
         # Run forward pass
-        self.net.setInput(blob)
-        outputs = self.net.forward(self.output_layers)
+        if self.trt_engine is not None:
+            outputs = self._forward_tensorrt(blob)
+        else:
+            self.net.setInput(blob)
+            if len(self.output_layers) == 1:
+                # A single output is the network's last layer; no names to bind
+                outputs = [self.net.forward()]
+            else:
+                outputs = self.net.forward(self.output_layers)
         
-        # Process detections
-        detections = self._process_detections(outputs, width, height)
+        # Batched outputs are (N, rows, 5 + classes), a single frame's are
+        # (rows, 5 + classes); split them per frame
+        results = []
+        for i, frame in enumerate(frames):
+            height, width = frame.shape[:2]
+            frame_outputs = [output[i] if output.ndim == 3 else output for output in outputs]
+            results.append(self._decode(frame_outputs, width, height))
         
-        return detections
+        return results
+    
+    def _blob_shape(self, batch, input_size):
+        """Input blob shape for a batch in the backend's layout"""
+        if self._layout == 'NHWC':
+            return (batch, input_size, input_size, 3)
+        return (batch, 3, input_size, input_size)
     
-    def _process_detections(self, outputs, width, height):
+    def _prepare_blob(self, frames, input_size):
         """
-        Process YOLO outputs into detections.
+        Resize, swap to RGB and scale frames into the reused input blob.
         
         Args:
-            outputs: YOLO network outputs
-            width: Frame width
-            height: Frame height
+            frames: List of input frames (numpy arrays)
+            input_size: Square network input size
             
         Returns:
-            list: Processed detections
+            numpy.ndarray: float32 blob of _blob_shape(N), overwritten by the next call
         """
-        class_ids = []
-        confidences = []
-        boxes = []
+        if self._blob_params is None:
+            # OpenCV < 4.8 cannot write into an existing blob or lay it out as NHWC
+            blob = cv2.dnn.blobFromImages(
+                frames,
+                1/255.0,
+                (input_size, input_size),
+                swapRB=True,
+                crop=False
+            )
+            if self._layout == 'NHWC':
+                blob = np.ascontiguousarray(blob.transpose(0, 2, 3, 1))
+            return blob
         
-        confidence_threshold = self.model_config.get('confidence_threshold', 0.5)
+        # Grow for larger batches; smaller ones use a leading slice
+        if len(self._blob) < len(frames):
+            self._blob = np.empty(self._blob_shape(len(frames), input_size), dtype=np.float32)
+        blob = self._blob[:len(frames)]
         
-        # Parse outputs
-        for output in outputs:
-            for detection in output:
-                scores = detection[5:]
-                class_id = np.argmax(scores)
-                confidence = scores[class_id]
-                
-                if confidence > confidence_threshold:
-                    # Check if class is in filter (if filtering is enabled)
-                    if self._should_detect_class(class_id):
-                        # Get bounding box coordinates
-                        center_x = int(detection[0] * width)
-                        center_y = int(detection[1] * height)
-                        w = int(detection[2] * width)
-                        h = int(detection[3] * height)
-                        
-                        # Calculate top-left corner
-                        x = int(center_x - w / 2)
-                        y = int(center_y - h / 2)
-                        
-                        boxes.append([x, y, w, h])
-                        confidences.append(float(confidence))
-                        class_ids.append(class_id)
-        
-        # Apply Non-Maximum Suppression
-        nms_threshold = self.model_config.get('nms_threshold', 0.4)
-        indices = cv2.dnn.NMSBoxes(
-            boxes,
-            confidences,
-            confidence_threshold,
-            nms_threshold
-        )
+        if len(frames) == 1:
+            return cv2.dnn.blobFromImageWithParams(frames[0], blob, self._blob_params)
+        return cv2.dnn.blobFromImagesWithParams(frames, blob, self._blob_params)
+    
+    def _forward_tensorrt(self, blob):
+        """Run the TensorRT engine, splitting batches larger than the engine's profile"""
+        step = self.trt_engine.max_batch
+        if len(blob) <= step:
+            return self.trt_engine.infer(blob)
         
-        # Build final detections list
-        detections = []
-        if len(indices) > 0:
-            for i in indices.flatten():
-                x, y, w, h = boxes[i]
-                confidence = confidences[i]
-                class_id = class_ids[i]
-                class_name = self.class_names[class_id]
-                
-                detections.append((
-                    class_id,
-                    class_name,
-                    confidence,
-                    x, y, w, h
-                ))
-        
-        return detections
+        chunks = [self.trt_engine.infer(blob[i:i + step]) for i in range(0, len(blob), step)]
+        return [np.concatenate(parts, axis=0) for parts in zip(*chunks)]
     
-    def _should_detect_class(self, class_id):
+    def _make_decoder(self):
         """
-        Check if a class should be detected based on filter settings.
+        Build the post-processing function for the loaded model.
+        
+        Thresholds, the class filter and the NMS variant do not change once
+        the model is loaded, so they are bound into the function here instead
+        of being looked up for every frame.
         
-        Args:
-            class_id: Class ID to check
-            
         Returns:
-            bool: True if class should be detected
+            callable: decode(outputs, width, height) returning the (K, 6)
+                detections array of one frame
         """
-        filter_config = self.config.get('filter', {})
+        confidence_threshold = self.model_config.get('confidence_threshold', 0.5)
+        nms_threshold = self.model_config.get('nms_threshold', 0.4)
+        allowed_class_mask = self._allowed_class_mask
         
-        if not filter_config.get('enabled', False):
-            return True
+        if hasattr(cv2.dnn, 'NMSBoxesBatched'):
+            def suppress(box_array, boxes, confidences, class_ids, width, height):
+                return cv2.dnn.NMSBoxesBatched(
+                    boxes,
+                    confidences,
+                    class_ids,
+                    confidence_threshold,
+                    nms_threshold
+                )
+        else:
+            def suppress(box_array, boxes, confidences, class_ids, width, height):
+                # OpenCV < 4.7: shift each class into its own region so boxes of
+                # different classes never overlap, then run plain NMS
+                offsets = np.asarray(class_ids, dtype=np.int64)[:, np.newaxis] * (2 * max(width, height))
+                shifted = box_array.astype(np.int64)
+                shifted[:, :2] += offsets
+                return cv2.dnn.NMSBoxes(
+                    shifted.tolist(),
+                    confidences,
+                    confidence_threshold,
+                    nms_threshold
+                )
         
+        def decode(outputs, width, height):
+            # Decode each output layer separately and join only the kept boxes
+            decoded = [
+                decode_detections(
+                    output.reshape(-1, output.shape[-1]),
+                    width,
+                    height,
+                    confidence_threshold,
+                    allowed_class_mask
+                )
+                for output in outputs
+            ]
+            if len(decoded) == 1:
+                box_array, class_id_array, confidence_array = decoded[0]
+            else:
+                box_array, class_id_array, confidence_array = (np.concatenate(parts) for parts in zip(*decoded))
+            
+            boxes = box_array.tolist()
+            class_ids = class_id_array.tolist()
+            confidences = confidence_array.astype(float).tolist()
+            
+            # Apply per-class Non-Maximum Suppression
+            indices = suppress(box_array, boxes, confidences, class_ids, width, height)
+            if len(indices) == 0:
+                return _no_detections()
+            
+            # Gather the kept rows into one array instead of a list of tuples
+            keep = np.asarray(indices).flatten()
+            detections = np.empty((len(keep), len(DETECTION_COLUMNS)), dtype=np.float32)
+            detections[:, 0] = class_id_array[keep]
+            detections[:, 1] = confidence_array[keep]
+            detections[:, 2:] = box_array[keep]
+            return detections
+        
+        return decode
+    
+    def _build_class_mask(self):
+        """
+        Build a boolean mask of class IDs allowed by the filter settings.
+        
+        Returns:
+            numpy.ndarray or None: Mask indexed by class ID, None when all classes are allowed
+        """
+        filter_config = self.config.get('filter', {})
         allowed_classes = filter_config.get('classes', [])
-        if not allowed_classes:
-            return True
         
-        class_name = self.class_names[class_id]
-        return class_name in allowed_classes
+        if not filter_config.get('enabled', False) or not allowed_classes:
+            return None
+        
+        allowed = set(allowed_classes)
+        return np.array([name in allowed for name in self.class_names], dtype=bool)
     
     def get_class_names(self):
         """Get list of all class names."""
@@ -239,3 +431,57 @@ class ObjectDetector:
             'is_initialized': self.is_initialized
         }
 
+
+def configure_opencv_threads(num_threads=None):
+    """
+    Enable OpenCV's optimized code paths and size its worker thread pool.
+    
+    By default OpenCV starts one worker per logical CPU; on hyper-threaded
+    machines sibling threads compete for the same SIMD units, so the default
+    here is half the CPUs this process may run on (about one per physical core).
+    
+    Args:
+        num_threads (int): Worker threads, or None for the default
+    """
+    if not num_threads:
+        if hasattr(os, 'sched_getaffinity'):
+            cpus = len(os.sched_getaffinity(0))
+        else:
+            cpus = os.cpu_count() or 1
+        num_threads = max(1, cpus // 2)
+    
+    cv2.setUseOptimized(True)
+    cv2.setNumThreads(int(num_threads))
+    print(f"   🧵 OpenCV threads: {cv2.getNumThreads()}")
+
+
+def _openvino_targets():
+    """DNN targets OpenCV's OpenVINO backend supports here (empty without OpenVINO)"""
+    backend = getattr(cv2.dnn, 'DNN_BACKEND_INFERENCE_ENGINE', None)
+    if backend is None:
+        return []
+    try:
+        return list(cv2.dnn.getAvailableTargets(backend))
+    except cv2.error:
+        return []
+
+
+def _openvino_target(target):
+    """
+    Map performance.target to an OpenVINO DNN target.
+    
+    'opencl' / 'opencl_fp16' run on the Intel iGPU when OpenVINO sees one,
+    anything else on the CPU.
+    """
+    gpu_target = {
+        'opencl': cv2.dnn.DNN_TARGET_OPENCL,
+        'opencl_fp16': cv2.dnn.DNN_TARGET_OPENCL_FP16,
+    }.get(target)
+    if gpu_target is not None and gpu_target in _openvino_targets():
+        return gpu_target
+    return cv2.dnn.DNN_TARGET_CPU
+
+
+def _no_detections():
+    """Empty (0, 6) detections array"""
+    return np.empty((0, len(DETECTION_COLUMNS)), dtype=np.float32)
@@ -0,0 +1,313 @@
+"""
+TensorRT Backend Module
+Runs a YOLO ONNX export as a TensorRT FP16/INT8 engine with dynamic batch size,
+or with the fixed shape of an export that has no dynamic axes.
+"""
+
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+try:
+    import tensorrt as trt
+    import pycuda.driver as cuda
+    TENSORRT_AVAILABLE = True
+except ImportError:
+    TENSORRT_AVAILABLE = False
+
+# Representative images used for INT8 calibration
+CALIBRATION_IMAGES = 500
+CALIBRATION_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+
+if TENSORRT_AVAILABLE:
+    class _EntropyCalibrator(trt.IInt8EntropyCalibrator2):
+        """Feeds preprocessed image batches to TensorRT's INT8 calibration"""
+
+        def __init__(self, batches, batch_size, cache_path):
+            trt.IInt8EntropyCalibrator2.__init__(self)
+            self._batches = iter(batches)
+            self._batch_size = batch_size
+            self._cache_path = cache_path
+            self._device = None
+
+        def get_batch_size(self):
+            return self._batch_size
+
+        def get_batch(self, names):
+            batch = next(self._batches, None)
+            if batch is None:
+                return None
+            if self._device is None:
+                self._device = cuda.mem_alloc(batch.nbytes)
+            cuda.memcpy_htod(self._device, batch)
+            return [int(self._device)]
+
+        def read_calibration_cache(self):
+            if self._cache_path.exists():
+                return self._cache_path.read_bytes()
+            return None
+
+        def write_calibration_cache(self, cache):
+            self._cache_path.write_bytes(bytes(cache))
+            print(f"   💾 Cached INT8 calibration table: {self._cache_path.name}")
+
+
+class TensorRTEngine:
+    """
+    YOLO inference through a serialized TensorRT engine.
+
+    The ONNX model must keep Darknet's region output layout, one output per
+    YOLO head shaped (batch, rows, 5 + classes) with normalized center/size
+    boxes, so ObjectDetector's post-processing applies unchanged.
+
+    The input layout follows the model: NCHW (batch, 3, size, size) or NHWC
+    (batch, size, size, 3), e.g. from a channels-last export, in which case
+    layout is 'NHWC' and no transpose is needed anywhere. Models wrapped by
+    scripts/add_preprocessing.py take raw uint8 BGR frames in NHWC instead of
+    a float blob; raw_input is True then.
+
+    An export without dynamic axes builds a static-shape engine (static is
+    True): TensorRT specializes its tactics to that one shape, max_batch
+    becomes the exported batch and smaller batches are padded. With a
+    dynamic export, max_batch=1 likewise gives a single-shape profile.
+    """
+
+    def __init__(self, onnx_path, input_size, max_batch=8, opt_batch=4, precision='fp16',
+                 calibration_dir=None):
+        """
+        Load a cached engine, or build one from the ONNX model.
+
+        Args:
+            onnx_path (str): Path to the ONNX model
+            input_size (int): Square network input size
+            max_batch (int): Largest batch the engine accepts
+            opt_batch (int): Batch size TensorRT tunes kernels for
+            precision (str): 'fp32', 'fp16' (tensor cores) or 'int8'; INT8 keeps
+                FP16 for layers without INT8 kernels
+            calibration_dir (str): Representative images for INT8 calibration;
+                only needed until the calibration table next to the model is cached
+        """
+        if not TENSORRT_AVAILABLE:
+            raise ImportError("tensorrt and pycuda are required for the TensorRT backend")
+
+        self.input_size = input_size
+        self.max_batch = max_batch
+        self._logger = trt.Logger(trt.Logger.WARNING)
+
+        # The device's primary context, pushed around every CUDA call so the
+        # engine works from whichever thread runs detection
+        cuda.init()
+        self._cuda_context = cuda.Device(0).retain_primary_context()
+        self._cuda_context.push()
+        try:
+            self._setup(Path(onnx_path), opt_batch, precision, calibration_dir)
+        finally:
+            self._cuda_context.pop()
+
+    def _setup(self, onnx_path, opt_batch, precision, calibration_dir):
+        """Deserialize (or build) the engine and allocate I/O buffers"""
+        max_batch = self.max_batch
+
+        if precision not in ('fp32', 'fp16', 'int8'):
+            raise ValueError(f"Unknown TensorRT precision: {precision}")
+        engine_path = onnx_path.with_suffix(f'.{precision}.b{max_batch}.engine')
+
+        # Rebuild when the ONNX model is newer than the cached engine
+        if engine_path.exists() and engine_path.stat().st_mtime >= onnx_path.stat().st_mtime:
+            serialized = engine_path.read_bytes()
+        else:
+            serialized = self._build(onnx_path, min(opt_batch, max_batch), precision, calibration_dir)
+            engine_path.write_bytes(serialized)
+            print(f"   💾 Cached TensorRT engine: {engine_path.name}")
+
+        runtime = trt.Runtime(self._logger)
+        self.engine = runtime.deserialize_cuda_engine(serialized)
+        self.context = self.engine.create_execution_context()
+        self.stream = cuda.Stream()
+
+        names = [self.engine.get_tensor_name(i) for i in range(self.engine.num_io_tensors)]
+        self.input_name = next(n for n in names if self.engine.get_tensor_mode(n) == trt.TensorIOMode.INPUT)
+        self.output_names = [n for n in names if self.engine.get_tensor_mode(n) == trt.TensorIOMode.OUTPUT]
+        self.raw_input = self.engine.get_tensor_dtype(self.input_name) == trt.DataType.UINT8
+        engine_shape = self.engine.get_tensor_shape(self.input_name)
+        self.layout = self._layout_of(engine_shape)
+        self.static = engine_shape[0] != -1
+        if self.static:
+            max_batch = self.max_batch = engine_shape[0]
+
+        # Device buffers sized once for the largest batch; the bound input
+        # shape is only changed when the batch size does
+        self._device = {}
+        self._host = {}
+        self._bound_batch = max_batch
+        if not self.static:
+            self.context.set_input_shape(self.input_name, self._input_shape(max_batch))
+        for name in [self.input_name] + self.output_names:
+            shape = tuple(self.context.get_tensor_shape(name))
+            dtype = trt.nptype(self.engine.get_tensor_dtype(name))
+            self._host[name] = cuda.pagelocked_empty(shape, dtype)
+            self._device[name] = cuda.mem_alloc(self._host[name].nbytes)
+            self.context.set_tensor_address(name, int(self._device[name]))
+
+    @staticmethod
+    def _layout_of(shape):
+        """'NHWC' when a 4D input shape is channels-last, else 'NCHW'"""
+        return 'NHWC' if shape[-1] == 3 else 'NCHW'
+    
+    def _input_shape(self, batch, layout=None):
+        """Engine input shape for a batch in the model's layout"""
+        size = self.input_size
+        if (layout or self.layout) == 'NHWC':
+            return (batch, size, size, 3)
+        return (batch, 3, size, size)
+
+    def _build(self, onnx_path, opt_batch, precision, calibration_dir):
+        """Parse the ONNX model and build a serialized engine"""
+        print(f"   🔧 Building TensorRT engine from {onnx_path.name} (one-time, may take minutes)...")
+
+        builder = trt.Builder(self._logger)
+        network = builder.create_network(1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH))
+        parser = trt.OnnxParser(network, self._logger)
+
+        if not parser.parse(onnx_path.read_bytes()):
+            errors = [str(parser.get_error(i)) for i in range(parser.num_errors)]
+            raise RuntimeError(f"Could not parse {onnx_path}: {'; '.join(errors)}")
+
+        config = builder.create_builder_config()
+        if precision != 'fp32' and builder.platform_has_fast_fp16:
+            config.set_flag(trt.BuilderFlag.FP16)
+
+        network_input = network.get_input(0)
+        layout = self._layout_of(network_input.shape)
+        profile = None
+        if network_input.shape[0] == -1:
+            profile = builder.create_optimization_profile()
+            profile.set_shape(network_input.name, self._input_shape(1, layout),
+                              self._input_shape(opt_batch, layout),
+                              self._input_shape(self.max_batch, layout))
+            config.add_optimization_profile(profile)
+        else:
+            # Static export: no profile, TensorRT builds for the one shape
+            opt_batch = network_input.shape[0]
+
+        if precision == 'int8':
+            if not builder.platform_has_fast_int8:
+                print("   ⚠️  GPU has no fast INT8 support, building FP16 instead")
+            else:
+                # Calibrate on batches at the profile's optimal shape
+                cache_path = onnx_path.with_suffix('.int8.calib')
+                if not cache_path.exists() and not calibration_dir:
+                    raise ValueError("INT8 needs performance.calibration_images or a cached calibration table")
+                raw_input = network_input.dtype == trt.DataType.UINT8
+                batches = (
+                    self._calibration_batches(Path(calibration_dir), opt_batch, layout, raw_input)
+                    if calibration_dir else ()
+                )
+                calibrator = _EntropyCalibrator(batches, opt_batch, cache_path)
+                config.set_flag(trt.BuilderFlag.INT8)
+                config.int8_calibrator = calibrator
+                if profile is not None:
+                    config.set_calibration_profile(profile)
+
+        serialized = builder.build_serialized_network(network, config)
+        if serialized is None:
+            raise RuntimeError("TensorRT engine build failed")
+        return bytes(serialized)
+
+    def _calibration_batches(self, images_dir, batch, layout, raw_input):
+        """
+        Preprocess representative images into full calibration batches.
+
+        Args:
+            images_dir (Path): Directory of images from the cameras' scenes
+            batch (int): Frames per batch
+            layout (str): Model input layout, 'NCHW' or 'NHWC'
+            raw_input (bool): Model takes uint8 frames instead of a float blob
+
+        Yields:
+            numpy.ndarray: One contiguous batch in the model's input format
+        """
+        paths = sorted(p for p in images_dir.iterdir() if p.suffix.lower() in CALIBRATION_EXTENSIONS)
+        paths = paths[:CALIBRATION_IMAGES]
+        print(f"   📏 Calibrating INT8 on {len(paths)} images from {images_dir}...")
+
+        size = self.input_size
+        for start in range(0, len(paths) - batch + 1, batch):
+            frames = [cv2.imread(str(path)) for path in paths[start:start + batch]]
+            frames = [frame for frame in frames if frame is not None]
+            if len(frames) < batch:
+                continue  # The calibration shape is fixed; skip unreadable leftovers
+
+            if raw_input:
+                yield np.stack([cv2.resize(frame, (size, size)) for frame in frames])
+                continue
+            blob = cv2.dnn.blobFromImages(frames, 1/255.0, (size, size), swapRB=True, crop=False)
+            yield np.ascontiguousarray(blob.transpose(0, 2, 3, 1)) if layout == 'NHWC' else blob
+
+    def staging_buffer(self, batch):
+        """
+        Page-locked input buffer for a batch, to fill in place before infer().
+
+        Writing frames straight into it (e.g. cv2.resize(..., dst=buffer[i]))
+        lets infer() DMA the batch to the GPU without an intermediate copy.
+        The buffer is reused by the next call.
+
+        Args:
+            batch (int): Number of frames, at most max_batch
+
+        Returns:
+            numpy.ndarray: View of shape _input_shape(batch) in the engine's input dtype
+        """
+        shape = self._input_shape(batch)
+        return self._host[self.input_name].reshape(-1)[:int(np.prod(shape))].reshape(shape)
+
+    def infer(self, blob):
+        """
+        Run the engine on a batch.
+
+        Args:
+            blob (numpy.ndarray): float32 blob in the engine's layout, or (N, size, size, 3)
+                uint8 frames when raw_input is True; N <= max_batch
+
+        Returns:
+            list: One (N, rows, 5 + classes) array per output
+        """
+        self._cuda_context.push()
+        try:
+            return self._infer(blob)
+        finally:
+            self._cuda_context.pop()
+
+    def _infer(self, blob):
+        """Copy the blob in, execute and copy the outputs back (context already current)"""
+        batch = blob.shape[0]
+        if not self.static and batch != self._bound_batch:
+            self.context.set_input_shape(self.input_name, blob.shape)
+            self._bound_batch = batch
+
+        host_input = self._host[self.input_name]
+        flat_input = host_input.reshape(-1)[:blob.size]
+        if blob.ctypes.data != flat_input.ctypes.data:
+            # Not filled through staging_buffer(); copy into pinned memory
+            flat_input[:] = blob.ravel()
+        if self.static:
+            # The engine always runs its full batch; rows past `batch` are padding
+            flat_input = host_input.reshape(-1)
+        cuda.memcpy_htod_async(self._device[self.input_name], flat_input, self.stream)
+
+        self.context.execute_async_v3(self.stream.handle)
+
+        outputs = []
+        for name in self.output_names:
+            shape = tuple(self.context.get_tensor_shape(name))
+            host = self._host[name].reshape(-1)[:int(np.prod(shape))]
+            cuda.memcpy_dtoh_async(host, self._device[name], self.stream)
+            outputs.append((host, shape))
+        self.stream.synchronize()
+
+        # Copy out of the pinned buffers, which the next call reuses
+        run_batch = self.max_batch if self.static else batch
+        return [host.reshape(shape if len(shape) == 3 else (run_batch, -1, shape[-1]))[:batch].copy()
+                for host, shape in outputs]
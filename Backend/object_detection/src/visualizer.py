@@ -6,6 +6,19 @@ Handles drawing bounding boxes, labels, and overlays on frames.
 import cv2
 import numpy as np
 
+# Rendered label patches kept before the cache is emptied and refilled
+LABEL_CACHE_SIZE = 1024
+
+# Constant help line drawn at the bottom of the info overlay
+INSTRUCTIONS_TEXT = "Press 'q' or ESC to exit | 's' to save frame"
+
+# Info overlay text style (green, anti-aliased) and its fixed line prefixes
+OVERLAY_COLOR = (0, 255, 0)
+OVERLAY_FONT_SCALE = 0.7
+OVERLAY_FONT_THICKNESS = 2
+COUNT_PREFIX = "Objects detected: "
+FPS_PREFIX = "FPS: "
+
 
 class Visualizer:
     """Handles visualization of detection results."""
@@ -20,6 +33,39 @@ class Visualizer:
         self.config = config
         self.colors = self._generate_colors(80)  # 80 COCO classes
         
+        # Display settings read once instead of per detection
+        self._font = cv2.FONT_HERSHEY_SIMPLEX
+        self._font_scale = config.get('font_scale', 0.6)
+        self._font_thickness = config.get('font_thickness', 2)
+        self._box_thickness = config.get('box_thickness', 2)
+        self._show_confidence = config.get('show_confidence', True)
+        
+        # Rendered labels (filled background + text), keyed by class and
+        # confidence in hundredths: {(class_name, class_id, percent): (patch, baseline)}
+        self._label_cache = {}
+        
+        # Last FPS value text as (fps in tenths, text); rebuilt only when the shown value changes
+        self._fps_text = (None, '')
+        
+        # Text that never changes is rasterized once: the instructions and the
+        # overlay line prefixes, {text: (alpha, ascent)}; only values are drawn per frame
+        self._static_text = {INSTRUCTIONS_TEXT: self._text_alpha(INSTRUCTIONS_TEXT, 0.5, 1)}
+        for prefix in (COUNT_PREFIX, FPS_PREFIX):
+            self._static_text[prefix] = self._text_alpha(prefix, OVERLAY_FONT_SCALE, OVERLAY_FONT_THICKNESS)
+        
+    def precompute(self, num_classes):
+        """
+        Prepare per-class state for a model's class count.
+        
+        Gives every class its own color instead of wrapping around the
+        default 80 and drops labels rendered with the old colors.
+        
+        Args:
+            num_classes (int): Number of classes the detector reports
+        """
+        self.colors = self._generate_colors(max(1, num_classes))
+        self._label_cache.clear()
+        
     def _generate_colors(self, num_classes):
         """
         Generate distinct colors for each class.
@@ -30,16 +76,11 @@ class Visualizer:
         Returns:
             list: List of BGR color tuples
         """
-        np.random.seed(42)  # For consistent colors
-        colors = []
-        for i in range(num_classes):
-            hue = int(180 * i / num_classes)
-            color = cv2.cvtColor(
-                np.uint8([[[hue, 255, 255]]]),
-                cv2.COLOR_HSV2BGR
-            )[0][0]
-            colors.append(tuple(map(int, color)))
-        return colors
+        # Evenly spaced hues at full saturation/value, converted in one call
+        hsv = np.full((num_classes, 1, 3), 255, dtype=np.uint8)
+        hsv[:, 0, 0] = 180 * np.arange(num_classes) // num_classes
+        bgr = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR).reshape(num_classes, 3)
+        return [tuple(map(int, color)) for color in bgr]
     
     def draw_detection(self, frame, detection, class_name, class_id):
         """
@@ -60,47 +101,105 @@ class Visualizer:
         color = self.colors[class_id % len(self.colors)]
         
         # Draw bounding box
-        thickness = self.config.get('box_thickness', 2)
-        cv2.rectangle(frame, (x, y), (x + w, y + h), color, thickness)
+        cv2.rectangle(frame, (x, y), (x + w, y + h), color, self._box_thickness)
         
-        # Prepare label
-        if self.config.get('show_confidence', True):
-            label = f"{class_name}: {confidence:.2f}"
-        else:
-            label = class_name
+        # Labels are opaque, so paste the pre-rendered patch in one copy; the
+        # label text is only formatted the first time a confidence bucket is seen
+        percent = int(confidence * 100 + 0.5) if self._show_confidence else None
+        cached = self._label_cache.get((class_name, class_id, percent))
+        if cached is None:
+            cached = self._label_patch(class_name, class_id, percent, color)
+        patch, baseline = cached
+        label_height = patch.shape[0] - 2 * baseline - 6
+        label_y = max(y - 10, label_height + 10)
+        top = label_y - label_height - baseline - 5
         
-        # Calculate label size and position
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = self.config.get('font_scale', 0.6)
-        font_thickness = self.config.get('font_thickness', 2)
+        # Clip the patch to the frame
+        y0, x0 = max(top, 0), max(x, 0)
+        y1 = min(top + patch.shape[0], frame.shape[0])
+        x1 = min(x + patch.shape[1], frame.shape[1])
+        if y1 > y0 and x1 > x0:
+            frame[y0:y1, x0:x1] = patch[y0 - top:y1 - top, x0 - x:x1 - x]
         
-        (label_width, label_height), baseline = cv2.getTextSize(
-            label, font, font_scale, font_thickness
-        )
+        return frame
+    
+    def _label_patch(self, class_name, class_id, percent, color):
+        """
+        Render and cache a label's filled background and text.
         
-        # Draw label background
-        label_y = max(y - 10, label_height + 10)
-        cv2.rectangle(
-            frame,
-            (x, label_y - label_height - baseline - 5),
-            (x + label_width + 5, label_y + baseline),
-            color,
-            -1  # Filled
+        Args:
+            class_name: Name of detected class
+            class_id: ID of detected class
+            percent: Confidence in hundredths, or None to show only the name
+            color: BGR background color
+            
+        Returns:
+            tuple: (patch, baseline) where patch is the rendered BGR image
+        """
+        label = class_name if percent is None else f"{class_name}: {percent / 100:.2f}"
+        
+        (label_width, label_height), baseline = cv2.getTextSize(
+            label, self._font, self._font_scale, self._font_thickness
         )
         
-        # Draw label text
+        # Same extent as a filled rectangle from (0, 0) to (width + 5, height + 2 * baseline + 5)
+        patch = np.empty((label_height + 2 * baseline + 6, label_width + 6, 3), dtype=np.uint8)
+        patch[:] = color
         cv2.putText(
-            frame,
+            patch,
             label,
-            (x + 2, label_y - 5),
-            font,
-            font_scale,
+            (2, label_height + baseline),
+            self._font,
+            self._font_scale,
             (255, 255, 255),  # White text
-            font_thickness,
+            self._font_thickness,
             cv2.LINE_AA
         )
         
-        return frame
+        if len(self._label_cache) >= LABEL_CACHE_SIZE:
+            self._label_cache.clear()
+        self._label_cache[(class_name, class_id, percent)] = (patch, baseline)
+        return patch, baseline
+    
+    def _text_alpha(self, text, font_scale, thickness):
+        """
+        Rasterize anti-aliased text once into a coverage mask.
+        
+        Returns:
+            tuple: (alpha, ascent, pad, width) where alpha is an (h, w, 1) uint16
+                mask in 0-255, ascent is the mask rows above the baseline, pad the
+                margin kept around the glyphs for thick strokes and width the
+                text's advance as reported by cv2.getTextSize
+        """
+        (width, height), baseline = cv2.getTextSize(text, self._font, font_scale, thickness)
+        pad = thickness
+        mask = np.zeros((height + baseline + 2 * pad, width + 2 * pad), dtype=np.uint8)
+        cv2.putText(mask, text, (pad, height + pad), self._font, font_scale, 255, thickness, cv2.LINE_AA)
+        return mask[:, :, None].astype(np.uint16), height + pad, pad, width
+    
+    def _blend_text(self, frame, text, origin, color):
+        """
+        Draw text rasterized by _text_alpha in a solid color, clipped to the frame.
+        
+        Args:
+            frame: Contiguous uint8 BGR frame, modified in place
+            text: Key into the pre-rendered static text
+            origin: (x, baseline y) as for cv2.putText
+            color: BGR text color
+            
+        Returns:
+            int: Width of the text in pixels, to continue the line after it
+        """
+        alpha, ascent, pad, width = self._static_text[text]
+        x, top = origin[0] - pad, origin[1] - ascent
+        y0, x0 = max(top, 0), max(x, 0)
+        roi = frame[y0:max(top + alpha.shape[0], 0), x0:max(x + alpha.shape[1], 0)]
+        coverage = alpha[y0 - top:, x0 - x:][:roi.shape[0], :roi.shape[1]]
+        
+        # roi + (color - roi) * coverage / 255, in integers
+        diff = np.asarray(color, dtype=np.int32) - roi
+        roi[:] = roi + diff * coverage // 255
+        return width
     
     def draw_detections(self, frame, detections, class_names):
         """
@@ -108,65 +207,91 @@ class Visualizer:
         
         Args:
             frame: Input frame
-            detections: List of (class_id, class_name, confidence, x, y, w, h)
+            detections: (K, 6) array of (class_id, confidence, x, y, w, h) rows
             class_names: List of all class names
             
         Returns:
             Modified frame
         """
-        for detection in detections:
-            class_id, class_name, confidence, x, y, w, h = detection
+        # OpenCV only draws into contiguous frames (mirrored camera frames are views)
+        if not frame.flags.c_contiguous:
+            frame = np.ascontiguousarray(frame)
+        
+        for class_id, confidence, x, y, w, h in detections.tolist():
+            class_id = int(class_id)
             self.draw_detection(
                 frame,
-                (x, y, w, h, confidence),
-                class_name,
+                (int(x), int(y), int(w), int(h), confidence),
+                class_names[class_id],
                 class_id
             )
         
         return frame
     
-    def draw_info_overlay(self, frame, detections, fps=0):
+    @staticmethod
+    def _class_counts(detections, class_names=None):
+        """
+        Count detections per class name, in order of first appearance.
+        
+        Args:
+            detections: (K, 6) detections array
+            class_names: List of all class names (None to label by class ID)
+            
+        Returns:
+            dict: {class_name: count}
+        """
+        class_counts = {}
+        for class_id in detections[:, 0].astype(np.int64).tolist():
+            class_name = class_names[class_id] if class_names is not None else str(class_id)
+            class_counts[class_name] = class_counts.get(class_name, 0) + 1
+        return class_counts
+    
+    def draw_info_overlay(self, frame, detections, fps=0, class_names=None):
         """
         Draw information overlay on the frame.
         
         Args:
             frame: Input frame
-            detections: List of detections
+            detections: (K, 6) detections array
             fps: Current FPS
+            class_names: List of all class names for the breakdown
             
         Returns:
             Modified frame
         """
+        if not frame.flags.c_contiguous:
+            frame = np.ascontiguousarray(frame)
+        
         font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = 0.7
-        font_thickness = 2
-        color = (0, 255, 0)  # Green
+        font_scale = OVERLAY_FONT_SCALE
+        font_thickness = OVERLAY_FONT_THICKNESS
+        color = OVERLAY_COLOR
         y_offset = 30
         
-        # Draw object count
+        # Draw object count (pre-rendered prefix, then the number)
         if self.config.get('show_count', True):
-            count_text = f"Objects detected: {len(detections)}"
+            x = 10 + self._blend_text(frame, COUNT_PREFIX, (10, y_offset), color)
             cv2.putText(
-                frame, count_text, (10, y_offset),
+                frame, str(len(detections)), (x, y_offset),
                 font, font_scale, color, font_thickness, cv2.LINE_AA
             )
             y_offset += 35
         
         # Draw FPS
         if self.config.get('show_fps', True) and fps > 0:
-            fps_text = f"FPS: {fps:.1f}"
+            tenths = int(fps * 10 + 0.5)
+            if tenths != self._fps_text[0]:
+                self._fps_text = (tenths, f"{tenths / 10:.1f}")
+            x = 10 + self._blend_text(frame, FPS_PREFIX, (10, y_offset), color)
             cv2.putText(
-                frame, fps_text, (10, y_offset),
+                frame, self._fps_text[1], (x, y_offset),
                 font, font_scale, color, font_thickness, cv2.LINE_AA
             )
             y_offset += 35
         
         # Draw class breakdown
         if len(detections) > 0 and len(detections) <= 10:
-            class_counts = {}
-            for detection in detections:
-                class_name = detection[1]
-                class_counts[class_name] = class_counts.get(class_name, 0) + 1
+            class_counts = self._class_counts(detections, class_names)
             
             breakdown_text = "Detected: " + ", ".join(
                 [f"{name}({count})" for name, count in class_counts.items()]
@@ -178,36 +303,26 @@ class Visualizer:
                 font, 0.5, color, 1, cv2.LINE_AA
             )
         
-        # Draw instructions at bottom
-        instructions = "Press 'q' or ESC to exit | 's' to save frame"
-        text_size = cv2.getTextSize(instructions, font, 0.5, 1)[0]
-        text_x = 10
-        text_y = frame.shape[0] - 10
-        
-        cv2.putText(
-            frame, instructions, (text_x, text_y),
-            font, 0.5, (255, 255, 255), 1, cv2.LINE_AA
-        )
+        # Draw instructions at bottom (baseline 10 px above the bottom edge)
+        self._blend_text(frame, INSTRUCTIONS_TEXT, (10, frame.shape[0] - 10), (255, 255, 255))
         
         return frame
     
-    def create_detection_summary(self, detections):
+    def create_detection_summary(self, detections, class_names=None):
         """
         Create a text summary of detections.
         
         Args:
-            detections: List of detections
+            detections: (K, 6) detections array
+            class_names: List of all class names (None to label by class ID)
             
         Returns:
             str: Summary text
         """
-        if not detections:
+        if len(detections) == 0:
             return "No objects detected"
         
-        class_counts = {}
-        for detection in detections:
-            class_name = detection[1]
-            class_counts[class_name] = class_counts.get(class_name, 0) + 1
+        class_counts = self._class_counts(detections, class_names)
         
         summary_parts = []
         for class_name, count in sorted(class_counts.items()):